@@ -0,0 +1,62 @@
+import os
+import sys
+import json
+import platform
+import subprocess
+from datetime import datetime
+from typing import Any, Dict, List
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC_DIR = os.path.join(BACKEND_DIR, "src")
+RESULTS_DIR = os.path.join(BACKEND_DIR, "benchmarks", "results")
+
+def use_app_sources():
+    # os módulos da aplicação importam uns aos outros a partir de src/
+    if SRC_DIR not in sys.path:
+        sys.path.insert(0, SRC_DIR)
+    os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+
+def percentile(values: List[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+def latency_summary(latencies: List[float]) -> Dict[str, float]:
+    return {
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+        "max_ms": round(max(latencies) * 1000, 3) if latencies else 0.0
+    }
+
+def _git_revision() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "desconhecida"
+
+def save_results(kind: str, results: Dict[str, Any], output: str = None) -> str:
+    document = {
+        "benchmark": kind,
+        "revision": _git_revision(),
+        "timestamp": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "results": results
+    }
+
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        output = os.path.join(RESULTS_DIR, f"{kind}-{document['revision']}-{stamp}.json")
+
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(document, f, indent=2, ensure_ascii=False)
+    return output
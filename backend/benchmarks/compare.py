@@ -0,0 +1,63 @@
+import sys
+import json
+import argparse
+from typing import Any, Dict, Iterator, Tuple
+
+def _load(path: str) -> Dict[str, Any]:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+def _rows(document: Dict[str, Any]) -> Iterator[Tuple[str, str, float]]:
+    results = document["results"]
+    if document["benchmark"] == "micro":
+        for name, values in results["benchmarks"].items():
+            for metric in ("mean_ms", "p95_ms"):
+                yield name, metric, values[metric]
+    else:
+        for level in results["levels"]:
+            name = f"concorrência {level['concurrency']}"
+            yield name, "throughput_rps", level["throughput_rps"]
+            for metric in ("p50_ms", "p95_ms", "p99_ms"):
+                yield name, metric, level["latency"][metric]
+            for kind, latency in level["latency_by_kind"].items():
+                yield f"{name} {kind}", "p95_ms", latency["p95_ms"]
+
+def compare(baseline: Dict[str, Any], candidate: Dict[str, Any], threshold: float) -> int:
+    if baseline["benchmark"] != candidate["benchmark"]:
+        raise SystemExit(f"Resultados de tipos diferentes: {baseline['benchmark']} x {candidate['benchmark']}")
+
+    before = {(name, metric): value for name, metric, value in _rows(baseline)}
+    regressions = 0
+
+    print(f"{'benchmark':<45} {'métrica':<15} {baseline['revision']:>12} {candidate['revision']:>12} {'delta':>9}")
+    for name, metric, value in _rows(candidate):
+        old = before.get((name, metric))
+        if old is None:
+            print(f"{name:<45} {metric:<15} {'-':>12} {value:>12.3f} {'novo':>9}")
+            continue
+
+        delta = (value - old) / old * 100 if old else 0.0
+        # vazão maior é melhor; latência maior é pior
+        worse = -delta if metric == "throughput_rps" else delta
+        marker = ""
+        if worse > threshold:
+            marker = "  <- regressão"
+            regressions += 1
+        print(f"{name:<45} {metric:<15} {old:>12.3f} {value:>12.3f} {delta:>+8.1f}%{marker}")
+
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara dois arquivos de resultados de benchmark")
+    parser.add_argument("baseline", help="Resultados de referência")
+    parser.add_argument("candidate", help="Resultados a comparar")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Piora percentual considerada regressão")
+    args = parser.parse_args()
+
+    regressions = compare(_load(args.baseline), _load(args.candidate), args.threshold)
+    if regressions:
+        print(f"{regressions} regressões acima de {args.threshold:.0f}%")
+    sys.exit(1 if regressions else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+import random
+from typing import Dict, List
+
+PRODUCTIVE_OPENINGS = [
+    "Bom dia, preciso de ajuda com",
+    "Olá, gostaria de solicitar",
+    "Prezados, estou com um problema em",
+    "Boa tarde, por favor verifiquem",
+    "Urgente: não consigo acessar",
+]
+PRODUCTIVE_SUBJECTS = [
+    "o boleto de março", "o extrato da conta corrente", "a segunda via do contrato",
+    "o limite do cartão", "a transferência agendada", "o acesso ao internet banking",
+    "o reembolso da tarifa", "a atualização cadastral",
+]
+PRODUCTIVE_DETAILS = [
+    "O sistema apresenta erro ao gerar o documento.",
+    "O valor cobrado está diferente do combinado.",
+    "Podem me informar o prazo para resolução?",
+    "Preciso dessa informação até amanhã para fechar o balanço.",
+    "Já tentei pelo aplicativo e não funcionou.",
+    "Segue em anexo o comprovante do pagamento.",
+]
+UNPRODUCTIVE_LINES = [
+    "Feliz natal a toda a equipe!",
+    "Muito obrigado pelo excelente atendimento de ontem.",
+    "Parabéns pelo aniversário da empresa, desejo muito sucesso.",
+    "Desejo a todos um ótimo final de semana.",
+    "Agradeço a atenção de sempre, abraços.",
+]
+SIGNATURES = [
+    "Atenciosamente,\nMaria Souza\nFinanceiro",
+    "Abraços,\nJoão",
+    "--\nCarlos Lima\nGerente de Contas\n(11) 98888-7777",
+]
+QUOTED_HISTORY = (
+    "\n\nEm seg., 10 de jun. de 2024 às 09:12, Suporte <suporte@empresa.com> escreveu:\n"
+    "> Olá, recebemos sua mensagem.\n> Em breve retornaremos.\n"
+)
+
+def synthetic_email(rng: random.Random, paragraphs: int = 1) -> Dict[str, str]:
+    productive = rng.random() < 0.6
+    subject = rng.choice(PRODUCTIVE_SUBJECTS)
+
+    if productive:
+        body = [f"{rng.choice(PRODUCTIVE_OPENINGS)} {subject}."]
+        body += [" ".join(rng.sample(PRODUCTIVE_DETAILS, 3)) for _ in range(paragraphs)]
+    else:
+        body = [" ".join(rng.sample(UNPRODUCTIVE_LINES, 2)) for _ in range(paragraphs)]
+
+    text = "\n\n".join(body) + "\n\n" + rng.choice(SIGNATURES)
+    if rng.random() < 0.3:
+        text += QUOTED_HISTORY
+
+    return {
+        "email_content": text,
+        "sender_name": rng.choice(["Maria Souza", "João Pereira", "Ana Costa", "Carlos Lima"]),
+        "subject": subject.capitalize() if productive else "Mensagem",
+        "expected_category": "produtivo" if productive else "improdutivo"
+    }
+
+def email_corpus(size: int, seed: int = 42, paragraphs: int = 1) -> List[Dict[str, str]]:
+    rng = random.Random(seed)
+    return [synthetic_email(rng, paragraphs) for _ in range(size)]
+
+def _pdf_escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+def synthetic_pdf(pages: int, seed: int = 42, lines_per_page: int = 30) -> bytes:
+    # PDF mínimo com uma fonte padrão, suficiente para o PyPDF2 extrair o texto
+    rng = random.Random(seed)
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>"]
+    kids = " ".join(f"{3 + index * 2} 0 R" for index in range(pages))
+    objects.append(f"<< /Type /Pages /Kids [{kids}] /Count {pages} >>".encode())
+    font_id = 3 + pages * 2
+
+    for _ in range(pages):
+        lines = [rng.choice(PRODUCTIVE_DETAILS + UNPRODUCTIVE_LINES) for _ in range(lines_per_page)]
+        commands = ["BT /F1 10 Tf 50 780 Td 12 TL"]
+        commands += [f"({_pdf_escape(line)}) Tj T*" for line in lines]
+        commands.append("ET")
+        stream = "\n".join(commands).encode("latin-1", errors="replace")
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents {len(objects) + 2} 0 R "
+            f"/Resources << /Font << /F1 {font_id} 0 R >> >> >>".encode()
+        )
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+
+    objects.append(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>")
+
+    output = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for index, body in enumerate(objects):
+        offsets.append(len(output))
+        output += f"{index + 1} 0 obj\n".encode() + body + b"\nendobj\n"
+
+    xref_offset = len(output)
+    output += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    output += b"".join(f"{offset:010d} 00000 n \n".encode() for offset in offsets)
+    output += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref_offset}\n%%EOF\n".encode()
+    return bytes(output)
@@ -0,0 +1,193 @@
+import os
+import sys
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+import subprocess
+from typing import Any, Dict, List, Tuple
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from common import BACKEND_DIR, SRC_DIR, latency_summary, save_results
+from corpus import email_corpus, synthetic_pdf
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def _start_process(command: List[str], env: Dict[str, str]) -> subprocess.Popen:
+    return subprocess.Popen(command, env=env, cwd=BACKEND_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.STDOUT)
+
+async def _wait_until_ready(url: str, timeout: float = 60.0):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            try:
+                if (await client.get(url)).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"Serviço não respondeu em {timeout}s: {url}")
+
+def _build_requests(args, total: int, seed: int) -> List[Tuple[str, Dict[str, Any]]]:
+    rng = random.Random(seed)
+    emails = email_corpus(total, seed=seed, paragraphs=args.paragraphs)
+    pdfs = {pages: synthetic_pdf(pages, seed=seed) for pages in args.pdf_pages}
+
+    requests = []
+    for email in emails:
+        if rng.random() < args.pdf_ratio:
+            pages = rng.choice(args.pdf_pages)
+            requests.append((f"pdf_{pages}p", {
+                "files": {"file": (f"email-{pages}p.pdf", pdfs[pages], "application/pdf")},
+                "data": {"sender_name": email["sender_name"], "subject": email["subject"]}
+            }))
+        else:
+            requests.append(("text", {"data": {
+                "email_content": email["email_content"],
+                "sender_name": email["sender_name"],
+                "subject": email["subject"]
+            }}))
+    return requests
+
+async def _run_level(base_url: str, concurrency: int, requests: List[Tuple[str, Dict[str, Any]]]) -> Dict[str, Any]:
+    queue: asyncio.Queue = asyncio.Queue()
+    for item in requests:
+        queue.put_nowait(item)
+
+    latencies: Dict[str, List[float]] = {}
+    status_codes: Dict[str, int] = {}
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=120.0, limits=limits) as client:
+        async def worker():
+            while not queue.empty():
+                kind, request = queue.get_nowait()
+                path = "/classify-email-file" if "files" in request else "/classify-email"
+                start = time.perf_counter()
+                try:
+                    response = await client.post(path, **request)
+                    status = str(response.status_code)
+                except httpx.HTTPError as e:
+                    status = type(e).__name__
+                elapsed = time.perf_counter() - start
+                status_codes[status] = status_codes.get(status, 0) + 1
+                if status == "200":
+                    latencies.setdefault(kind, []).append(elapsed)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        duration = time.perf_counter() - start
+
+    all_latencies = [value for values in latencies.values() for value in values]
+    succeeded = len(all_latencies)
+    return {
+        "concurrency": concurrency,
+        "requests": len(requests),
+        "succeeded": succeeded,
+        "status_codes": status_codes,
+        "duration_s": round(duration, 3),
+        "throughput_rps": round(succeeded / duration, 3) if duration else 0.0,
+        "latency": latency_summary(all_latencies),
+        "latency_by_kind": {kind: latency_summary(values) for kind, values in sorted(latencies.items())}
+    }
+
+async def run(args) -> Dict[str, Any]:
+    workdir = tempfile.mkdtemp(prefix="email-bench-")
+    env = {
+        **os.environ,
+        "OPENAI_API_KEY": "benchmark",
+        "OPENAI_BASE_URL": f"http://127.0.0.1:{args.mock_port}/v1",
+        "CACHE_ENABLED": "true" if args.cache else "false",
+        "JOBS_SQLITE_PATH": os.path.join(workdir, "jobs.sqlite3"),
+        "IMPORT_JOBS_DIR": workdir,
+        "PYTHONPATH": SRC_DIR
+    }
+
+    mock = _start_process([
+        sys.executable, os.path.join(BENCHMARKS_DIR, "mock_llm.py"),
+        "--port", str(args.mock_port),
+        "--latency", str(args.latency),
+        "--jitter", str(args.jitter),
+        "--error-rate", str(args.error_rate),
+        "--rate-limit-rate", str(args.rate_limit_rate)
+    ], env)
+    app = _start_process([
+        sys.executable, "-m", "uvicorn", "main:app",
+        "--app-dir", SRC_DIR,
+        "--port", str(args.app_port),
+        "--log-level", "warning"
+    ], env)
+
+    base_url = f"http://127.0.0.1:{args.app_port}"
+    try:
+        await _wait_until_ready(f"http://127.0.0.1:{args.mock_port}/stats")
+        await _wait_until_ready(f"{base_url}/health")
+
+        if args.warmup:
+            await _run_level(base_url, 4, _build_requests(args, args.warmup, seed=0))
+
+        levels = []
+        for index, concurrency in enumerate(args.concurrency):
+            requests = _build_requests(args, args.requests, seed=index + 1)
+            result = await _run_level(base_url, concurrency, requests)
+            levels.append(result)
+            print(
+                f"concorrência {concurrency:>4}: {result['throughput_rps']:>8.2f} req/s  "
+                f"p50 {result['latency']['p50_ms']:>9.1f} ms  p95 {result['latency']['p95_ms']:>9.1f} ms  "
+                f"p99 {result['latency']['p99_ms']:>9.1f} ms  status {result['status_codes']}"
+            )
+
+        async with httpx.AsyncClient() as client:
+            mock_stats = (await client.get(f"http://127.0.0.1:{args.mock_port}/stats")).json()
+    finally:
+        for process in (app, mock):
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+    return {
+        "config": {
+            "requests_per_level": args.requests,
+            "pdf_ratio": args.pdf_ratio,
+            "pdf_pages": args.pdf_pages,
+            "paragraphs": args.paragraphs,
+            "mock_latency_s": args.latency,
+            "mock_jitter_s": args.jitter,
+            "mock_error_rate": args.error_rate,
+            "mock_rate_limit_rate": args.rate_limit_rate,
+            "cache": args.cache
+        },
+        "levels": levels,
+        "mock_server": mock_stats
+    }
+
+def _int_list(value: str) -> List[int]:
+    return [int(item) for item in value.split(",") if item]
+
+def main():
+    parser = argparse.ArgumentParser(description="Teste de carga da API contra um servidor LLM simulado")
+    parser.add_argument("--concurrency", type=_int_list, default=[1, 8, 32], help="Níveis de concorrência, separados por vírgula")
+    parser.add_argument("--requests", type=int, default=200, help="Requisições por nível de concorrência")
+    parser.add_argument("--warmup", type=int, default=20, help="Requisições de aquecimento (0 desativa)")
+    parser.add_argument("--pdf-ratio", type=float, default=0.2, help="Fração das requisições enviadas como PDF")
+    parser.add_argument("--pdf-pages", type=_int_list, default=[1, 10, 50], help="Tamanhos dos PDFs em páginas")
+    parser.add_argument("--paragraphs", type=int, default=2, help="Parágrafos por email de texto")
+    parser.add_argument("--latency", type=float, default=0.3, help="Latência média do LLM simulado em segundos")
+    parser.add_argument("--jitter", type=float, default=0.1, help="Desvio padrão da latência simulada")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fração de respostas 503 do LLM simulado")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Fração de respostas 429 do LLM simulado")
+    parser.add_argument("--cache", action="store_true", help="Mantém o cache de resultados ligado")
+    parser.add_argument("--app-port", type=int, default=9200)
+    parser.add_argument("--mock-port", type=int, default=9100)
+    parser.add_argument("--output", help="Arquivo JSON de saída (padrão: benchmarks/results/)")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    print(f"Resultados salvos em {save_results('load', results, args.output)}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+import io
+import os
+import sys
+import time
+import argparse
+from typing import Any, Callable, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from common import use_app_sources, latency_summary, save_results
+from corpus import email_corpus, synthetic_pdf
+
+def _measure(function: Callable[[], Any], repeat: int) -> Dict[str, Any]:
+    function()  # aquecimento: carrega modelos e caches preguiçosos
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        samples.append(time.perf_counter() - start)
+    return {"repeat": repeat, "mean_ms": round(sum(samples) / len(samples) * 1000, 3), **latency_summary(samples)}
+
+def run(args) -> Dict[str, Any]:
+    use_app_sources()
+    from services.email_processor import EmailProcessor
+    from services.file_handler import extract_pdf_text
+    from utils.token_utils import count_tokens, fit_to_budget
+    from utils.prompt_utils import build_classification_prompt
+
+    processor = EmailProcessor()
+    results: Dict[str, Any] = {}
+
+    def record(name: str, function: Callable[[], Any]):
+        results[name] = _measure(function, args.repeat)
+        print(f"{name:<40} média {results[name]['mean_ms']:>9.3f} ms  p95 {results[name]['p95_ms']:>9.3f} ms")
+
+    for paragraphs in args.paragraphs:
+        emails = email_corpus(args.repeat, seed=paragraphs, paragraphs=paragraphs)
+        texts = [email["email_content"] for email in emails]
+        cycle = iter(range(10 ** 9))
+
+        def next_text() -> str:
+            return texts[next(cycle) % len(texts)]
+
+        record(f"preprocess_text[{paragraphs}p]", lambda: processor.preprocess_text(next_text()))
+        record(f"analyze_email_structure[{paragraphs}p]", lambda: processor.analyze_email_structure(next_text()))
+        record(f"count_tokens[{paragraphs}p]", lambda: count_tokens(next_text()))
+        record(f"fit_to_budget[{paragraphs}p]", lambda: fit_to_budget(next_text(), 200))
+
+        email = emails[0]
+        analysis = processor.analyze(email["email_content"]).to_dict()
+        record(
+            f"build_classification_prompt[{paragraphs}p]",
+            lambda: build_classification_prompt(email, analysis, args.prompt_max_tokens)
+        )
+
+    for pages in args.pdf_pages:
+        pdf = synthetic_pdf(pages)
+        record(f"extract_pdf_text[{pages}pg]", lambda: extract_pdf_text(io.BytesIO(pdf)))
+        record(
+            f"extract_pdf_text_budget[{pages}pg]",
+            lambda: extract_pdf_text(io.BytesIO(pdf), max_tokens=args.prompt_max_tokens)
+        )
+
+    return {
+        "config": {
+            "repeat": args.repeat,
+            "paragraphs": args.paragraphs,
+            "pdf_pages": args.pdf_pages,
+            "prompt_max_tokens": args.prompt_max_tokens
+        },
+        "benchmarks": results
+    }
+
+def _int_list(value: str) -> List[int]:
+    return [int(item) for item in value.split(",") if item]
+
+def main():
+    parser = argparse.ArgumentParser(description="Microbenchmarks das etapas de CPU do processamento")
+    parser.add_argument("--repeat", type=int, default=50, help="Execuções medidas por benchmark")
+    parser.add_argument("--paragraphs", type=_int_list, default=[1, 5, 20], help="Tamanhos dos emails em parágrafos")
+    parser.add_argument("--pdf-pages", type=_int_list, default=[1, 10, 50], help="Tamanhos dos PDFs em páginas")
+    parser.add_argument("--prompt-max-tokens", type=int, default=3000, help="Orçamento de tokens do prompt")
+    parser.add_argument("--output", help="Arquivo JSON de saída (padrão: benchmarks/results/)")
+    args = parser.parse_args()
+
+    results = run(args)
+    print(f"Resultados salvos em {save_results('micro', results, args.output)}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+import re
+import json
+import random
+import asyncio
+import argparse
+from typing import Any, Dict
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+PACKED_EMAIL_PATTERN = re.compile(r'^\[\[EMAIL (\d+)\]\]$', re.MULTILINE)
+# corpo do email nos prompts de classificação; o resto do template cita palavras como "solicitação"
+EMAIL_CONTENT_PATTERN = re.compile(
+    r'- Conteúdo(?: do email)?: "(.*?)"\n(?=\s*(?:ANÁLISE TÉCNICA|- Palavras-chave))', re.DOTALL
+)
+
+REPLY_TEXT = (
+    "Olá, recebemos sua mensagem e nossa equipe já está analisando a solicitação. "
+    "Retornaremos em até um dia útil com os próximos passos."
+)
+
+def create_app(latency: float = 0.3, jitter: float = 0.1, error_rate: float = 0.0,
+               rate_limit_rate: float = 0.0, retry_after: float = 1.0,
+               token_delay: float = 0.01, seed: int = 42) -> FastAPI:
+    app = FastAPI(title="Mock chat completions")
+    rng = random.Random(seed)
+    counters = {"requests": 0, "errors": 0, "rate_limited": 0}
+
+    def _usage(prompt: str, completion: str) -> Dict[str, int]:
+        prompt_tokens = len(prompt) // 4
+        completion_tokens = len(completion) // 4
+        return {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens
+        }
+
+    def _is_productive(text: str) -> bool:
+        # classificação baseada em palavras do corpo do email, estável para o mesmo email
+        match = EMAIL_CONTENT_PATTERN.search(text)
+        content = match.group(1) if match else text
+        return any(word in content.lower() for word in ("preciso", "solicit", "problema", "urgente", "erro"))
+
+    def _completion(body: Dict[str, Any]) -> str:
+        prompt = body["messages"][-1]["content"]
+        packed_emails = PACKED_EMAIL_PATTERN.split(prompt)
+        if len(packed_emails) > 1:
+            # classificação agrupada: texto alternado com os ids de cada "[[EMAIL <id>]]"
+            return json.dumps([
+                {
+                    "id": int(item_id),
+                    "categoria": "produtivo" if _is_productive(text) else "improdutivo",
+                    "confianca": 0.85
+                }
+                for item_id, text in zip(packed_emails[1::2], packed_emails[2::2])
+            ], ensure_ascii=False)
+        if '"categoria"' in prompt:
+            return json.dumps({
+                "categoria": "produtivo" if _is_productive(prompt) else "improdutivo",
+                "confianca": 0.85,
+                "justificativa": "Classificação simulada"
+            }, ensure_ascii=False)
+        return REPLY_TEXT
+
+    @app.get("/stats")
+    async def stats():
+        return counters
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        counters["requests"] += 1
+        body = await request.json()
+        await asyncio.sleep(max(0.0, rng.gauss(latency, jitter)))
+
+        roll = rng.random()
+        if roll < rate_limit_rate:
+            counters["rate_limited"] += 1
+            return JSONResponse(
+                {"error": {"message": "Rate limit reached", "type": "rate_limit"}},
+                status_code=429,
+                headers={"Retry-After": str(retry_after)}
+            )
+        if roll < rate_limit_rate + error_rate:
+            counters["errors"] += 1
+            return JSONResponse({"error": {"message": "Mock server error"}}, status_code=503)
+
+        content = _completion(body)
+        usage = _usage(body["messages"][-1]["content"], content)
+
+        if body.get("stream"):
+            async def events():
+                for word in content.split(" "):
+                    chunk = {"choices": [{"delta": {"content": word + " "}}]}
+                    yield f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n"
+                    await asyncio.sleep(token_delay)
+                yield "data: [DONE]\n\n"
+
+            return StreamingResponse(events(), media_type="text/event-stream")
+
+        return {
+            "id": f"mock-{counters['requests']}",
+            "object": "chat.completion",
+            "model": body.get("model"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": usage
+        }
+
+    return app
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor local que imita a API de chat completions")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--latency", type=float, default=0.3, help="Latência média em segundos")
+    parser.add_argument("--jitter", type=float, default=0.1, help="Desvio padrão da latência em segundos")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fração de respostas 503")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Fração de respostas 429")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Valor do cabeçalho Retry-After nas respostas 429")
+    parser.add_argument("--token-delay", type=float, default=0.01, help="Intervalo entre tokens no streaming")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    app = create_app(
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        retry_after=args.retry_after,
+        token_delay=args.token_delay,
+        seed=args.seed
+    )
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+import gc
+import os
+import sys
+import multiprocessing
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"))
+
+from config.settings import get_settings
+
+settings = get_settings()
+
+# com vários processos, cache e cotas da API só valem para todos se estiverem em disco
+if settings.CACHE_SQLITE_PATH is None:
+    settings.CACHE_SQLITE_PATH = "cache.sqlite3"
+if settings.RATE_LIMIT_SQLITE_PATH is None:
+    settings.RATE_LIMIT_SQLITE_PATH = "rate_limits.sqlite3"
+
+wsgi_app = "main:app"
+pythonpath = "src"
+bind = f"{settings.HOST}:{settings.PORT}"
+workers = settings.SERVER_WORKERS or multiprocessing.cpu_count()
+worker_class = "uvicorn.workers.UvicornWorker"
+timeout = settings.SERVER_TIMEOUT
+graceful_timeout = 30
+loglevel = settings.LOG_LEVEL
+
+# a aplicação é importada uma vez no processo mestre e herdada pelos workers no fork
+preload_app = True
+
+def when_ready(server):
+    from services.nlp_resources import get_nlp_resources
+
+    # carregados antes do fork, stopwords, stemmer e punkt ficam em páginas compartilhadas;
+    # gc.freeze evita que a coleta de lixo toque nesses objetos e force a cópia
+    get_nlp_resources()
+    gc.collect()
+    gc.freeze()
+    server.log.info(f"Recursos de NLP carregados; iniciando {workers} workers")
@@ -0,0 +1,45 @@
+import json
+import logging
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INDICATOR_PATTERNS: Dict[str, List[str]] = {
+    "urgency": [
+        'urgente', 'emergência', 'imediato', 'rápido', 'asap',
+        'o mais rápido possível', 'com brevidade', 'prioritário',
+        'problema', 'problemas', 'erro', 'erros', 'falha', 'falhas',
+        'não funciona', 'parou'
+    ],
+    "greeting": [
+        'bom dia', 'boa tarde', 'boa noite', 'olá', 'oi',
+        'parabéns', 'felicitações', 'feliz aniversário', 'feliz natal',
+        'feliz ano novo', 'obrigado', 'obrigada', 'agradecimento'
+    ],
+    "request": [
+        'preciso', 'necessito', 'solicito', 'gostaria',
+        'poderia', 'pode', 'ajuda', 'suporte', 'informação',
+        'dúvida', 'dúvidas', 'questão', 'pergunta', 'esclarecimento'
+    ],
+}
+
+def load_indicator_patterns(path: Optional[str] = None) -> Dict[str, List[str]]:
+    patterns = {category: list(terms) for category, terms in DEFAULT_INDICATOR_PATTERNS.items()}
+    
+    if not path:
+        return patterns
+    
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            custom_patterns = json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Falha ao carregar indicadores de {path}, usando padrões: {e}")
+        return patterns
+    
+    for category, terms in custom_patterns.items():
+        if not isinstance(terms, list):
+            logger.warning(f"Categoria de indicadores inválida ignorada: {category}")
+            continue
+        patterns[category] = [str(term) for term in terms]
+    
+    return patterns
@@ -1,17 +1,131 @@
 from pydantic_settings import BaseSettings
 from pydantic import Field
+from typing import Optional, Literal
 import os
 
 class Settings(BaseSettings):
    
     HOST: str = Field(default="0.0.0.0", description="Host do servidor")
     PORT: int = Field(default=8000, description="Porta do servidor")
+    SERVER_RELOAD: bool = Field(default=True, description="Recarrega o servidor ao alterar o código (python src/main.py)")
+    SERVER_WORKERS: int = Field(default=0, description="Processos do gunicorn em produção (0 usa um por núcleo)")
+    SERVER_TIMEOUT: int = Field(default=120, description="Segundos sem resposta antes do gunicorn reiniciar um worker")
     LOG_LEVEL: str = Field(default="info", description="Nível de log")
     FRONTEND_URL: str = Field(default="http://localhost:8080", description="URL do frontend para CORS")
     
     OPENAI_BASE_URL: str = Field(default="https://api.openai.com/v1", description="URL base da API OpenAI")
     OPENAI_API_KEY: str = Field(..., description="Chave da API OpenAI")
     OPENAI_MODEL: str = Field(default="gpt-3.5-turbo", description="Modelo da API OpenAI")
+    UPSTREAM_TIMEOUT: float = Field(default=30.0, description="Tempo limite das chamadas à API em segundos")
+    UPSTREAM_CONNECT_TIMEOUT: float = Field(default=5.0, description="Tempo limite de conexão com a API em segundos")
+    UPSTREAM_MAX_CONNECTIONS: int = Field(default=100, description="Número máximo de conexões simultâneas com a API")
+    UPSTREAM_MAX_KEEPALIVE: int = Field(default=20, description="Número máximo de conexões ociosas mantidas abertas")
+    UPSTREAM_KEEPALIVE_EXPIRY: float = Field(default=30.0, description="Tempo em segundos que uma conexão ociosa é mantida")
+    UPSTREAM_HTTP2: bool = Field(default=False, description="Usa HTTP/2 com a API (requer o pacote h2)")
+    UPSTREAM_MAX_RETRIES: int = Field(default=3, description="Novas tentativas em respostas 429/5xx e falhas de conexão")
+    UPSTREAM_TOTAL_TIMEOUT: float = Field(default=60.0, description="Tempo total de uma chamada à API em segundos, somando tentativas e esperas")
+    UPSTREAM_RETRY_BASE_DELAY: float = Field(default=0.5, description="Atraso base do backoff exponencial em segundos")
+    UPSTREAM_RETRY_MAX_DELAY: float = Field(default=20.0, description="Atraso máximo entre tentativas em segundos")
+    UPSTREAM_REQUESTS_PER_MINUTE: int = Field(default=0, description="Cota de requisições por minuto (0 desativa o limite)")
+    UPSTREAM_TOKENS_PER_MINUTE: int = Field(default=0, description="Cota de tokens por minuto (0 desativa o limite)")
+    RATE_LIMIT_SQLITE_PATH: Optional[str] = Field(default=None, description="Arquivo SQLite que divide as cotas da API entre processos")
+
+    CIRCUIT_BREAKER_ENABLED: bool = Field(default=True, description="Desvia para a classificação por regras enquanto a API estiver fora do ar ou lenta")
+    CIRCUIT_BREAKER_WINDOW_SECONDS: float = Field(default=60.0, description="Janela em segundos usada para calcular as taxas de falha e de lentidão")
+    CIRCUIT_BREAKER_MIN_CALLS: int = Field(default=10, description="Chamadas mínimas na janela antes de o circuito poder abrir")
+    CIRCUIT_BREAKER_FAILURE_RATE: float = Field(default=0.5, description="Taxa de falhas (5xx e erros de rede) que abre o circuito")
+    CIRCUIT_BREAKER_SLOW_CALL_SECONDS: float = Field(default=10.0, description="Latência a partir da qual uma chamada é considerada lenta")
+    CIRCUIT_BREAKER_SLOW_CALL_RATE: float = Field(default=0.8, description="Taxa de chamadas lentas que abre o circuito")
+    CIRCUIT_BREAKER_OPEN_SECONDS: float = Field(default=30.0, description="Tempo em segundos com o circuito aberto antes das requisições de teste")
+    CIRCUIT_BREAKER_HALF_OPEN_CALLS: int = Field(default=3, description="Requisições de teste bem-sucedidas necessárias para fechar o circuito")
+
+    UPSTREAM_PROVIDERS: Optional[str] = Field(
+        default=None,
+        description="Provedores adicionais compatíveis com a API OpenAI, em JSON: lista de objetos com name, base_url e, opcionalmente, api_key, model, weight, requests_per_minute e tokens_per_minute"
+    )
+    UPSTREAM_ROUTING: Literal["least_latency", "weighted"] = Field(
+        default="least_latency",
+        description="Escolha do provedor: least_latency (menor latência média ponderada pelo peso) ou weighted (sorteio pelo peso)"
+    )
+    UPSTREAM_HEDGE_ENABLED: bool = Field(default=False, description="Repete a requisição em outro provedor quando a primeira passa do percentil de latência")
+    UPSTREAM_HEDGE_QUANTILE: float = Field(default=0.9, description="Percentil de latência do provedor após o qual a requisição é repetida")
+    UPSTREAM_HEDGE_MIN_DELAY: float = Field(default=0.2, description="Espera mínima em segundos antes de repetir a requisição")
+    UPSTREAM_HEDGE_MIN_SAMPLES: int = Field(default=20, description="Latências medidas necessárias antes de repetir requisições de um provedor")
+
+    PROMPT_MAX_TOKENS: int = Field(default=3000, description="Orçamento de tokens de cada prompt enviado à API")
+    TOKENIZER_ENCODING: str = Field(default="cl100k_base", description="Codificação do tiktoken usada para contar tokens")
+    SPECULATIVE_RESPONSE_MODE: Literal["off", "guess", "both"] = Field(
+        default="off",
+        description="Gera a resposta em paralelo à classificação: 'guess' usa a categoria prevista pelas regras, 'both' rascunha as duas"
+    )
+
+    INDICATORS_FILE: Optional[str] = Field(default=None, description="Arquivo JSON com os padrões de indicadores por categoria")
+
+    NLP_BUNDLE_PATH: Optional[str] = Field(default=None, description="Pacote local com stopwords, stemmer e tokenizador (python -m services.nlp_resources)")
+    NLP_ALLOW_DOWNLOAD: bool = Field(default=False, description="Permite baixar recursos ausentes do NLTK em tempo de execução")
+    NLP_FAST_TOKENIZER: bool = Field(default=True, description="Separa as palavras com expressão regular em vez do tokenizador punkt do NLTK")
+    STEM_CACHE_SIZE: int = Field(default=50000, description="Radicais memorizados por processo (0 desativa)")
+    STEM_VOCABULARY_FILE: Optional[str] = Field(default=None, description="Arquivo com um termo por linha cujos radicais são calculados na inicialização")
+
+    EXECUTOR_THREAD_WORKERS: int = Field(default=4, description="Threads para processamento de texto leve")
+    EXECUTOR_PROCESS_WORKERS: int = Field(default=2, description="Processos para PDFs e textos grandes (0 desativa)")
+    EXECUTOR_MAX_QUEUE: int = Field(default=64, description="Tarefas em espera por pool antes de recusar com 503")
+    NLP_PROCESS_MIN_CHARS: int = Field(default=20000, description="Tamanho mínimo do texto para análise em processo separado")
+
+    LOCAL_MODEL_PATH: Optional[str] = Field(default=None, description="Arquivo do classificador local treinado")
+    LOCAL_MODEL_THRESHOLD: float = Field(default=0.95, description="Confiança mínima do classificador local para dispensar o LLM")
+
+    UPLOAD_MAX_FILE_SIZE_MB: int = Field(default=50, description="Tamanho máximo dos arquivos enviados em MB")
+    UPLOAD_CHUNK_SIZE: int = Field(default=1024 * 1024, description="Tamanho em bytes de cada bloco lido do upload")
+    PDF_MAX_PAGES: int = Field(default=200, description="Número máximo de páginas lidas de um PDF")
+    MAX_EXTRACTED_CHARS: int = Field(default=200000, description="Número máximo de caracteres extraídos de um arquivo")
+    PDF_STOP_AT_PROMPT_BUDGET: bool = Field(default=True, description="Para a extração do PDF quando o texto já preenche PROMPT_MAX_TOKENS")
+    PDF_PARALLEL_PAGES: bool = Field(default=False, description="Extrai as páginas do PDF em paralelo no pool de processos")
+    PDF_PAGES_PER_TASK: int = Field(default=4, description="Páginas extraídas por tarefa no modo paralelo")
+
+    IMPORT_JOBS_DIR: Optional[str] = Field(default=None, description="Diretório dos arquivos e resultados das importações")
+    IMPORT_MAX_FILE_SIZE_MB: int = Field(default=1024, description="Tamanho máximo dos arquivos de importação em MB")
+    IMPORT_MAX_CONCURRENCY: int = Field(default=4, description="Emails classificados simultaneamente por importação")
+    IMPORT_MAX_MESSAGES: int = Field(default=100000, description="Número máximo de emails lidos de uma importação")
+    IMPORT_RESULT_TTL_SECONDS: int = Field(default=86400, description="Tempo em segundos que os resultados das importações são mantidos")
+
+    JOBS_SQLITE_PATH: str = Field(default="jobs.sqlite3", description="Arquivo SQLite da fila de jobs assíncronos")
+    JOBS_WORKERS: int = Field(default=4, description="Jobs executados simultaneamente")
+    JOBS_MAX_QUEUED: int = Field(default=10000, description="Jobs aguardando na fila antes de recusar com 503")
+    JOBS_RESULT_TTL_SECONDS: int = Field(default=86400, description="Tempo em segundos que os resultados dos jobs são mantidos")
+    JOBS_MAX_WAIT_SECONDS: float = Field(default=30.0, description="Espera máxima de uma consulta de job com long-poll")
+    JOBS_LEASE_SECONDS: float = Field(default=60.0, description="Tempo sem sinal de vida após o qual um job em execução volta para a fila")
+
+    TRACING_EXPORTER: Literal["none", "log", "otlp"] = Field(
+        default="none",
+        description="Destino dos traces: none, log (JSON no log) ou otlp (coletor OTLP/HTTP)"
+    )
+    TRACING_OTLP_ENDPOINT: str = Field(default="http://localhost:4318", description="Endereço do coletor OTLP/HTTP")
+    TRACING_SERVICE_NAME: str = Field(default="email-classifier", description="Nome do serviço nos traces")
+    DEBUG_TIMINGS: bool = Field(default=False, description="Inclui o tempo de cada etapa nos metadados das respostas")
+
+    BATCH_MAX_CONCURRENCY: int = Field(default=8, description="Número máximo de emails classificados simultaneamente")
+    BATCH_MAX_ITEMS: int = Field(default=500, description="Número máximo de emails por requisição em lote")
+
+    CACHE_ENABLED: bool = Field(default=True, description="Habilita o cache de classificações e respostas")
+    CACHE_MAX_ENTRIES: int = Field(default=10000, description="Número máximo de entradas do cache em memória")
+    CACHE_TTL_SECONDS: int = Field(default=86400, description="Tempo de vida das entradas do cache em segundos")
+    CACHE_SQLITE_PATH: Optional[str] = Field(default=None, description="Caminho do arquivo SQLite do cache persistente")
+    CACHE_DISK_MAX_ENTRIES: int = Field(default=100000, description="Número máximo de entradas do cache persistente")
+    SINGLE_FLIGHT_ENABLED: bool = Field(default=True, description="Emails idênticos recebidos ao mesmo tempo compartilham as chamadas à API")
+
+    NEAR_DUPLICATE_ENABLED: bool = Field(default=False, description="Reaproveita a classificação de emails quase idênticos já classificados pelo LLM")
+    NEAR_DUPLICATE_THRESHOLD: float = Field(default=0.9, description="Similaridade mínima (SimHash de 64 bits) para reaproveitar uma classificação")
+    NEAR_DUPLICATE_MAX_ENTRIES: int = Field(default=50000, description="Número máximo de emails no índice de quase-duplicatas")
+    NEAR_DUPLICATE_MIN_TOKENS: int = Field(default=15, description="Radicais mínimos para um email entrar no índice")
+    NEAR_DUPLICATE_SQLITE_PATH: Optional[str] = Field(default=None, description="Arquivo SQLite que persiste o índice de quase-duplicatas")
+
+    PACKED_CLASSIFICATION_ENABLED: bool = Field(default=False, description="Classifica vários emails curtos em uma única chamada nos lotes, importações e jobs")
+    PACKED_MAX_ITEMS: int = Field(default=20, description="Número máximo de emails em cada chamada agrupada")
+    PACKED_MAX_TOKENS: int = Field(default=3000, description="Orçamento de tokens do prompt de cada chamada agrupada")
+    PACKED_ITEM_MAX_TOKENS: int = Field(default=300, description="Tamanho máximo em tokens de um email para entrar em uma chamada agrupada")
+    PACKED_MAX_WAIT_MS: int = Field(default=50, description="Espera máxima em milissegundos para completar um grupo antes de enviá-lo")
+    PACKED_MAX_PENDING: int = Field(default=100, description="Número máximo de emails aguardando classificação agrupada")
 
     class Config:
         env_file = ".env"
@@ -31,16 +145,136 @@ def create_example_env_file():
 OPENAI_BASE_URL=https://api.openai.com/v1
 OPENAI_API_KEY=sua_chave_openai_aqui
 OPENAI_MODEL=gpt-3.5-turbo
+PROMPT_MAX_TOKENS=3000
+TOKENIZER_ENCODING=cl100k_base
+# off | guess | both
+SPECULATIVE_RESPONSE_MODE=off
+
+# Configurações de conexão com a API
+UPSTREAM_TIMEOUT=30
+UPSTREAM_MAX_CONNECTIONS=100
+UPSTREAM_MAX_KEEPALIVE=20
+# requer pip install h2
+UPSTREAM_HTTP2=false
+UPSTREAM_MAX_RETRIES=3
+UPSTREAM_TOTAL_TIMEOUT=60
+# 0 desativa o limite
+UPSTREAM_REQUESTS_PER_MINUTE=0
+UPSTREAM_TOKENS_PER_MINUTE=0
+# divide as cotas entre os workers do gunicorn
+# RATE_LIMIT_SQLITE_PATH=rate_limits.sqlite3
+
+# Configurações do circuit breaker
+CIRCUIT_BREAKER_ENABLED=true
+CIRCUIT_BREAKER_WINDOW_SECONDS=60
+CIRCUIT_BREAKER_MIN_CALLS=10
+CIRCUIT_BREAKER_FAILURE_RATE=0.5
+CIRCUIT_BREAKER_SLOW_CALL_SECONDS=10
+CIRCUIT_BREAKER_SLOW_CALL_RATE=0.8
+CIRCUIT_BREAKER_OPEN_SECONDS=30
+CIRCUIT_BREAKER_HALF_OPEN_CALLS=3
+
+# Configurações de múltiplos provedores
+# o provedor de OPENAI_* é sempre usado; estes são adicionais
+# UPSTREAM_PROVIDERS=[{"name": "local", "base_url": "http://localhost:9100/v1", "model": "llama3", "weight": 1}]
+UPSTREAM_ROUTING=least_latency
+UPSTREAM_HEDGE_ENABLED=false
+UPSTREAM_HEDGE_QUANTILE=0.9
+UPSTREAM_HEDGE_MIN_DELAY=0.2
+UPSTREAM_HEDGE_MIN_SAMPLES=20
 
 # Configurações do servidor
 HOST=0.0.0.0
 PORT=8000
+SERVER_RELOAD=true
+# produção: gunicorn -c gunicorn.conf.py (0 usa um worker por núcleo)
+SERVER_WORKERS=0
+SERVER_TIMEOUT=120
 
 # Configurações de logging
 LOG_LEVEL=info
 
 # Configurações do frontend
 FRONTEND_URL=http://localhost:8080
+
+# Configurações de análise de texto
+# INDICATORS_FILE=indicators.json
+
+# Configurações do classificador local
+# LOCAL_MODEL_PATH=local_model.json
+LOCAL_MODEL_THRESHOLD=0.95
+
+# Configurações de execução em segundo plano
+EXECUTOR_THREAD_WORKERS=4
+EXECUTOR_PROCESS_WORKERS=2
+EXECUTOR_MAX_QUEUE=64
+NLP_PROCESS_MIN_CHARS=20000
+
+# Configurações de upload
+UPLOAD_MAX_FILE_SIZE_MB=50
+UPLOAD_CHUNK_SIZE=1048576
+PDF_MAX_PAGES=200
+MAX_EXTRACTED_CHARS=200000
+PDF_STOP_AT_PROMPT_BUDGET=true
+# copia o PDF para cada processo; útil para PDFs longos com EXECUTOR_PROCESS_WORKERS > 0
+PDF_PARALLEL_PAGES=false
+PDF_PAGES_PER_TASK=4
+
+# Configurações de importação de caixas de email
+# IMPORT_JOBS_DIR=imports
+IMPORT_MAX_FILE_SIZE_MB=1024
+IMPORT_MAX_CONCURRENCY=4
+IMPORT_MAX_MESSAGES=100000
+IMPORT_RESULT_TTL_SECONDS=86400
+
+# Configurações da fila de jobs
+JOBS_SQLITE_PATH=jobs.sqlite3
+JOBS_WORKERS=4
+JOBS_MAX_QUEUED=10000
+JOBS_RESULT_TTL_SECONDS=86400
+JOBS_MAX_WAIT_SECONDS=30
+JOBS_LEASE_SECONDS=60
+
+# Configurações de tracing
+# none | log | otlp
+TRACING_EXPORTER=none
+TRACING_OTLP_ENDPOINT=http://localhost:4318
+TRACING_SERVICE_NAME=email-classifier
+DEBUG_TIMINGS=false
+
+# Configurações de NLP
+# gerado com: cd src && python -m services.nlp_resources nlp_bundle.pickle
+# NLP_BUNDLE_PATH=nlp_bundle.pickle
+NLP_ALLOW_DOWNLOAD=false
+NLP_FAST_TOKENIZER=true
+STEM_CACHE_SIZE=50000
+# STEM_VOCABULARY_FILE=vocabulario.txt
+
+# Configurações de processamento em lote
+BATCH_MAX_CONCURRENCY=8
+BATCH_MAX_ITEMS=500
+
+# Configurações de cache
+CACHE_ENABLED=true
+CACHE_MAX_ENTRIES=10000
+CACHE_TTL_SECONDS=86400
+# CACHE_SQLITE_PATH=cache.sqlite3
+SINGLE_FLIGHT_ENABLED=true
+
+# Configurações de quase-duplicatas
+NEAR_DUPLICATE_ENABLED=false
+NEAR_DUPLICATE_THRESHOLD=0.9
+NEAR_DUPLICATE_MAX_ENTRIES=50000
+NEAR_DUPLICATE_MIN_TOKENS=15
+# NEAR_DUPLICATE_SQLITE_PATH=near_duplicates.sqlite3
+
+# Configurações de classificação agrupada
+PACKED_CLASSIFICATION_ENABLED=false
+PACKED_MAX_ITEMS=20
+PACKED_MAX_TOKENS=3000
+PACKED_ITEM_MAX_TOKENS=300
+PACKED_MAX_WAIT_MS=50
+PACKED_MAX_PENDING=100
 """
     
     if not os.path.exists('.env'):
@@ -1,13 +1,17 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 import uvicorn
+import asyncio
 import logging
+import time
 
-from services.registry import ai_classifier
+from services.registry import ai_classifier, work_executor, import_job_manager, job_queue, tracer
+from services.metrics import HTTP_IN_FLIGHT, HTTP_REQUEST_SECONDS
+from services.nlp_resources import get_nlp_resources
 from config.settings import get_settings
 
-from routes import classification, health
+from routes import classification, health, imports, jobs
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -17,12 +21,19 @@ settings = get_settings()
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     logger.info("Inicializando serviços...")
+    # os recursos de NLP carregam em segundo plano; /ready responde 503 até terminarem
+    nlp_warmup = asyncio.create_task(work_executor.run_light(get_nlp_resources))
     await ai_classifier.initialize()
+    await job_queue.start()
     logger.info("API pronta para uso!")
     yield
     logger.info("Finalizando serviços...")
-    if ai_classifier.client:
-        await ai_classifier.client.aclose()
+    await job_queue.shutdown()
+    await import_job_manager.shutdown()
+    await ai_classifier.close()
+    await tracer.close()
+    await asyncio.gather(nlp_warmup, return_exceptions=True)
+    work_executor.shutdown()
 
 app = FastAPI(
     title="Email Classification API",
@@ -38,14 +49,38 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    start_time = time.perf_counter()
+    status_code = 500
+    with tracer.trace("http.request", **{"http.method": request.method}) as span:
+        try:
+            with HTTP_IN_FLIGHT.track():
+                response = await call_next(request)
+            status_code = response.status_code
+            return response
+        finally:
+            # usa o caminho da rota e não a URL, para não multiplicar séries por id de job
+            route = getattr(request.scope.get("route"), "path", "unmatched")
+            HTTP_REQUEST_SECONDS.observe(
+                time.perf_counter() - start_time,
+                method=request.method,
+                route=route,
+                status_code=str(status_code)
+            )
+            if span is not None:
+                span.attributes.update({"http.route": route, "http.status_code": status_code})
+
 app.include_router(health.router)
 app.include_router(classification.router)
+app.include_router(imports.router)
+app.include_router(jobs.router)
 
 if __name__ == "__main__":
     uvicorn.run(
         "main:app",
         host=settings.HOST,
         port=settings.PORT,
-        reload=True,
+        reload=settings.SERVER_RELOAD,
         log_level=settings.LOG_LEVEL
     )
\ No newline at end of file
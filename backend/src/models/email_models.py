@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field, validator
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 from enum import Enum
 
 class EmailCategory(str, Enum):
@@ -39,4 +39,53 @@ class EmailClassificationResponse(BaseModel):
                     "keywords": ["sistema", "vendas", "erro", "problema"]
                 }
             }
-        }
\ No newline at end of file
+        }
+
+class BatchEmailItem(BaseModel):
+    email_content: str = Field(..., description="Conteúdo do email em texto")
+    sender_name: Optional[str] = Field(None, description="Nome do remetente")
+    subject: Optional[str] = Field(None, description="Assunto do email")
+
+class BatchClassificationRequest(BaseModel):
+    emails: List[BatchEmailItem] = Field(..., min_length=1, description="Lista de emails a serem classificados")
+
+class BatchItemResult(BaseModel):
+    index: int = Field(..., description="Posição do email na requisição")
+    success: bool = Field(..., description="Indica se o email foi processado com sucesso")
+    result: Optional[EmailClassificationResponse] = Field(None, description="Resultado da classificação")
+    error: Optional[str] = Field(None, description="Mensagem de erro do item, quando houver")
+    filename: Optional[str] = Field(None, description="Nome do arquivo de origem, quando houver")
+
+class BatchClassificationResponse(BaseModel):
+    total: int = Field(..., description="Quantidade de emails recebidos")
+    succeeded: int = Field(..., description="Quantidade de emails classificados com sucesso")
+    failed: int = Field(..., description="Quantidade de emails com erro")
+    processing_time: float = Field(..., description="Tempo total de processamento do lote em segundos")
+    results: List[BatchItemResult] = Field(..., description="Resultados por email, na ordem de envio")
+
+class ImportJobStatus(BaseModel):
+    job_id: str = Field(..., description="Identificador da importação")
+    filename: str = Field(..., description="Nome do arquivo importado")
+    status: str = Field(..., description="Estado da importação: queued, running, completed, failed ou cancelled")
+    processed: int = Field(..., description="Quantidade de emails processados até o momento")
+    succeeded: int = Field(..., description="Quantidade de emails classificados com sucesso")
+    failed: int = Field(..., description="Quantidade de emails com erro")
+    truncated: bool = Field(..., description="Indica se o arquivo excedeu o número máximo de emails")
+    error: Optional[str] = Field(None, description="Mensagem de erro da importação, quando houver")
+    created_at: str = Field(..., description="Data de criação da importação")
+    started_at: Optional[str] = Field(None, description="Data de início do processamento")
+    finished_at: Optional[str] = Field(None, description="Data de término do processamento")
+    results_url: str = Field(..., description="Endereço dos resultados em JSONL")
+
+class JobSubmitRequest(BatchEmailItem):
+    priority: int = Field(0, ge=-10, le=10, description="Prioridade do job; valores maiores são executados antes")
+
+class JobStatus(BaseModel):
+    job_id: str = Field(..., description="Identificador do job")
+    status: str = Field(..., description="Estado do job: queued, running, completed, failed ou cancelled")
+    priority: int = Field(..., description="Prioridade do job")
+    result: Optional[EmailClassificationResponse] = Field(None, description="Resultado da classificação, quando concluído")
+    error: Optional[str] = Field(None, description="Mensagem de erro do job, quando houver")
+    created_at: float = Field(..., description="Momento da criação (timestamp Unix)")
+    started_at: Optional[float] = Field(None, description="Momento do início da execução (timestamp Unix)")
+    finished_at: Optional[float] = Field(None, description="Momento do término (timestamp Unix)")
@@ -1,12 +1,20 @@
 from fastapi import APIRouter, File, UploadFile, Form, HTTPException, Depends
-from typing import Optional
-from datetime import datetime
+from fastapi.responses import StreamingResponse
+from typing import Optional, List, Dict, Any
+import json
+import time
 import logging
-from services.email_processor import EmailProcessor
-from services.ai_classifier import AIClassifier
+from config.settings import get_settings
 from services.file_handler import FileHandler
-from services.registry import email_processor, ai_classifier, file_handler
-from models.email_models import EmailClassificationResponse
+from services.classification_pipeline import ClassificationPipeline
+from services.work_executor import ExecutorSaturatedError
+from services.registry import file_handler, classification_pipeline
+from models.email_models import (
+    EmailClassificationResponse,
+    BatchClassificationRequest,
+    BatchClassificationResponse,
+    BatchItemResult,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -15,53 +23,34 @@ router = APIRouter(
     responses={404: {"description": "Not found"}},
 )
 
-def get_email_processor():
-    return email_processor
-
-def get_ai_classifier():
-    return ai_classifier
-
 def get_file_handler():
     return file_handler
 
+def get_classification_pipeline():
+    return classification_pipeline
+
+def _overloaded(error: ExecutorSaturatedError) -> HTTPException:
+    return HTTPException(
+        status_code=503,
+        detail=f"Servidor sobrecarregado, tente novamente: {str(error)}",
+        headers={"Retry-After": "1"}
+    )
+
 @router.post("/classify-email", response_model=EmailClassificationResponse)
 async def classify_email_text(
     email_content: str = Form(..., description="Conteúdo do email em texto"),
     sender_name: Optional[str] = Form(None, description="Nome do remetente"),
     subject: Optional[str] = Form(None, description="Assunto do email"),
-    email_processor: EmailProcessor = Depends(get_email_processor),
-    ai_classifier: AIClassifier = Depends(get_ai_classifier),
+    pipeline: ClassificationPipeline = Depends(get_classification_pipeline),
 ):
     """Classifica um email enviado como texto direto"""
     try:
-        processed_content = email_processor.preprocess_text(email_content)
+        email_data = await pipeline.build_email_data(email_content, sender_name, subject)
         
-        email_data = {
-            "content": processed_content,
-            "original_content": email_content,
-            "sender_name": sender_name,
-            "subject": subject,
-            "timestamp": datetime.now().isoformat()
-        }
-        
-        classification_result = await ai_classifier.classify_email(email_data)
-        
-        suggested_response = await ai_classifier.generate_response(
-            email_data, classification_result["category"]
-        )
-        
-        return EmailClassificationResponse(
-            category=classification_result["category"],
-            confidence_score=classification_result["confidence"],
-            suggested_response=suggested_response,
-            processing_time=classification_result["processing_time"],
-            metadata={
-                "sender": sender_name,
-                "subject": subject,
-                "timestamp": email_data["timestamp"]
-            }
-        )
+        return await pipeline.run(email_data)
         
+    except ExecutorSaturatedError as e:
+        raise _overloaded(e)
     except Exception as e:
         logger.error(f"Erro na classificação: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Erro interno: {str(e)}")
@@ -71,8 +60,7 @@ async def classify_email_file(
     file: UploadFile = File(..., description="Arquivo de email (.txt ou .pdf)"),
     sender_name: Optional[str] = Form(None, description="Nome do remetente"),
     subject: Optional[str] = Form(None, description="Assunto do email"),
-    email_processor: EmailProcessor = Depends(get_email_processor),
-    ai_classifier: AIClassifier = Depends(get_ai_classifier),
+    pipeline: ClassificationPipeline = Depends(get_classification_pipeline),
     file_handler: FileHandler = Depends(get_file_handler)
 ):
     """Classifica um email enviado como arquivo"""
@@ -85,37 +73,162 @@ async def classify_email_file(
         
         file_content = await file_handler.extract_content(file)
         
-        processed_content = email_processor.preprocess_text(file_content)
+        email_data = await pipeline.build_email_data(
+            file_content, sender_name, subject, filename=file.filename
+        )
         
-        email_data = {
-            "content": processed_content,
-            "original_content": file_content,
-            "sender_name": sender_name,
-            "subject": subject,
-            "filename": file.filename,
-            "timestamp": datetime.now().isoformat()
-        }
+        return await pipeline.run(email_data)
         
-        classification_result = await ai_classifier.classify_email(email_data)
-        suggested_response = await ai_classifier.generate_response(
-            email_data, classification_result["category"]
-        )
+    except HTTPException:
+        raise
+    except ExecutorSaturatedError as e:
+        raise _overloaded(e)
+    except Exception as e:
+        logger.error(f"Erro no processamento do arquivo: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Erro interno: {str(e)}")
+
+def _sse_event(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+def _stream_classification(pipeline: ClassificationPipeline, email_data: Dict[str, Any]) -> StreamingResponse:
+    async def event_stream():
+        try:
+            async for event, data in pipeline.stream(email_data):
+                yield _sse_event(event, data)
+        except Exception as e:
+            logger.error(f"Erro no streaming da classificação: {str(e)}")
+            yield _sse_event("error", {"detail": f"Erro interno: {str(e)}"})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.post("/classify-email/stream")
+async def classify_email_text_stream(
+    email_content: str = Form(..., description="Conteúdo do email em texto"),
+    sender_name: Optional[str] = Form(None, description="Nome do remetente"),
+    subject: Optional[str] = Form(None, description="Assunto do email"),
+    pipeline: ClassificationPipeline = Depends(get_classification_pipeline),
+):
+    """Classifica um email em texto e transmite a resposta sugerida via Server-Sent Events"""
+    try:
+        email_data = await pipeline.build_email_data(email_content, sender_name, subject)
+        
+    except ExecutorSaturatedError as e:
+        raise _overloaded(e)
+    except Exception as e:
+        logger.error(f"Erro na classificação: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Erro interno: {str(e)}")
+    
+    return _stream_classification(pipeline, email_data)
+
+@router.post("/classify-email-file/stream")
+async def classify_email_file_stream(
+    file: UploadFile = File(..., description="Arquivo de email (.txt ou .pdf)"),
+    sender_name: Optional[str] = Form(None, description="Nome do remetente"),
+    subject: Optional[str] = Form(None, description="Assunto do email"),
+    pipeline: ClassificationPipeline = Depends(get_classification_pipeline),
+    file_handler: FileHandler = Depends(get_file_handler)
+):
+    """Classifica um email enviado como arquivo e transmite a resposta sugerida via Server-Sent Events"""
+    try:
+        if not file_handler.is_valid_file_type(file.filename):
+            raise HTTPException(
+                status_code=400, 
+                detail="Tipo de arquivo não suportado. Use apenas .txt ou .pdf"
+            )
         
-        return EmailClassificationResponse(
-            category=classification_result["category"],
-            confidence_score=classification_result["confidence"],
-            suggested_response=suggested_response,
-            processing_time=classification_result["processing_time"],
-            metadata={
-                "sender": sender_name,
-                "subject": subject,
-                "filename": file.filename,
-                "timestamp": email_data["timestamp"]
-            }
+        file_content = await file_handler.extract_content(file)
+        
+        email_data = await pipeline.build_email_data(
+            file_content, sender_name, subject, filename=file.filename
         )
         
     except HTTPException:
         raise
+    except ExecutorSaturatedError as e:
+        raise _overloaded(e)
     except Exception as e:
         logger.error(f"Erro no processamento do arquivo: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Erro interno: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Erro interno: {str(e)}")
+    
+    return _stream_classification(pipeline, email_data)
+
+def _check_batch_size(total: int):
+    max_items = get_settings().BATCH_MAX_ITEMS
+    if total > max_items:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Lote muito grande. Máximo permitido: {max_items} emails"
+        )
+
+def _build_batch_response(results: List[BatchItemResult], start_time: float) -> BatchClassificationResponse:
+    succeeded = sum(1 for item in results if item.success)
+    return BatchClassificationResponse(
+        total=len(results),
+        succeeded=succeeded,
+        failed=len(results) - succeeded,
+        processing_time=time.time() - start_time,
+        results=results
+    )
+
+@router.post("/classify-emails/batch", response_model=BatchClassificationResponse)
+async def classify_emails_batch(
+    request: BatchClassificationRequest,
+    pipeline: ClassificationPipeline = Depends(get_classification_pipeline),
+):
+    """Classifica uma lista de emails enviados como JSON"""
+    start_time = time.time()
+    _check_batch_size(len(request.emails))
+    
+    try:
+        item_results = await pipeline.run_many([item.model_dump() for item in request.emails])
+        
+        return _build_batch_response(
+            [BatchItemResult(**item) for item in item_results], start_time
+        )
+        
+    except Exception as e:
+        logger.error(f"Erro na classificação em lote: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Erro interno: {str(e)}")
+
+@router.post("/classify-emails/batch-files", response_model=BatchClassificationResponse)
+async def classify_email_files_batch(
+    files: List[UploadFile] = File(..., description="Arquivos de email (.txt ou .pdf)"),
+    sender_name: Optional[str] = Form(None, description="Nome do remetente aplicado a todos os arquivos"),
+    subject: Optional[str] = Form(None, description="Assunto aplicado a todos os arquivos"),
+    pipeline: ClassificationPipeline = Depends(get_classification_pipeline),
+    file_handler: FileHandler = Depends(get_file_handler)
+):
+    """Classifica vários emails enviados como arquivos"""
+    start_time = time.time()
+    _check_batch_size(len(files))
+    
+    try:
+        async def load_content(index: int) -> str:
+            try:
+                return await file_handler.extract_content(files[index])
+            except HTTPException as e:
+                # o erro do item mantém só a mensagem, sem o status HTTP
+                raise ValueError(e.detail)
+        
+        # extração e classificação de cada arquivo ocupam a mesma vaga do lote
+        item_results = await pipeline.run_many(
+            [
+                {"sender_name": sender_name, "subject": subject, "filename": file.filename}
+                for file in files
+            ],
+            load_content=load_content
+        )
+        results = [
+            BatchItemResult(**item, filename=files[item["index"]].filename)
+            for item in item_results
+        ]
+        
+        return _build_batch_response(results, start_time)
+        
+    except Exception as e:
+        logger.error(f"Erro no processamento do lote de arquivos: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Erro interno: {str(e)}")
@@ -1,5 +1,9 @@
 from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse, JSONResponse
 from datetime import datetime
+from services.registry import ai_classifier, work_executor, job_queue
+from services.metrics import metrics
+from services.nlp_resources import get_nlp_resources, nlp_resources_loaded
 
 router = APIRouter(
     tags=["health"],
@@ -18,12 +22,61 @@ async def root():
 @router.get("/health")
 async def health_check():
     """Endpoint de verificação de saúde da API"""
+    upstream = ai_classifier.upstream.stats()
+    circuit_states = {
+        provider["circuit_breaker"].get("state", "closed") for provider in upstream["providers"]
+    }
     return {
-        "status": "healthy",
+        # com circuitos abertos a API segue respondendo, por outro provedor ou só com as regras locais
+        "status": "healthy" if circuit_states == {"closed"} else "degraded",
         "services": {
-            "email_processor": "active",
-            "ai_classifier": "active",
+            "email_processor": "active" if nlp_resources_loaded() else "warming_up",
+            "ai_classifier": _ai_classifier_status(circuit_states),
             "file_handler": "active"
         },
+        "cache": _cache_stats(),
+        "near_duplicates": ai_classifier.near_duplicates.stats() if ai_classifier.near_duplicates else {"enabled": False},
+        "executor": work_executor.stats(),
+        "upstream": upstream,
+        "jobs": await job_queue.stats(),
+        "nlp": get_nlp_resources().to_dict() if nlp_resources_loaded() else None,
+        "timestamp": datetime.now().isoformat()
+    }
+
+@router.get("/ready")
+async def readiness_check():
+    """Indica se os recursos de NLP já foram carregados e a API pode receber tráfego"""
+    if not nlp_resources_loaded():
+        return JSONResponse(
+            status_code=503,
+            content={"status": "warming_up", "timestamp": datetime.now().isoformat()}
+        )
+    return {
+        "status": "ready",
+        "nlp": get_nlp_resources().to_dict(),
         "timestamp": datetime.now().isoformat()
-    }
\ No newline at end of file
+    }
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """Métricas no formato de exposição do Prometheus"""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@router.get("/cache/stats")
+async def cache_stats():
+    """Estatísticas de acertos e erros do cache de resultados"""
+    return _cache_stats()
+
+def _cache_stats():
+    if ai_classifier.cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **ai_classifier.cache.stats()}
+
+def _ai_classifier_status(circuit_states):
+    if circuit_states == {"closed"}:
+        return "active"
+    if circuit_states == {"open"}:
+        return "fallback"
+    if "closed" in circuit_states:
+        return "degraded"
+    return "recovering"
\ No newline at end of file
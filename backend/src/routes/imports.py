@@ -0,0 +1,80 @@
+from fastapi import APIRouter, File, UploadFile, HTTPException, Depends
+from fastapi.responses import FileResponse
+import os
+import logging
+from services.mail_parser import is_mailbox_file
+from services.import_jobs import ImportJob, ImportJobManager
+from services.work_executor import ExecutorSaturatedError
+from services.registry import import_job_manager
+from models.email_models import ImportJobStatus
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(
+    tags=["imports"],
+    responses={404: {"description": "Not found"}},
+)
+
+def get_import_job_manager():
+    return import_job_manager
+
+def _job_status(job: ImportJob) -> ImportJobStatus:
+    return ImportJobStatus(**job.to_dict(), results_url=f"/imports/{job.job_id}/results")
+
+def _get_job(manager: ImportJobManager, job_id: str) -> ImportJob:
+    job = manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Importação não encontrada: {job_id}")
+    return job
+
+@router.post("/imports", response_model=ImportJobStatus, status_code=202)
+async def create_import(
+    file: UploadFile = File(..., description="Caixa de email (.mbox, .eml ou .zip com esses arquivos)"),
+    manager: ImportJobManager = Depends(get_import_job_manager)
+):
+    """Inicia a classificação em segundo plano de todos os emails de um arquivo"""
+    if not is_mailbox_file(file.filename):
+        raise HTTPException(
+            status_code=400,
+            detail="Tipo de arquivo não suportado. Use .mbox, .eml ou .zip"
+        )
+
+    try:
+        job = await manager.submit(file.file, file.filename)
+        return _job_status(job)
+
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except ExecutorSaturatedError as e:
+        raise HTTPException(
+            status_code=503,
+            detail=f"Servidor sobrecarregado, tente novamente: {str(e)}",
+            headers={"Retry-After": "1"}
+        )
+    except Exception as e:
+        logger.error(f"Erro ao iniciar importação: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Erro interno: {str(e)}")
+
+@router.get("/imports/{job_id}", response_model=ImportJobStatus)
+async def get_import(
+    job_id: str,
+    manager: ImportJobManager = Depends(get_import_job_manager)
+):
+    """Consulta o progresso de uma importação"""
+    return _job_status(_get_job(manager, job_id))
+
+@router.get("/imports/{job_id}/results")
+async def get_import_results(
+    job_id: str,
+    manager: ImportJobManager = Depends(get_import_job_manager)
+):
+    """Baixa os resultados da importação em JSONL, inclusive parciais"""
+    job = _get_job(manager, job_id)
+    if not os.path.exists(job.results_path):
+        raise HTTPException(status_code=404, detail="Resultados ainda não disponíveis")
+
+    return FileResponse(
+        job.results_path,
+        media_type="application/x-ndjson",
+        filename=f"{job.job_id}.jsonl"
+    )
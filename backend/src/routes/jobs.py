@@ -0,0 +1,103 @@
+from fastapi import APIRouter, File, UploadFile, Form, HTTPException, Depends, Query
+from typing import Optional, Dict, Any
+import logging
+from config.settings import get_settings
+from services.file_handler import FileHandler
+from services.job_queue import JobQueue, JobQueueFullError, FINISHED_STATUSES
+from services.work_executor import ExecutorSaturatedError
+from services.registry import file_handler, job_queue
+from models.email_models import JobSubmitRequest, JobStatus
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(
+    tags=["jobs"],
+    responses={404: {"description": "Not found"}},
+)
+
+def get_job_queue():
+    return job_queue
+
+def get_file_handler():
+    return file_handler
+
+async def _submit(queue: JobQueue, payload: Dict[str, Any], priority: int) -> Dict[str, Any]:
+    try:
+        return await queue.submit(payload, priority)
+    except JobQueueFullError as e:
+        raise HTTPException(
+            status_code=503,
+            detail=f"Servidor sobrecarregado, tente novamente: {str(e)}",
+            headers={"Retry-After": "5"}
+        )
+
+async def _get_job(queue: JobQueue, job_id: str) -> Dict[str, Any]:
+    job = await queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job não encontrado: {job_id}")
+    return job
+
+@router.post("/jobs", response_model=JobStatus, status_code=202)
+async def submit_job(
+    request: JobSubmitRequest,
+    queue: JobQueue = Depends(get_job_queue)
+):
+    """Enfileira a classificação de um email e retorna o identificador do job"""
+    payload = request.model_dump(exclude={"priority"})
+    return await _submit(queue, payload, request.priority)
+
+@router.post("/jobs/file", response_model=JobStatus, status_code=202)
+async def submit_file_job(
+    file: UploadFile = File(..., description="Arquivo de email (.txt ou .pdf)"),
+    sender_name: Optional[str] = Form(None, description="Nome do remetente"),
+    subject: Optional[str] = Form(None, description="Assunto do email"),
+    priority: int = Form(0, ge=-10, le=10, description="Prioridade do job"),
+    queue: JobQueue = Depends(get_job_queue),
+    file_handler: FileHandler = Depends(get_file_handler)
+):
+    """Enfileira a classificação de um email enviado como arquivo"""
+    try:
+        file_content = await file_handler.extract_content(file)
+    except ExecutorSaturatedError as e:
+        raise HTTPException(
+            status_code=503,
+            detail=f"Servidor sobrecarregado, tente novamente: {str(e)}",
+            headers={"Retry-After": "1"}
+        )
+
+    payload = {
+        "email_content": file_content,
+        "sender_name": sender_name,
+        "subject": subject,
+        "filename": file.filename
+    }
+    return await _submit(queue, payload, priority)
+
+@router.get("/jobs/{job_id}", response_model=JobStatus)
+async def get_job(
+    job_id: str,
+    wait: float = Query(0, ge=0, description="Segundos a aguardar pela conclusão (long-poll)"),
+    queue: JobQueue = Depends(get_job_queue)
+):
+    """Consulta o estado e o resultado de um job, opcionalmente aguardando a conclusão"""
+    if wait > 0:
+        job = await queue.wait(job_id, min(wait, get_settings().JOBS_MAX_WAIT_SECONDS))
+        if job is None:
+            raise HTTPException(status_code=404, detail=f"Job não encontrado: {job_id}")
+        return job
+
+    return await _get_job(queue, job_id)
+
+@router.delete("/jobs/{job_id}", response_model=JobStatus)
+async def cancel_job(
+    job_id: str,
+    queue: JobQueue = Depends(get_job_queue)
+):
+    """Cancela um job que ainda não terminou"""
+    job = await _get_job(queue, job_id)
+    if job["status"] in FINISHED_STATUSES:
+        raise HTTPException(status_code=409, detail=f"Job já finalizado: {job['status']}")
+
+    await queue.cancel(job_id)
+    # um job em execução leva um instante para registrar o cancelamento
+    return await queue.wait(job_id, 1.0)
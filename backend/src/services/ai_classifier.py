@@ -1,88 +1,277 @@
 
 import time
 import json
+import asyncio
 import logging
-from typing import Dict, Any
-import httpx
+from typing import Dict, Any, Optional, Tuple, AsyncIterator
 from config.settings import get_settings
-from services.email_processor import EmailProcessor
-from utils.prompt_utils import build_classification_prompt, build_response_prompt, truncate_prompt
+from services.email_processor import EmailProcessor, TextAnalysis
+from services.result_cache import ResultCache
+from services.near_duplicate_index import SimHashIndex
+from services.classification_packer import AdmissionSlot, ClassificationPacker
+from services.single_flight import SingleFlight
+from services.upstream_client import UpstreamClient
+from services.local_classifier import load_local_classifier
+from services.metrics import FALLBACKS, CACHE_LOOKUPS
+from services.tracing import trace_stage
+from utils.prompt_utils import build_classification_prompt, build_response_prompt, PROMPT_VERSION
 
 
 logger = logging.getLogger(__name__)
 
+class StreamInterruptedError(Exception):
+    pass
+
 class AIClassifier:    
-    def __init__(self):
+    def __init__(self, email_processor: Optional[EmailProcessor] = None):
         self.settings = get_settings()
-        self.email_processor = EmailProcessor()
-        self.client = None
+        self.email_processor = email_processor or EmailProcessor()
+        self.upstream = UpstreamClient(self.settings)
+        # qualquer provedor do pool pode responder; a chave muda quando os modelos do pool mudam
+        self.model_key = "|".join(self.upstream.pool.models(self.settings.OPENAI_MODEL))
+        self.cache: Optional[ResultCache] = None
+        
+        if self.settings.CACHE_ENABLED:
+            self.cache = ResultCache(
+                max_entries=self.settings.CACHE_MAX_ENTRIES,
+                ttl_seconds=self.settings.CACHE_TTL_SECONDS,
+                sqlite_path=self.settings.CACHE_SQLITE_PATH,
+                disk_max_entries=self.settings.CACHE_DISK_MAX_ENTRIES
+            )
+        
+        self.local_classifier = load_local_classifier(self.settings.LOCAL_MODEL_PATH)
+        self.near_duplicates: Optional[SimHashIndex] = None
+        
+        if self.settings.NEAR_DUPLICATE_ENABLED:
+            self.near_duplicates = SimHashIndex(
+                threshold=self.settings.NEAR_DUPLICATE_THRESHOLD,
+                max_entries=self.settings.NEAR_DUPLICATE_MAX_ENTRIES,
+                min_tokens=self.settings.NEAR_DUPLICATE_MIN_TOKENS,
+                sqlite_path=self.settings.NEAR_DUPLICATE_SQLITE_PATH
+            )
+        
+        self.classification_flights: Optional[SingleFlight] = None
+        self.response_flights: Optional[SingleFlight] = None
+        
+        if self.settings.SINGLE_FLIGHT_ENABLED:
+            self.classification_flights = SingleFlight("classification")
+            self.response_flights = SingleFlight("response")
+        
+        self.packer: Optional[ClassificationPacker] = None
+        
+        if self.settings.PACKED_CLASSIFICATION_ENABLED:
+            self.packer = ClassificationPacker(
+                self._call_openai_packed_classification,
+                max_items=self.settings.PACKED_MAX_ITEMS,
+                max_tokens=self.settings.PACKED_MAX_TOKENS,
+                item_max_tokens=self.settings.PACKED_ITEM_MAX_TOKENS,
+                max_wait=self.settings.PACKED_MAX_WAIT_MS / 1000,
+                max_pending=self.settings.PACKED_MAX_PENDING
+            )
         
     async def initialize(self):
-        self.client = httpx.AsyncClient(timeout=30.0)
+        await self.upstream.start()
+    
+    async def close(self):
+        if self.packer is not None:
+            await self.packer.close()
+        await self.upstream.close()
+        
+    def _cache_key(self, namespace: str, email_data: Dict[str, Any], *extra: str) -> str:
+        return ResultCache.build_key(
+            namespace,
+            email_data.get('original_content', ''),
+            email_data.get('subject'),
+            email_data.get('sender_name'),
+            self.model_key,
+            PROMPT_VERSION,
+            *extra
+        )
+    
+    async def _cache_get(self, namespace: str, cache_key: Optional[str]) -> Optional[Any]:
+        if not cache_key:
+            return None
+        cached = await self.cache.get(cache_key)
+        CACHE_LOOKUPS.inc(namespace=namespace, result="miss" if cached is None else "hit")
+        return cached
+    
+    def _get_text_analysis(self, email_data: Dict[str, Any]) -> TextAnalysis:
+        text_analysis = email_data.get('analysis')
+        if not isinstance(text_analysis, TextAnalysis):
+            text_analysis = self.email_processor.analyze(email_data.get('original_content', ''))
+        return text_analysis
+    
+    def _get_analysis(self, email_data: Dict[str, Any]) -> Dict[str, Any]:
+        return self._get_text_analysis(email_data).to_dict()
+    
+    def _classify_locally(self, email_data: Dict[str, Any]) -> Optional[Tuple[str, float]]:
+        if self.local_classifier is None:
+            return None
+        
+        stems = self._get_text_analysis(email_data).stems
+        if not stems:
+            return None
         
-    async def classify_email(self, email_data: Dict[str, Any]) -> Dict[str, Any]:
+        return self.local_classifier.predict(stems)
+    
+    def _near_duplicate_fingerprint(self, email_data: Dict[str, Any]) -> Optional[int]:
+        if self.near_duplicates is None:
+            return None
+        return self.near_duplicates.fingerprint(self._get_text_analysis(email_data).stems)
+    
+    async def classify_email(
+        self,
+        email_data: Dict[str, Any],
+        packed: bool = False,
+        slot: Optional[AdmissionSlot] = None
+    ) -> Dict[str, Any]:
+        if self.classification_flights is None:
+            return await self._classify_email(email_data, packed, slot)
+        
+        # emails idênticos simultâneos aguardam a mesma classificação; o modo entra na chave
+        # para que uma chamada individual não receba o resultado agrupado (e vice-versa)
+        result, shared = await self.classification_flights.do(
+            self._cache_key("classification", email_data, "packed" if packed else "single"),
+            lambda: self._classify_email(email_data, packed, slot)
+        )
+        # cada chamador recebe a sua cópia do resultado compartilhado
+        return {**result, "coalesced": True} if shared else dict(result)
+    
+    async def _classify_email(
+        self,
+        email_data: Dict[str, Any],
+        packed: bool = False,
+        slot: Optional[AdmissionSlot] = None
+    ) -> Dict[str, Any]:
         start_time = time.time()
+        cache_key = self._cache_key("classification", email_data) if self.cache else None
+        
+        cached = await self._cache_get("classification", cache_key)
+        if cached is not None:
+            return {
+                **cached,
+                "processing_time": time.time() - start_time,
+                "cache_hit": True,
+                "source": "cache"
+            }
         
         try:
-            analysis = self.email_processor.analyze_email_structure(
-                email_data.get('original_content', '')
-            )
+            analysis = self._get_analysis(email_data)
             
-            classification_prompt = build_classification_prompt(
-                email_data, analysis
-            )
+            fingerprint = self._near_duplicate_fingerprint(email_data)
+            if fingerprint is not None:
+                with trace_stage("near_duplicate_lookup"):
+                    match = self.near_duplicates.find(fingerprint)
+                if match is not None:
+                    return {
+                        "category": match["category"],
+                        "confidence": match["confidence"],
+                        "processing_time": time.time() - start_time,
+                        "analysis": analysis,
+                        "cache_hit": False,
+                        "source": "near_duplicate",
+                        "near_duplicate": {"id": match["id"], "similarity": match["similarity"]}
+                    }
             
-            classification_result = await self._call_openai_classification(
-                classification_prompt
-            )
+            local_prediction = self._classify_locally(email_data)
+            if local_prediction and local_prediction[1] >= self.settings.LOCAL_MODEL_THRESHOLD:
+                return {
+                    "category": local_prediction[0],
+                    "confidence": local_prediction[1],
+                    "processing_time": time.time() - start_time,
+                    "analysis": analysis,
+                    "cache_hit": False,
+                    "source": "local_model"
+                }
             
-            category, confidence = self._process_classification_response(
-                classification_result, analysis
-            )
+            if self.upstream.short_circuit():
+                # API fora do ar: vai direto para as regras, sem esperar timeout
+                return await self._fallback_classification(email_data)
+            
+            packed_result = None
+            if packed and self.packer is not None:
+                with trace_stage("upstream_packed_classification"):
+                    packed_result = await self.packer.classify(email_data, analysis, slot)
+            
+            if packed_result is not None:
+                category = packed_result[0]
+                confidence = min(max(self._adjust_confidence(packed_result[1], analysis, category), 0.0), 1.0)
+                fell_back = False
+            else:
+                with trace_stage("prompt_build"):
+                    classification_prompt = build_classification_prompt(
+                        email_data, analysis, max_tokens=self.settings.PROMPT_MAX_TOKENS
+                    )
+                
+                classification_result = await self._call_openai_classification(
+                    classification_prompt
+                )
+                
+                category, confidence, fell_back = self._process_classification_response(
+                    classification_result, analysis
+                )
             
             processing_time = time.time() - start_time
             
-            return {
+            # uma resposta ilegível do LLM não pode ficar no cache pelo TTL inteiro
+            if cache_key and not fell_back:
+                await self.cache.set(cache_key, {
+                    "category": category,
+                    "confidence": confidence,
+                    "analysis": analysis
+                })
+            
+            # só respostas do LLM entram no índice, para que aproximações não se acumulem
+            if fingerprint is not None and not fell_back:
+                await self.near_duplicates.add(fingerprint, category, confidence)
+            
+            result = {
                 "category": category,
                 "confidence": confidence,
                 "processing_time": processing_time,
-                "analysis": analysis
+                "analysis": analysis,
+                "cache_hit": False,
+                "source": "llm"
             }
+            if packed_result is not None:
+                result["packed"] = True
+            return result
             
         except Exception as e:
             logger.error(f"Erro na classificação: {str(e)}")
             return await self._fallback_classification(email_data)
     
     async def _call_openai_classification(self, prompt: str) -> Dict[str, Any]:
-        headers = {
-            "Authorization": f"Bearer {self.settings.OPENAI_API_KEY}",
-            "Content-Type": "application/json"
-        }
-
-        promptTruncated = truncate_prompt(prompt)
-        
         payload = {
             "model": f"{self.settings.OPENAI_MODEL}",
             "messages": [
                 {"role": "system", "content": "Você é um especialista em classificação de emails corporativos. Responda sempre no formato JSON solicitado."},
-                {"role": "user", "content": promptTruncated}
+                {"role": "user", "content": prompt}
             ],
             "temperature": 0.3,
             "max_tokens": 200
         }
         
-        response = await self.client.post(
-            f"{self.settings.OPENAI_BASE_URL}/chat/completions",
-            headers=headers,
-            json=payload
-        )
-        
-        if response.status_code != 200:
-            raise Exception(f"OpenAI API error: {response.status_code} - {response.text}")
+        with trace_stage("upstream_classification"):
+            return await self.upstream.chat_completion(payload)
+    
+    async def _call_openai_packed_classification(self, prompt: str, count: int) -> Dict[str, Any]:
+        payload = {
+            "model": f"{self.settings.OPENAI_MODEL}",
+            "messages": [
+                {"role": "system", "content": "Você é um especialista em classificação de emails corporativos. Responda sempre no formato JSON solicitado."},
+                {"role": "user", "content": prompt}
+            ],
+            "temperature": 0.3,
+            # cerca de 25 tokens por objeto do array
+            "max_tokens": 40 * count + 20
+        }
         
-        return response.json()
+        with trace_stage("upstream_classification", packed_items=count):
+            return await self.upstream.chat_completion(payload)
     
-    def _process_classification_response(self, openai_response: Dict[str, Any], analysis: Dict[str, Any]) -> tuple:
+    def _process_classification_response(self, openai_response: Dict[str, Any], analysis: Dict[str, Any]) -> Tuple[str, float, bool]:
+        # o terceiro valor indica que a categoria veio das regras, e não do LLM
         try:
             content = openai_response['choices'][0]['message']['content'].strip()
             
@@ -95,16 +284,15 @@ class AIClassifier:
             confidence = float(result.get('confianca', 0.5))
             
             if category not in ['produtivo', 'improdutivo']:
-                category = self._determine_fallback_category(analysis)
-                confidence = 0.6
+                return self._determine_fallback_category(analysis), 0.6, True
             
             confidence = self._adjust_confidence(confidence, analysis, category)
             
-            return category, min(max(confidence, 0.0), 1.0)
+            return category, min(max(confidence, 0.0), 1.0), False
             
         except (json.JSONDecodeError, KeyError, ValueError) as e:
             logger.warning(f"Erro ao processar resposta da OpenAI: {e}")
-            return self._determine_fallback_category(analysis), 0.5
+            return self._determine_fallback_category(analysis), 0.5, True
     
     def _adjust_confidence(self, base_confidence: float, analysis: Dict[str, Any], category: str) -> float:
         adjustment = 0.0
@@ -125,65 +313,188 @@ class AIClassifier:
         
         return base_confidence + adjustment
     
+    async def classify_and_respond(
+        self,
+        email_data: Dict[str, Any],
+        speculative_mode: str = "off",
+        packed: bool = False,
+        slot: Optional[AdmissionSlot] = None
+    ) -> Tuple[Dict[str, Any], str]:
+        if speculative_mode not in ("guess", "both"):
+            classification_result = await self.classify_email(email_data, packed, slot)
+            suggested_response = await self.generate_response(
+                email_data, classification_result["category"]
+            )
+            return classification_result, suggested_response
+        
+        if speculative_mode == "both":
+            draft_categories = ["produtivo", "improdutivo"]
+        else:
+            draft_categories = [self._determine_fallback_category(self._get_analysis(email_data))]
+        
+        # as respostas começam junto com a classificação; fica só a da categoria final
+        drafts = {
+            category: asyncio.create_task(self.generate_response(email_data, category))
+            for category in draft_categories
+        }
+        
+        try:
+            classification_result = await self.classify_email(email_data, packed, slot)
+            final_category = classification_result["category"]
+            
+            for category, draft in drafts.items():
+                if category != final_category:
+                    draft.cancel()
+            
+            if final_category in drafts:
+                suggested_response = await drafts[final_category]
+                classification_result["speculative_hit"] = True
+            else:
+                suggested_response = await self.generate_response(email_data, final_category)
+                classification_result["speculative_hit"] = False
+            
+            return classification_result, suggested_response
+        
+        except BaseException:
+            for draft in drafts.values():
+                draft.cancel()
+            raise
+    
     async def generate_response(self, email_data: Dict[str, Any], category: str) -> str:
+        if self.response_flights is None:
+            return await self._generate_response(email_data, category)
+        
+        response, _ = await self.response_flights.do(
+            self._cache_key("response", email_data, category),
+            lambda: self._generate_response(email_data, category)
+        )
+        return response
+    
+    async def _generate_response(self, email_data: Dict[str, Any], category: str) -> str:
         try:
             content = email_data.get('original_content', '')
             sender = email_data.get('sender_name', 'Prezado(a)')
             subject = email_data.get('subject', '')
             
-            response_prompt = build_response_prompt(content, sender, subject, category)
+            cache_key = self._cache_key("response", email_data, category) if self.cache else None
+            cached = await self._cache_get("response", cache_key)
+            if cached is not None:
+                return cached
+            
+            if self.upstream.short_circuit():
+                return self._get_fallback_response(category, sender)
+            
+            with trace_stage("prompt_build"):
+                response_prompt = build_response_prompt(
+                    content, sender, subject, category, max_tokens=self.settings.PROMPT_MAX_TOKENS
+                )
             
             openai_response = await self._call_openai_response(response_prompt)
-            return self._process_response_generation(openai_response, category, sender)
+            generated_response, fell_back = self._process_response_generation(openai_response, category, sender)
+            
+            if cache_key and not fell_back:
+                await self.cache.set(cache_key, generated_response)
+            
+            return generated_response
             
         except Exception as e:
             logger.error(f"Erro na geração de resposta: {str(e)}")
             return self._get_fallback_response(category, sender)
 
     
-    async def _call_openai_response(self, prompt: str) -> Dict[str, Any]:
-        headers = {
-            "Authorization": f"Bearer {self.settings.OPENAI_API_KEY}",
-            "Content-Type": "application/json"
-        }
-
-        promptTruncated = truncate_prompt(prompt)
+    async def stream_response(self, email_data: Dict[str, Any], category: str) -> AsyncIterator[str]:
+        content = email_data.get('original_content', '')
+        sender = email_data.get('sender_name', 'Prezado(a)')
+        subject = email_data.get('subject', '')
         
-        payload = {
+        cache_key = self._cache_key("response", email_data, category) if self.cache else None
+        cached = await self._cache_get("response", cache_key)
+        if cached is not None:
+            yield cached
+            return
+        
+        if self.upstream.short_circuit():
+            yield self._get_fallback_response(category, sender)
+            return
+        
+        chunks = []
+        try:
+            with trace_stage("prompt_build"):
+                response_prompt = build_response_prompt(
+                    content, sender, subject, category, max_tokens=self.settings.PROMPT_MAX_TOKENS
+                )
+            
+            with trace_stage("upstream_response"):
+                async for chunk in self._stream_openai_response(response_prompt):
+                    chunks.append(chunk)
+                    yield chunk
+            
+        except Exception as e:
+            logger.error(f"Erro no streaming da resposta: {str(e)}")
+            if not chunks:
+                yield self._get_fallback_response(category, sender)
+                return
+            # parte da resposta já foi enviada; o cliente precisa saber que ela está incompleta
+            raise StreamInterruptedError(f"Resposta interrompida: {str(e)}") from e
+        
+        if not chunks:
+            yield self._get_fallback_response(category, sender)
+        elif cache_key:
+            await self.cache.set(cache_key, self._clean_generated_response(''.join(chunks)))
+    
+    async def _stream_openai_response(self, prompt: str) -> AsyncIterator[str]:
+        async for line in self.upstream.stream_chat_completion(self._build_response_payload(prompt)):
+            if not line.startswith("data:"):
+                continue
+            
+            data = line[len("data:"):].strip()
+            if data == "[DONE]":
+                break
+            
+            try:
+                delta = json.loads(data)['choices'][0].get('delta', {})
+            except (json.JSONDecodeError, KeyError, IndexError) as e:
+                logger.warning(f"Evento de streaming inválido: {e}")
+                continue
+            
+            if delta.get('content'):
+                yield delta['content']
+    
+    def _build_response_payload(self, prompt: str) -> Dict[str, Any]:
+        return {
             "model": f"{self.settings.OPENAI_MODEL}",
             "messages": [
                 {"role": "system", "content": "Você é um assistente profissional de atendimento ao cliente do setor financeiro. Seja sempre cordial, claro e útil."},
-                {"role": "user", "content": promptTruncated}
+                {"role": "user", "content": prompt}
             ],
             "temperature": 0.7,
             "max_tokens": 300
         }
-        
-        response = await self.client.post(
-            f"{self.settings.OPENAI_BASE_URL}/chat/completions",
-            headers=headers,
-            json=payload
-        )
-        
-        if response.status_code != 200:
-            raise Exception(f"OpenAI API error: {response.status_code}")
-        
-        return response.json()
     
-    def _process_response_generation(self, openai_response: Dict[str, Any], category: str, sender: str) -> str:
+    async def _call_openai_response(self, prompt: str) -> Dict[str, Any]:
+        with trace_stage("upstream_response"):
+            return await self.upstream.chat_completion(self._build_response_payload(prompt))
+    
+    def _process_response_generation(self, openai_response: Dict[str, Any], category: str, sender: str) -> Tuple[str, bool]:
         try:
-            generated_response = openai_response['choices'][0]['message']['content'].strip()
-            
-            if generated_response.startswith('"') and generated_response.endswith('"'):
-                generated_response = generated_response[1:-1]
-            
-            return generated_response
+            return self._clean_generated_response(openai_response['choices'][0]['message']['content']), False
             
         except (KeyError, IndexError) as e:
             logger.warning(f"Erro ao processar resposta gerada: {e}")
-            return self._get_fallback_response(category, sender)
+            return self._get_fallback_response(category, sender), True
+    
+    @staticmethod
+    def _clean_generated_response(text: str) -> str:
+        # usado pelas respostas completas e pelas transmitidas, que compartilham o cache
+        generated_response = text.strip()
+        
+        if generated_response.startswith('"') and generated_response.endswith('"'):
+            generated_response = generated_response[1:-1]
+        
+        return generated_response
     
     def _get_fallback_response(self, category: str, sender: str = "Prezado(a)") -> str:
+        FALLBACKS.inc(kind="response")
         if category == 'produtivo':
             return f"""Olá {sender},
 
@@ -203,15 +514,24 @@ Atenciosamente,
 Equipe de Atendimento"""
     
     async def _fallback_classification(self, email_data: Dict[str, Any]) -> Dict[str, Any]:
+        FALLBACKS.inc(kind="classification")
+        with trace_stage("fallback"):
+            return self._classify_with_fallback(email_data)
+    
+    def _classify_with_fallback(self, email_data: Dict[str, Any]) -> Dict[str, Any]:
         start_time = time.time()
         
         try:
-            analysis = self.email_processor.analyze_email_structure(
-                email_data.get('original_content', '')
-            )
+            analysis = self._get_analysis(email_data)
             
-            category = self._determine_fallback_category(analysis)
-            confidence = self._calculate_rule_based_confidence(analysis, category)
+            local_prediction = self._classify_locally(email_data)
+            if local_prediction:
+                category, confidence = local_prediction
+                source = "local_model"
+            else:
+                category = self._determine_fallback_category(analysis)
+                confidence = self._calculate_rule_based_confidence(analysis, category)
+                source = "fallback"
             
             processing_time = time.time() - start_time
             
@@ -219,7 +539,8 @@ Equipe de Atendimento"""
                 "category": category,
                 "confidence": confidence,
                 "processing_time": processing_time,
-                "analysis": analysis
+                "analysis": analysis,
+                "source": source
             }
             
         except Exception as e:
@@ -228,7 +549,8 @@ Equipe de Atendimento"""
                 "category": "produtivo",
                 "confidence": 0.5,
                 "processing_time": time.time() - start_time,
-                "analysis": {}
+                "analysis": {},
+                "source": "fallback"
             }
     
     def _determine_fallback_category(self, analysis: Dict[str, Any]) -> str:
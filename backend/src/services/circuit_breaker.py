@@ -0,0 +1,172 @@
+import time
+import logging
+import threading
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Tuple
+from services.metrics import CIRCUIT_REJECTIONS, CIRCUIT_TRANSITIONS
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+class CircuitOpenError(Exception):
+    pass
+
+class CircuitAttempt:
+    def __init__(self, breaker: Optional["CircuitBreaker"], probe: bool = False):
+        self.breaker = breaker
+        self.probe = probe
+        self.started_at = time.monotonic()
+        self.finished = False
+
+    def begin(self):
+        # o tempo de espera pelas cotas da API não conta como latência
+        self.started_at = time.monotonic()
+
+    def finish(self, ok: Optional[bool]):
+        # ok=None libera a tentativa sem veredito (cancelamento, erro do cliente)
+        if self.finished or self.breaker is None:
+            return
+        self.finished = True
+        self.breaker._record(self, ok, time.monotonic() - self.started_at)
+
+class CircuitBreaker:
+    def __init__(
+        self,
+        name: str = "upstream",
+        window_seconds: float = 60.0,
+        min_calls: int = 10,
+        failure_rate: float = 0.5,
+        slow_call_seconds: float = 10.0,
+        slow_call_rate: float = 0.8,
+        open_seconds: float = 30.0,
+        half_open_calls: int = 3
+    ):
+        self.name = name
+        self.window_seconds = window_seconds
+        self.min_calls = max(1, min_calls)
+        self.failure_rate = failure_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_call_rate = slow_call_rate
+        self.open_seconds = open_seconds
+        self.half_open_calls = max(1, half_open_calls)
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._calls: Deque[Tuple[float, bool, bool]] = deque()
+        self._probes_in_flight = 0
+        self._probe_successes = 0
+        self._lock = threading.Lock()
+        self.rejected = 0
+        self.last_opened_reason: Optional[str] = None
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            self._refresh_state()
+            return self._state
+
+    def _refresh_state(self):
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.open_seconds:
+            self._transition(HALF_OPEN)
+
+    def _transition(self, state: str, reason: Optional[str] = None):
+        if state == self._state:
+            return
+        previous, self._state = self._state, state
+        if state == OPEN:
+            self._opened_at = time.monotonic()
+            self.last_opened_reason = reason
+        if state != HALF_OPEN:
+            self._probes_in_flight = 0
+        self._probe_successes = 0
+        self._calls.clear()
+        CIRCUIT_TRANSITIONS.inc(breaker=self.name, state=state)
+
+        message = f"Circuito {self.name}: {previous} -> {state}" + (f" ({reason})" if reason else "")
+        if state == OPEN:
+            logger.warning(message)
+        else:
+            logger.info(message)
+
+    def start(self) -> CircuitAttempt:
+        with self._lock:
+            self._refresh_state()
+            if self._state == CLOSED:
+                return CircuitAttempt(self, probe=False)
+
+            if self._state == HALF_OPEN and self._probes_in_flight < self.half_open_calls:
+                # poucas requisições de teste verificam se a API voltou
+                self._probes_in_flight += 1
+                return CircuitAttempt(self, probe=True)
+
+            self.rejected += 1
+            retry_in = max(0.0, self.open_seconds - (time.monotonic() - self._opened_at))
+        CIRCUIT_REJECTIONS.inc(breaker=self.name)
+        raise CircuitOpenError(f"Circuito {self.name} aberto; nova verificação em {retry_in:.1f}s")
+
+    def short_circuit(self) -> bool:
+        # consulta feita antes de montar a requisição; conta como chamada recusada
+        with self._lock:
+            self._refresh_state()
+            if self._state != OPEN:
+                return False
+            self.rejected += 1
+        CIRCUIT_REJECTIONS.inc(breaker=self.name)
+        return True
+
+    def _record(self, attempt: CircuitAttempt, ok: Optional[bool], latency: float):
+        slow = latency >= self.slow_call_seconds
+        with self._lock:
+            if attempt.probe:
+                if self._state != HALF_OPEN:
+                    return
+                self._probes_in_flight -= 1
+                if ok is None:
+                    return
+                if not ok or slow:
+                    self._transition(OPEN, "falha na requisição de teste" if not ok else f"requisição de teste lenta ({latency:.1f}s)")
+                    return
+                self._probe_successes += 1
+                if self._probe_successes >= self.half_open_calls:
+                    self._transition(CLOSED)
+                return
+
+            if ok is None or self._state != CLOSED:
+                return
+
+            now = time.monotonic()
+            self._calls.append((now, not ok, slow))
+            while self._calls and self._calls[0][0] < now - self.window_seconds:
+                self._calls.popleft()
+
+            total = len(self._calls)
+            if total < self.min_calls:
+                return
+
+            failures = sum(1 for _, failed, _ in self._calls if failed)
+            slow_calls = sum(1 for _, _, is_slow in self._calls if is_slow)
+            if failures / total >= self.failure_rate:
+                self._transition(OPEN, f"{failures} de {total} chamadas com falha")
+            elif slow_calls / total >= self.slow_call_rate:
+                self._transition(OPEN, f"{slow_calls} de {total} chamadas acima de {self.slow_call_seconds:.0f}s")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._refresh_state()
+            total = len(self._calls)
+            failures = sum(1 for _, failed, _ in self._calls if failed)
+            slow_calls = sum(1 for _, _, is_slow in self._calls if is_slow)
+            return {
+                "state": self._state,
+                "window_calls": total,
+                "failure_rate": round(failures / total, 4) if total else 0.0,
+                "slow_call_rate": round(slow_calls / total, 4) if total else 0.0,
+                "retry_in": round(max(0.0, self.open_seconds - (time.monotonic() - self._opened_at)), 1) if self._state == OPEN else None,
+                "probes_in_flight": self._probes_in_flight,
+                "rejected": self.rejected,
+                "last_opened_reason": self.last_opened_reason
+            }
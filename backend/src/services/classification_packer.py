@@ -0,0 +1,205 @@
+import json
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+from services.metrics import PACKED_CLASSIFICATION_ITEMS, PACKED_CLASSIFICATION_SIZE
+from utils.prompt_utils import build_packed_email_block, build_packed_classification_prompt
+from utils.token_utils import count_tokens
+
+logger = logging.getLogger(__name__)
+
+VALID_CATEGORIES = ('produtivo', 'improdutivo')
+
+@dataclass
+class _PackedItem:
+    block: str
+    tokens: int
+    future: asyncio.Future
+
+class AdmissionSlot:
+    # vaga de concorrência do chamador; é devolvida enquanto o email espera o grupo
+    def __init__(self, semaphore: asyncio.Semaphore):
+        self.semaphore = semaphore
+        self.held = False
+
+    async def acquire(self):
+        await self.semaphore.acquire()
+        self.held = True
+
+    def release(self):
+        if self.held:
+            self.held = False
+            self.semaphore.release()
+
+    async def __aenter__(self) -> "AdmissionSlot":
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.release()
+
+    @asynccontextmanager
+    async def suspended(self):
+        self.release()
+        try:
+            yield
+        finally:
+            # se a tarefa for cancelada aqui, held continua falso e a vaga não é devolvida duas vezes
+            await self.acquire()
+
+def parse_packed_classification(content: str, count: int) -> Dict[int, Tuple[str, float]]:
+    content = content.strip()
+    if content.startswith('```'):
+        content = content.replace('```json', '').replace('```', '').strip()
+
+    try:
+        parsed = json.loads(content)
+    except json.JSONDecodeError as e:
+        logger.warning(f"Resposta da classificação agrupada não é JSON: {e}")
+        return {}
+
+    # alguns modelos embrulham o array em um objeto
+    if isinstance(parsed, dict):
+        parsed = next((value for value in parsed.values() if isinstance(value, list)), [])
+    if not isinstance(parsed, list):
+        return {}
+
+    results: Dict[int, Tuple[str, float]] = {}
+    for entry in parsed:
+        if not isinstance(entry, dict):
+            continue
+        try:
+            item_id = int(entry.get('id'))
+            category = str(entry.get('categoria', '')).lower()
+            confidence = float(entry.get('confianca'))
+        except (TypeError, ValueError):
+            continue
+
+        if not 1 <= item_id <= count or item_id in results:
+            continue
+        if category not in VALID_CATEGORIES or not 0.0 <= confidence <= 1.0:
+            continue
+        results[item_id] = (category, confidence)
+    return results
+
+class ClassificationPacker:
+    def __init__(
+        self,
+        send: Callable[[str, int], Awaitable[Dict[str, Any]]],
+        max_items: int = 20,
+        max_tokens: int = 3000,
+        item_max_tokens: int = 300,
+        max_wait: float = 0.05,
+        max_pending: int = 100
+    ):
+        self.send = send
+        self.max_items = max(1, max_items)
+        self.max_tokens = max_tokens
+        self.item_max_tokens = item_max_tokens
+        self.max_wait = max_wait
+        # limite próprio de emails esperando grupo, já que o chamador devolve a sua vaga
+        self._admission = asyncio.Semaphore(max(self.max_items, max_pending))
+        self._fixed_tokens: Optional[int] = None
+        self._pending: List[_PackedItem] = []
+        self._pending_tokens = 0
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._tasks: Set[asyncio.Task] = set()
+
+    @property
+    def emails_budget(self) -> int:
+        if self._fixed_tokens is None:
+            self._fixed_tokens = count_tokens(build_packed_classification_prompt([]))
+        return self.max_tokens - self._fixed_tokens
+
+    async def classify(
+        self,
+        email_data: Dict[str, Any],
+        analysis: Dict[str, Any],
+        slot: Optional[AdmissionSlot] = None
+    ) -> Optional[Tuple[str, float]]:
+        # None indica que o email deve ser classificado sozinho
+        block = build_packed_email_block(email_data, analysis)
+        # + delimitadores "[[EMAIL <id>]]" acrescentados na montagem do prompt
+        tokens = count_tokens(block) + 12
+        if tokens > min(self.item_max_tokens, self.emails_budget):
+            PACKED_CLASSIFICATION_ITEMS.inc(result="too_long")
+            return None
+
+        # a vaga do grupo é liberada quando o email é respondido, antes de o chamador
+        # recuperar a sua; segurar as duas ao mesmo tempo poderia travar o lote
+        await self._admission.acquire()
+        future = self._enqueue(block, tokens)
+        future.add_done_callback(lambda _: self._admission.release())
+        if slot is None:
+            return await future
+        # com a vaga do chamador livre, outros emails do lote podem entrar no mesmo grupo
+        async with slot.suspended():
+            return await future
+
+    def _enqueue(self, block: str, tokens: int) -> asyncio.Future:
+        if self._pending and self._pending_tokens + tokens > self.emails_budget:
+            self._flush()
+
+        loop = asyncio.get_running_loop()
+        item = _PackedItem(block, tokens, loop.create_future())
+        self._pending.append(item)
+        self._pending_tokens += tokens
+
+        if len(self._pending) >= self.max_items:
+            self._flush()
+        elif self._flush_handle is None:
+            # espera curta para juntar emails que chegam ao mesmo tempo
+            self._flush_handle = loop.call_later(self.max_wait, self._flush)
+
+        return item.future
+
+    def _flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+        items = [item for item in self._pending if not item.future.done()]
+        self._pending = []
+        self._pending_tokens = 0
+        if not items:
+            return
+
+        task = asyncio.create_task(self._send_pack(items))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _send_pack(self, items: List[_PackedItem]):
+        PACKED_CLASSIFICATION_SIZE.observe(len(items))
+        prompt = build_packed_classification_prompt([item.block for item in items])
+
+        try:
+            response = await self.send(prompt, len(items))
+            content = response['choices'][0]['message']['content']
+        except Exception as e:
+            # falha da chamada vale para todos; cada email segue para a contingência
+            for item in items:
+                if not item.future.done():
+                    item.future.set_exception(e)
+            return
+
+        results = parse_packed_classification(content, len(items))
+        requeued = 0
+        for item_id, item in enumerate(items, start=1):
+            if item.future.done():
+                continue
+            result = results.get(item_id)
+            if result is None:
+                requeued += 1
+            item.future.set_result(result)
+
+        PACKED_CLASSIFICATION_ITEMS.inc(len(results), result="packed")
+        if requeued:
+            PACKED_CLASSIFICATION_ITEMS.inc(requeued, result="requeued")
+            logger.warning(f"{requeued} de {len(items)} emails sem resposta válida na classificação agrupada; reenviados individualmente")
+
+    async def close(self):
+        self._flush()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
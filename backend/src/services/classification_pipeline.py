@@ -0,0 +1,184 @@
+import time
+import asyncio
+import logging
+from typing import Dict, Any, List, Optional, AsyncIterator, Awaitable, Callable, Tuple
+from datetime import datetime
+from services.email_processor import EmailProcessor, TextAnalysis, analyze_text
+from services.ai_classifier import AIClassifier, StreamInterruptedError
+from services.classification_packer import AdmissionSlot
+from services.work_executor import WorkExecutor
+from services.metrics import CLASSIFICATIONS
+from services.tracing import trace_stage, current_timings
+from models.email_models import EmailClassificationResponse
+
+logger = logging.getLogger(__name__)
+
+class ClassificationPipeline:
+    def __init__(
+        self,
+        email_processor: EmailProcessor,
+        ai_classifier: AIClassifier,
+        max_concurrency: int = 8,
+        executor: Optional[WorkExecutor] = None,
+        heavy_text_threshold: int = 20000,
+        speculative_mode: str = "off"
+    ):
+        self.email_processor = email_processor
+        self.ai_classifier = ai_classifier
+        self.max_concurrency = max(1, max_concurrency)
+        self.executor = executor
+        self.heavy_text_threshold = heavy_text_threshold
+        self.speculative_mode = speculative_mode
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        # compartilhado entre lotes para que o limite valha para o processo todo
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    async def analyze(self, text: str) -> TextAnalysis:
+        with trace_stage("nlp_analysis"):
+            return await self._analyze(text)
+
+    async def _analyze(self, text: str) -> TextAnalysis:
+        if self.executor is None:
+            return self.email_processor.analyze(text)
+        
+        if self.executor.process_pool_enabled and len(text or '') >= self.heavy_text_threshold:
+            return await self.executor.run_heavy(analyze_text, text)
+        
+        return await self.executor.run_light(self.email_processor.analyze, text)
+
+    async def build_email_data(
+        self,
+        email_content: str,
+        sender_name: Optional[str] = None,
+        subject: Optional[str] = None,
+        filename: Optional[str] = None
+    ) -> Dict[str, Any]:
+        analysis = await self.analyze(email_content)
+        email_data = {
+            "content": analysis.processed_text,
+            "original_content": email_content,
+            "analysis": analysis,
+            "sender_name": sender_name,
+            "subject": subject,
+            "timestamp": datetime.now().isoformat()
+        }
+        if filename:
+            email_data["filename"] = filename
+        return email_data
+
+    async def run(
+        self,
+        email_data: Dict[str, Any],
+        packed: bool = False,
+        slot: Optional[AdmissionSlot] = None
+    ) -> EmailClassificationResponse:
+        classification_result, suggested_response = await self.ai_classifier.classify_and_respond(
+            email_data, self.speculative_mode, packed, slot
+        )
+        self._count_classification(classification_result)
+
+        return EmailClassificationResponse(
+            category=classification_result["category"],
+            confidence_score=classification_result["confidence"],
+            suggested_response=suggested_response,
+            processing_time=classification_result["processing_time"],
+            metadata=self._build_metadata(email_data, classification_result)
+        )
+
+    async def stream(self, email_data: Dict[str, Any]) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        start_time = time.time()
+        classification_result = await self.ai_classifier.classify_email(email_data)
+        category = classification_result["category"]
+        self._count_classification(classification_result)
+
+        yield "classification", {
+            "category": category,
+            "confidence_score": round(classification_result["confidence"], 3)
+        }
+
+        chunks = []
+        error = None
+        try:
+            async for chunk in self.ai_classifier.stream_response(email_data, category):
+                chunks.append(chunk)
+                yield "token", {"text": chunk}
+        except StreamInterruptedError as e:
+            error = str(e)
+
+        done = {
+            "category": category,
+            "confidence_score": round(classification_result["confidence"], 3),
+            "suggested_response": ''.join(chunks).strip(),
+            "processing_time": round(time.time() - start_time, 3),
+            # partial indica uma resposta cortada por falha da API no meio do streaming
+            "partial": error is not None,
+            "metadata": self._build_metadata(email_data, classification_result)
+        }
+        if error:
+            done["error"] = error
+        yield "done", done
+
+    @staticmethod
+    def _count_classification(classification_result: Dict[str, Any]):
+        CLASSIFICATIONS.inc(
+            source=classification_result.get("source", "llm"),
+            category=classification_result["category"]
+        )
+
+    def _build_metadata(self, email_data: Dict[str, Any], classification_result: Dict[str, Any]) -> Dict[str, Any]:
+        metadata = {
+            "sender": email_data.get("sender_name"),
+            "subject": email_data.get("subject"),
+            "timestamp": email_data["timestamp"],
+            "cache_hit": classification_result.get("cache_hit", False),
+            "classification_source": classification_result.get("source", "llm")
+        }
+        if "speculative_hit" in classification_result:
+            metadata["speculative_hit"] = classification_result["speculative_hit"]
+        if classification_result.get("packed"):
+            metadata["packed_classification"] = True
+        if classification_result.get("coalesced"):
+            metadata["coalesced"] = True
+        if "near_duplicate" in classification_result:
+            metadata["near_duplicate_id"] = classification_result["near_duplicate"]["id"]
+            metadata["near_duplicate_similarity"] = classification_result["near_duplicate"]["similarity"]
+        if email_data.get("filename"):
+            metadata["filename"] = email_data["filename"]
+
+        timings = current_timings()
+        if timings:
+            metadata["timings"] = timings
+
+        return metadata
+
+    async def run_many(
+        self,
+        emails: List[Dict[str, Any]],
+        load_content: Optional[Callable[[int], Awaitable[str]]] = None
+    ) -> List[Dict[str, Any]]:
+        # load_content extrai o conteúdo do item dentro da mesma vaga (ex.: arquivos do lote)
+        async def run_item(index: int, email: Dict[str, Any]) -> Dict[str, Any]:
+            # a vaga é devolvida enquanto o email espera a classificação agrupada
+            async with AdmissionSlot(self.semaphore) as slot:
+                try:
+                    content = email["email_content"] if load_content is None else await load_content(index)
+                    email_data = await self.build_email_data(
+                        content,
+                        email.get("sender_name"),
+                        email.get("subject"),
+                        filename=email.get("filename")
+                    )
+                    result = await self.run(email_data, packed=True, slot=slot)
+                    return {"index": index, "success": True, "result": result}
+                except Exception as e:
+                    logger.error(f"Erro na classificação do item {index} do lote: {str(e)}")
+                    return {"index": index, "success": False, "error": str(e)}
+
+        return await asyncio.gather(
+            *(run_item(index, email) for index, email in enumerate(emails))
+        )
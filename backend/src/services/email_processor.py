@@ -1,73 +1,116 @@
 import re
-import nltk
 import string
-from typing import List, Dict, Any
-from nltk.corpus import stopwords
-from nltk.tokenize import word_tokenize, sent_tokenize
-from nltk.stem import RSLPStemmer
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from typing import List, Dict, Any, Tuple, Mapping, Optional, FrozenSet
 from collections import Counter
 import logging
+from config.settings import get_settings
+from config.indicators import load_indicator_patterns
+from services.indicator_matcher import IndicatorMatcher, IndicatorMatch
+from services.nlp_resources import NlpResources, get_nlp_resources
 
 logger = logging.getLogger(__name__)
 
-class EmailProcessor:    
-    def __init__(self):
-        self.setup_nltk()
-        self.stemmer = RSLPStemmer()
-        self.stop_words = self._get_stop_words()
-        
-    def setup_nltk(self):
-        nltk_resources = [
-            ('tokenizers/punkt', 'punkt'),
-            ('corpora/stopwords', 'stopwords'), 
-            ('stemmers/rslp', 'rslp'),
-        ]
-        
-        for path, resource in nltk_resources:
-            try:
-                nltk.data.find(path)
-            except LookupError:
-                try:
-                    nltk.download(resource, quiet=True)
-                    logger.info(f"Downloaded NLTK resource: {resource}")
-                except Exception as e:
-                    logger.warning(f"Falha ao baixar {resource}: {e}")
+WHITESPACE_PATTERN = re.compile(r'\s+')
+EMAIL_PATTERN = re.compile(r'\S+@\S+')
+URL_PATTERN = re.compile(r'http\S+|www.\S+')
+PHONE_WITH_AREA_PATTERN = re.compile(r'\(\d{2}\)\s*\d{4,5}-?\d{4}')
+PHONE_PATTERN = re.compile(r'\d{2}\s*\d{4,5}-?\d{4}')
+SPECIAL_CHARS_PATTERN = re.compile(r'[^\w\s.!?,-]')
+NUMBER_PATTERN = re.compile(r'\b\d+\b')
+# separa palavras como o tokenizador do NLTK nos casos que sobrevivem ao filtro
+# de tokens alfabéticos: pontuação nas bordas sai, hífens e pontos internos ficam;
+# abreviações como "seg." viram palavras, o que o punkt evitaria
+WORD_TOKEN_PATTERN = re.compile(r'\w+(?:[.-]\w+)*')
+
+@dataclass(frozen=True)
+class TextAnalysis:
+    original_length: int = 0
+    word_count: int = 0
+    cleaned_text: str = ""
+    tokens: Tuple[str, ...] = ()
+    stems: Tuple[str, ...] = ()
+    keywords: Tuple[str, ...] = ()
+    sentences: Tuple[str, ...] = ()
+    has_question_marks: bool = False
+    has_exclamation_marks: bool = False
+    indicators: Mapping[str, Tuple[str, ...]] = field(default_factory=dict)
+    indicator_matches: Tuple[IndicatorMatch, ...] = ()
     
-    def _get_stop_words(self) -> set:
-        try:
-            portuguese_stops = set(stopwords.words('portuguese'))
-        except:
-            portuguese_stops = set()
-            logger.warning("Stopwords do NLTK não disponíveis, usando lista personalizada")
-        
-        custom_stops = {
-            'bom', 'dia', 'tarde', 'noite', 'olá', 'oi', 'obrigado', 'obrigada',
-            'att', 'atenciosamente', 'cordialmente', 'abraço', 'abraços',
-            'email', 'mensagem', 'assunto', 'favor', 'gentileza', 'por',
-            'att', 'atenciosamente', 'cumprimentos', 'saudações',
-            'sr', 'sra', 'prezado', 'prezada'
+    @property
+    def processed_text(self) -> str:
+        return ' '.join(self.stems)
+    
+    def __getstate__(self) -> Dict[str, Any]:
+        state = dict(self.__dict__)
+        state['indicators'] = dict(self.indicators)
+        return state
+    
+    def __setstate__(self, state: Dict[str, Any]):
+        state['indicators'] = MappingProxyType(state['indicators'])
+        self.__dict__.update(state)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        if not self.original_length:
+            return {}
+        
+        analysis = {
+            'original_length': self.original_length,
+            'processed_length': len(self.processed_text),
+            'sentence_count': len(self.sentences),
+            'word_count': self.word_count,
+            'keyword_count': len(self.keywords),
+            'keywords': list(self.keywords),
+            'has_question_marks': self.has_question_marks,
+            'has_exclamation_marks': self.has_exclamation_marks,
+            'urgency_indicators': [],
+            'greeting_indicators': [],
+            'request_indicators': []
         }
         
-        return portuguese_stops.union(custom_stops)
+        for category, terms in self.indicators.items():
+            analysis[f'{category}_indicators'] = list(terms)
+        
+        return analysis
+
+class EmailProcessor:    
+    def __init__(
+        self,
+        indicator_matcher: Optional[IndicatorMatcher] = None,
+        resources: Optional[NlpResources] = None,
+        fast_tokenizer: Optional[bool] = None
+    ):
+        self._resources = resources
+        self.fast_tokenizer = get_settings().NLP_FAST_TOKENIZER if fast_tokenizer is None else fast_tokenizer
+        self.indicator_matcher = indicator_matcher or IndicatorMatcher(
+            load_indicator_patterns(get_settings().INDICATORS_FILE)
+        )
+    
+    @property
+    def resources(self) -> NlpResources:
+        # os recursos do NLTK só são carregados no primeiro texto processado
+        return self._resources or get_nlp_resources()
+    
+    @property
+    def stop_words(self) -> FrozenSet[str]:
+        return self.resources.stop_words
     
     def clean_text(self, text: str) -> str:
         if not text:
             return ""
         
-        text = re.sub(r'\n+', ' ', text)
-        text = re.sub(r'\r+', ' ', text)
-        
-        text = re.sub(r'\s+', ' ', text)
+        text = WHITESPACE_PATTERN.sub(' ', text)
 
-        text = re.sub(r'\S+@\S+', '', text)
-        text = re.sub(r'http\S+|www.\S+', '', text)
+        text = EMAIL_PATTERN.sub('', text)
+        text = URL_PATTERN.sub('', text)
         
-        text = re.sub(r'\(\d{2}\)\s*\d{4,5}-?\d{4}', '', text)
-        text = re.sub(r'\d{2}\s*\d{4,5}-?\d{4}', '', text)
+        text = PHONE_WITH_AREA_PATTERN.sub('', text)
+        text = PHONE_PATTERN.sub('', text)
         
-        text = re.sub(r'[^\w\s.!?,-]', ' ', text)
+        text = SPECIAL_CHARS_PATTERN.sub(' ', text)
         
-        text = re.sub(r'\b\d+\b', '', text)
+        text = NUMBER_PATTERN.sub('', text)
         
         text = text.lower().strip()
         
@@ -77,28 +120,49 @@ class EmailProcessor:
         if not text:
             return []
         
-        tokens = word_tokenize(text, language='portuguese')
+        if self.fast_tokenizer:
+            # o filtro abaixo descarta pontuação, então o modelo punkt não é necessário
+            tokens = WORD_TOKEN_PATTERN.findall(text)
+        else:
+            tokens = self.resources.word_tokenize(text)
+        stop_words = self.stop_words
         
         filtered_tokens = []
         for token in tokens:
             if (token not in string.punctuation and 
                 len(token) > 2 and 
-                token not in self.stop_words and
+                token not in stop_words and
                 token.isalpha()):
                 filtered_tokens.append(token)
         
         return filtered_tokens
     
     def apply_stemming(self, tokens: List[str]) -> List[str]:
-        stemmed_tokens = []
-        for token in tokens:
-            try:
-                stemmed = self.stemmer.stem(token)
-                stemmed_tokens.append(stemmed)
-            except:
-                stemmed_tokens.append(token)
+        return self.resources.stem_all(tokens)
+    
+    def analyze(self, text: str) -> TextAnalysis:
+        if not text or not text.strip():
+            return TextAnalysis()
         
-        return stemmed_tokens
+        cleaned = self.clean_text(text)
+        tokens = self.tokenize_and_filter(cleaned)
+        stems = self.apply_stemming(tokens)
+        keywords = [word for word, freq in Counter(tokens).most_common(10)]
+        indicators, indicator_matches = self.indicator_matcher.find(text)
+        
+        return TextAnalysis(
+            original_length=len(text),
+            word_count=len(text.split()),
+            cleaned_text=cleaned,
+            tokens=tuple(tokens),
+            stems=tuple(stems),
+            keywords=tuple(keywords),
+            sentences=tuple(self.extract_sentences(text)),
+            has_question_marks='?' in text,
+            has_exclamation_marks='!' in text,
+            indicators=MappingProxyType(indicators),
+            indicator_matches=indicator_matches
+        )
     
     def preprocess_text(self, text: str) -> str:
         if not text or not text.strip():
@@ -128,7 +192,7 @@ class EmailProcessor:
             return []
         
         try:
-            sentences = sent_tokenize(text, language='portuguese')
+            sentences = self.resources.sent_tokenize(text)
             cleaned_sentences = []
             
             for sentence in sentences:
@@ -144,65 +208,13 @@ class EmailProcessor:
         if not text:
             return {}
         
-        original_text = text
-        sentences = self.extract_sentences(original_text)
-        keywords = self.extract_keywords(original_text)
-        processed_text = self.preprocess_text(original_text)
-        
-        analysis = {
-            'original_length': len(original_text),
-            'processed_length': len(processed_text),
-            'sentence_count': len(sentences),
-            'word_count': len(original_text.split()),
-            'keyword_count': len(keywords),
-            'keywords': keywords,
-            'has_question_marks': '?' in original_text,
-            'has_exclamation_marks': '!' in original_text,
-            'urgency_indicators': self._detect_urgency_indicators(original_text.lower()),
-            'greeting_indicators': self._detect_greeting_indicators(original_text.lower()),
-            'request_indicators': self._detect_request_indicators(original_text.lower())
-        }
-        
-        return analysis
-    
-    def _detect_urgency_indicators(self, text: str) -> List[str]:
-        urgency_patterns = [
-            'urgente', 'emergência', 'imediato', 'rápido', 'asap',
-            'o mais rápido possível', 'com brevidade', 'prioritário',
-            'problema', 'erro', 'falha', 'não funciona', 'parou'
-        ]
-        
-        found_indicators = []
-        for pattern in urgency_patterns:
-            if pattern in text:
-                found_indicators.append(pattern)
-        
-        return found_indicators
-    
-    def _detect_greeting_indicators(self, text: str) -> List[str]:
-        greeting_patterns = [
-            'bom dia', 'boa tarde', 'boa noite', 'olá', 'oi',
-            'parabéns', 'felicitações', 'feliz aniversário', 'feliz natal',
-            'feliz ano novo', 'obrigado', 'obrigada', 'agradecimento'
-        ]
-        
-        found_greetings = []
-        for pattern in greeting_patterns:
-            if pattern in text:
-                found_greetings.append(pattern)
-        
-        return found_greetings
-    
-    def _detect_request_indicators(self, text: str) -> List[str]:
-        request_patterns = [
-            'preciso', 'necessito', 'solicito', 'gostaria',
-            'poderia', 'pode', 'ajuda', 'suporte', 'informação',
-            'dúvida', 'questão', 'pergunta', 'esclarecimento'
-        ]
-        
-        found_requests = []
-        for pattern in request_patterns:
-            if pattern in text:
-                found_requests.append(pattern)
-        
-        return found_requests
+        return self.analyze(text).to_dict()
+
+_worker_processor: Optional[EmailProcessor] = None
+
+def analyze_text(text: str) -> TextAnalysis:
+    # ponto de entrada para workers de outros processos, que não compartilham instâncias
+    global _worker_processor
+    if _worker_processor is None:
+        _worker_processor = EmailProcessor()
+    return _worker_processor.analyze(text)
@@ -1,115 +1,299 @@
 import os
+import codecs
+import asyncio
 import tempfile
-from typing import Optional
+from contextlib import asynccontextmanager, contextmanager
+from typing import AsyncIterator, BinaryIO, Iterator, List, Optional, Union
 from fastapi import UploadFile, HTTPException
 import PyPDF2
 import logging
+from services.work_executor import WorkExecutor, ExecutorSaturatedError
+from services.tracing import trace_stage
+from utils.token_utils import count_tokens
 
 logger = logging.getLogger(__name__)
 
 class FileHandler:
-    
-    def __init__(self):
+
+    def __init__(
+        self,
+        executor: Optional[WorkExecutor] = None,
+        max_file_size_mb: int = 50,
+        chunk_size: int = 1024 * 1024,
+        max_pages: int = 200,
+        max_chars: int = 200000,
+        max_tokens: Optional[int] = None,
+        parallel_pages: bool = False,
+        pages_per_task: int = 4
+    ):
         self.supported_extensions = {'.txt', '.pdf'}
-        self.max_file_size = 50 * 1024 * 1024
-    
+        self.max_file_size_mb = max_file_size_mb
+        self.max_file_size = max_file_size_mb * 1024 * 1024
+        self.chunk_size = chunk_size
+        self.max_pages = max_pages
+        self.max_chars = max_chars
+        self.max_tokens = max_tokens
+        self.parallel_pages = parallel_pages
+        self.pages_per_task = max(1, pages_per_task)
+        self.executor = executor
+
     def is_valid_file_type(self, filename: Optional[str]) -> bool:
         if not filename:
             return False
-        
+
         file_extension = os.path.splitext(filename)[1].lower()
         return file_extension in self.supported_extensions
-    
+
     async def extract_content(self, file: UploadFile) -> str:
         if not self.is_valid_file_type(file.filename):
             raise HTTPException(
-                status_code=400, 
+                status_code=400,
                 detail=f"Tipo de arquivo não suportado: {file.filename}"
             )
-        
-        file_content = await file.read()
-        if len(file_content) > self.max_file_size:
-            raise HTTPException(
-                status_code=400, 
-                detail="Arquivo muito grande. Máximo permitido: 50MB"
-            )
-        
+
+        self._check_size(await self._upload_size(file))
+
+        with trace_stage("file_extraction"):
+            return await self._extract_by_type(file)
+
+    async def _extract_by_type(self, file: UploadFile) -> str:
         file_extension = os.path.splitext(file.filename)[1].lower()
-        
+
         try:
             if file_extension == '.txt':
-                return await self._extract_text_content(file_content)
+                return await self._extract_text_content(file)
             elif file_extension == '.pdf':
-                return await self._extract_pdf_content(file_content)
+                return await self._extract_pdf_content(file)
             else:
                 raise HTTPException(
                     status_code=400,
                     detail=f"Tipo de arquivo não suportado: {file_extension}"
                 )
-                
+
+        except (ExecutorSaturatedError, HTTPException):
+            raise
         except Exception as e:
             logger.error(f"Erro na extração de conteúdo de {file.filename}: {str(e)}")
             raise HTTPException(
                 status_code=500,
                 detail=f"Erro ao processar arquivo: {str(e)}"
             )
-    
-    async def _extract_text_content(self, file_content: bytes) -> str:
+
+    def _check_size(self, size: Optional[int]):
+        if size is not None and size > self.max_file_size:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Arquivo muito grande. Máximo permitido: {self.max_file_size_mb}MB"
+            )
+
+    async def _upload_size(self, file: UploadFile) -> Optional[int]:
+        if file.size is not None:
+            return file.size
+
+        # o upload já está em um SpooledTemporaryFile; medir pelo seek evita ler o conteúdo
+        try:
+            file.file.seek(0, os.SEEK_END)
+            size = file.file.tell()
+            await file.seek(0)
+            return size
+        except (AttributeError, OSError):
+            return None
+
+    async def _read_chunks(self, file: UploadFile):
+        await file.seek(0)
+        total = 0
+        while True:
+            chunk = await file.read(self.chunk_size)
+            if not chunk:
+                return
+            total += len(chunk)
+            self._check_size(total)
+            yield chunk
+
+    async def _extract_text_content(self, file: UploadFile) -> str:
         try:
             encodings = ['utf-8', 'latin-1', 'cp1252', 'iso-8859-1']
-            
+
             for encoding in encodings:
                 try:
-                    text_content = file_content.decode(encoding)
-                    
+                    text_content = await self._decode_upload(file, encoding)
+
                     if len(text_content.strip()) == 0:
                         raise ValueError("Arquivo vazio ou sem conteúdo legível")
-                    
+
                     return text_content
-                    
+
                 except UnicodeDecodeError:
                     continue
-            
+
             raise ValueError("Não foi possível decodificar o arquivo de texto")
-            
+
+        except HTTPException:
+            raise
         except Exception as e:
             raise ValueError(f"Erro ao extrair conteúdo do arquivo de texto: {str(e)}")
-    
-    async def _extract_pdf_content(self, file_content: bytes) -> str:
+
+    async def _decode_upload(self, file: UploadFile, encoding: str) -> str:
+        decoder = codecs.getincrementaldecoder(encoding)()
+        parts = []
+        chars = 0
+
+        async for chunk in self._read_chunks(file):
+            part = decoder.decode(chunk)
+            parts.append(part)
+            chars += len(part)
+            if chars >= self.max_chars:
+                break
+        else:
+            parts.append(decoder.decode(b"", final=True))
+
+        return "".join(parts)[:self.max_chars]
+
+    async def _extract_pdf_content(self, file: UploadFile) -> str:
+        await file.seek(0)
+
+        if self.parallel_pages and self.executor is not None and self.executor.process_pool_enabled:
+            return await self._extract_pdf_parallel(file)
+
+        limits = (self.max_pages, self.max_chars, self.max_tokens)
+        if self.executor is None:
+            return extract_pdf_text(file.file, *limits)
+        if not self.executor.process_pool_enabled:
+            # sem pool de processos, o PyPDF2 lê direto do arquivo temporário do upload
+            return await self.executor.run_light(extract_pdf_text, file.file, *limits)
+
+        # o PyPDF2 segura o GIL; o arquivo do upload não pode ir para outro processo,
+        # então o processo recebe o caminho de uma cópia em disco e a abre sozinho
+        async with self._spool_to_disk(file) as pdf_path:
+            return await self.executor.run_heavy(extract_pdf_text, pdf_path, *limits)
+
+    @asynccontextmanager
+    async def _spool_to_disk(self, file: UploadFile) -> AsyncIterator[str]:
+        spooled = tempfile.NamedTemporaryFile(suffix=".pdf", delete=False)
         try:
-            with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as temp_file:
-                temp_file.write(file_content)
-                temp_file_path = temp_file.name
-            
+            with spooled:
+                async for chunk in self._read_chunks(file):
+                    await asyncio.to_thread(spooled.write, chunk)
+            yield spooled.name
+        finally:
+            os.unlink(spooled.name)
+
+    async def _extract_pdf_parallel(self, file: UploadFile) -> str:
+        async with self._spool_to_disk(file) as pdf_path:
+            return await self._extract_pdf_ranges(pdf_path)
+
+    async def _extract_pdf_ranges(self, pdf_path: str) -> str:
+        page_count = await self.executor.run_light(count_pdf_pages, pdf_path)
+        if self.max_pages is not None:
+            page_count = min(page_count, self.max_pages)
+
+        # cada processo abre o mesmo arquivo e decodifica só as suas páginas
+        collector = PageTextCollector(self.max_chars, self.max_tokens)
+        ranges = [
+            (start, min(start + self.pages_per_task, page_count))
+            for start in range(0, page_count, self.pages_per_task)
+        ]
+
+        # lotes do tamanho do pool, para poder parar assim que o orçamento for atingido
+        wave_size = self.executor.process_workers
+        for wave_start in range(0, len(ranges), wave_size):
+            wave = ranges[wave_start:wave_start + wave_size]
+            results = await asyncio.gather(*[
+                self.executor.run_heavy(extract_pdf_page_range, pdf_path, start, stop)
+                for start, stop in wave
+            ])
+            if any(collector.add(page_text) for pages in results for page_text in pages):
+                break
+
+        return collector.result()
+
+class PageTextCollector:
+    def __init__(self, max_chars: Optional[int] = None, max_tokens: Optional[int] = None):
+        self.max_chars = max_chars
+        self.max_tokens = max_tokens
+        self.parts: List[str] = []
+        self.chars = 0
+        self.tokens = 0
+
+    @property
+    def is_full(self) -> bool:
+        if self.max_chars is not None and self.chars >= self.max_chars:
+            return True
+        return bool(self.max_tokens) and self.tokens >= self.max_tokens
+
+    def add(self, page_text: str) -> bool:
+        if self.is_full:
+            return True
+        if page_text:
+            self.parts.append(page_text)
+            self.chars += len(page_text) + 1
+            if self.max_tokens:
+                self.tokens += count_tokens(page_text)
+        return self.is_full
+
+    def result(self) -> str:
+        text_content = "\n".join(self.parts)
+        if self.max_chars is not None:
+            text_content = text_content[:self.max_chars]
+
+        if not text_content or len(text_content.strip()) < 10:
+            raise ValueError("PDF não contém texto legível ou conteúdo insuficiente")
+
+        return text_content
+
+@contextmanager
+def _open_pdf(source: Union[BinaryIO, str]) -> Iterator[PyPDF2.PdfReader]:
+    # caminhos são abertos aqui: com um caminho, o PyPDF2 copiaria o arquivo inteiro para a memória
+    with (open(source, 'rb') if isinstance(source, str) else _borrowed(source)) as stream:
+        pdf_reader = PyPDF2.PdfReader(stream)
+        if len(pdf_reader.pages) == 0:
+            raise ValueError("PDF não contém páginas")
+        yield pdf_reader
+
+@contextmanager
+def _borrowed(stream: BinaryIO) -> Iterator[BinaryIO]:
+    # o arquivo do upload pertence ao chamador e não é fechado aqui
+    yield stream
+
+def iter_pdf_pages(source: Union[BinaryIO, str], start: int = 0, stop: Optional[int] = None) -> Iterator[str]:
+    with _open_pdf(source) as pdf_reader:
+        stop = len(pdf_reader.pages) if stop is None else min(stop, len(pdf_reader.pages))
+
+        # as páginas só são decodificadas quando consumidas
+        for page_num in range(start, stop):
             try:
-                text_content = ""
-                
-                with open(temp_file_path, 'rb') as pdf_file:
-                    pdf_reader = PyPDF2.PdfReader(pdf_file)
-                    
-                    if len(pdf_reader.pages) == 0:
-                        raise ValueError("PDF não contém páginas")
-                    
-                    for page_num, page in enumerate(pdf_reader.pages):
-                        try:
-                            page_text = page.extract_text()
-                            if page_text:
-                                text_content += page_text + "\n"
-                        except Exception as e:
-                            logger.warning(f"Erro ao extrair texto da página {page_num}: {e}")
-                            continue
-                
-                os.unlink(temp_file_path)
-                
-                if not text_content or len(text_content.strip()) < 10:
-                    raise ValueError("PDF não contém texto legível ou conteúdo insuficiente")
-                
-                return text_content
-                
+                page_text = pdf_reader.pages[page_num].extract_text()
             except Exception as e:
-                if os.path.exists(temp_file_path):
-                    os.unlink(temp_file_path)
-                raise e
-                
-        except Exception as e:
-            raise ValueError(f"Erro ao extrair conteúdo do PDF: {str(e)}")
\ No newline at end of file
+                logger.warning(f"Erro ao extrair texto da página {page_num}: {e}")
+                continue
+            if page_text:
+                yield page_text
+
+def count_pdf_pages(source: Union[BinaryIO, str]) -> int:
+    try:
+        with _open_pdf(source) as pdf_reader:
+            return len(pdf_reader.pages)
+    except Exception as e:
+        raise ValueError(f"Erro ao extrair conteúdo do PDF: {str(e)}")
+
+def extract_pdf_page_range(pdf_path: str, start: int, stop: int) -> List[str]:
+    try:
+        return list(iter_pdf_pages(pdf_path, start, stop))
+    except Exception as e:
+        raise ValueError(f"Erro ao extrair conteúdo do PDF: {str(e)}")
+
+def extract_pdf_text(
+    source: Union[BinaryIO, str],
+    max_pages: Optional[int] = None,
+    max_chars: Optional[int] = None,
+    max_tokens: Optional[int] = None
+) -> str:
+    try:
+        collector = PageTextCollector(max_chars, max_tokens)
+        for page_text in iter_pdf_pages(source, stop=max_pages):
+            if collector.add(page_text):
+                break
+        return collector.result()
+
+    except Exception as e:
+        raise ValueError(f"Erro ao extrair conteúdo do PDF: {str(e)}")
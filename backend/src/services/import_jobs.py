@@ -0,0 +1,302 @@
+import os
+import re
+import json
+import time
+import uuid
+import asyncio
+import logging
+import tempfile
+from dataclasses import dataclass, asdict
+from datetime import datetime
+from typing import Any, Awaitable, BinaryIO, Callable, Dict, List, Optional, Set
+from services.mail_parser import iter_mailbox
+from services.classification_pipeline import ClassificationPipeline
+from services.classification_packer import AdmissionSlot
+from services.work_executor import WorkExecutor, ExecutorSaturatedError
+
+logger = logging.getLogger(__name__)
+
+JOB_ID_PATTERN = re.compile(r'[0-9a-f]{32}')
+STATUS_SAVE_INTERVAL = 100
+SATURATED_RETRY_DELAY = 0.1
+
+@dataclass
+class ImportJob:
+    job_id: str
+    filename: str
+    upload_path: str
+    results_path: str
+    status: str = "queued"
+    processed: int = 0
+    succeeded: int = 0
+    failed: int = 0
+    truncated: bool = False
+    error: Optional[str] = None
+    created_at: str = ""
+    started_at: Optional[str] = None
+    finished_at: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = asdict(self)
+        data.pop("upload_path")
+        data.pop("results_path")
+        return data
+
+def _copy_upload(source: BinaryIO, path: str, max_size: int, chunk_size: int) -> int:
+    source.seek(0)
+    total = 0
+    with open(path, 'wb') as target:
+        while True:
+            chunk = source.read(chunk_size)
+            if not chunk:
+                return total
+            total += len(chunk)
+            if total > max_size:
+                raise ValueError(f"Arquivo muito grande. Máximo permitido: {max_size // (1024 * 1024)}MB")
+            target.write(chunk)
+
+def _next_email(messages):
+    return next(messages, None)
+
+class ImportJobManager:
+    def __init__(
+        self,
+        pipeline: ClassificationPipeline,
+        executor: WorkExecutor,
+        jobs_dir: Optional[str] = None,
+        max_concurrency: int = 4,
+        max_messages: int = 100000,
+        max_file_size_mb: int = 1024,
+        max_chars: Optional[int] = None,
+        chunk_size: int = 1024 * 1024,
+        result_ttl_seconds: float = 86400
+    ):
+        self.pipeline = pipeline
+        self.executor = executor
+        self.jobs_dir = jobs_dir or os.path.join(tempfile.gettempdir(), "email-imports")
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_messages = max_messages
+        self.max_file_size = max_file_size_mb * 1024 * 1024
+        self.max_chars = max_chars
+        self.chunk_size = chunk_size
+        self.result_ttl_seconds = result_ttl_seconds
+        self.jobs: Dict[str, ImportJob] = {}
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def submit(self, source: BinaryIO, filename: str) -> ImportJob:
+        os.makedirs(self.jobs_dir, exist_ok=True)
+        await self._prune()
+        job_id = uuid.uuid4().hex
+        job = ImportJob(
+            job_id=job_id,
+            filename=filename,
+            upload_path=os.path.join(self.jobs_dir, f"{job_id}.upload"),
+            results_path=os.path.join(self.jobs_dir, f"{job_id}.jsonl"),
+            created_at=datetime.now().isoformat()
+        )
+
+        # o upload é fechado ao fim da requisição; o job trabalha sobre uma cópia em disco
+        try:
+            await self.executor.run_light(_copy_upload, source, job.upload_path, self.max_file_size, self.chunk_size)
+        except Exception:
+            self._remove(job.upload_path)
+            raise
+
+        self.jobs[job_id] = job
+        self._save(job)
+        task = asyncio.create_task(self._run(job))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return job
+
+    def get(self, job_id: str) -> Optional[ImportJob]:
+        job = self.jobs.get(job_id)
+        if job is None:
+            # com vários workers, a importação pode estar rodando em outro processo
+            job = self._load(job_id)
+        return job
+
+    def _status_path(self, job_id: str) -> str:
+        return os.path.join(self.jobs_dir, f"{job_id}.json")
+
+    def _job_paths(self, job_id: str) -> List[str]:
+        return [
+            self._status_path(job_id),
+            os.path.join(self.jobs_dir, f"{job_id}.jsonl"),
+            os.path.join(self.jobs_dir, f"{job_id}.upload")
+        ]
+
+    async def _prune(self):
+        try:
+            expired = await self.executor.run_light(self._remove_expired_files)
+        except ExecutorSaturatedError:
+            # a limpeza fica para a próxima importação
+            return
+        for job_id in expired:
+            self.jobs.pop(job_id, None)
+
+    def _remove_expired_files(self) -> List[str]:
+        # o diretório é compartilhado entre os workers; só sai o job sem escrita desde o prazo
+        cutoff = time.time() - self.result_ttl_seconds
+        try:
+            names = os.listdir(self.jobs_dir)
+        except OSError:
+            return []
+
+        expired = []
+        for job_id in {name.split('.', 1)[0] for name in names}:
+            if not JOB_ID_PATTERN.fullmatch(job_id):
+                continue
+            job = self.jobs.get(job_id)
+            if job is not None and job.finished_at is None:
+                continue
+            paths = self._job_paths(job_id)
+            if any(self._modified_at(path) > cutoff for path in paths):
+                continue
+            for path in paths:
+                self._remove(path)
+            expired.append(job_id)
+
+        if expired:
+            logger.info(f"{len(expired)} importações expiradas removidas")
+        return expired
+
+    @staticmethod
+    def _modified_at(path: str) -> float:
+        try:
+            return os.path.getmtime(path)
+        except OSError:
+            return 0.0
+
+    def _save(self, job: ImportJob):
+        path = self._status_path(job.job_id)
+        try:
+            with open(f"{path}.tmp", 'w', encoding='utf-8') as f:
+                json.dump(job.to_dict(), f, ensure_ascii=False)
+            os.replace(f"{path}.tmp", path)
+        except OSError as e:
+            logger.warning(f"Erro ao gravar o estado da importação {job.job_id}: {e}")
+
+    def _load(self, job_id: str) -> Optional[ImportJob]:
+        if not JOB_ID_PATTERN.fullmatch(job_id):
+            return None
+        try:
+            with open(self._status_path(job_id), 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return ImportJob(
+            upload_path=os.path.join(self.jobs_dir, f"{job_id}.upload"),
+            results_path=os.path.join(self.jobs_dir, f"{job_id}.jsonl"),
+            **data
+        )
+
+    async def _run(self, job: ImportJob):
+        job.status = "running"
+        job.started_at = datetime.now().isoformat()
+        self._save(job)
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        pending: Set[asyncio.Task] = set()
+
+        try:
+            with open(job.upload_path, 'rb') as upload, open(job.results_path, 'w', encoding='utf-8') as results:
+                messages = iter_mailbox(upload, job.filename, self.max_chars)
+                index = 0
+
+                try:
+                    while True:
+                        email = await self._wait_for_executor(lambda: self.executor.run_light(_next_email, messages))
+                        if email is None:
+                            break
+                        if index >= self.max_messages:
+                            job.truncated = True
+                            break
+
+                        # só lê a próxima mensagem quando há vaga, mantendo a memória constante
+                        slot = AdmissionSlot(semaphore)
+                        await slot.acquire()
+                        task = asyncio.create_task(self._classify(job, index, email, results, slot))
+                        pending.add(task)
+                        task.add_done_callback(pending.discard)
+                        index += 1
+                except asyncio.CancelledError:
+                    for task in pending:
+                        task.cancel()
+                    raise
+                finally:
+                    # as classificações gravam no arquivo de resultados: terminam antes de ele
+                    # ser fechado e antes do estado final ser salvo (após um erro de leitura,
+                    # as mensagens já lidas ainda são classificadas)
+                    if pending:
+                        await asyncio.gather(*pending, return_exceptions=True)
+
+            job.status = "completed"
+
+        except asyncio.CancelledError:
+            job.status = "cancelled"
+            raise
+        except Exception as e:
+            logger.error(f"Erro na importação {job.job_id}: {str(e)}")
+            job.status = "failed"
+            job.error = str(e)
+        finally:
+            job.finished_at = datetime.now().isoformat()
+            self._save(job)
+            self._remove(job.upload_path)
+
+    async def _classify(self, job: ImportJob, index: int, email: Dict[str, Any], results, slot: AdmissionSlot):
+        record = {
+            "index": index,
+            "source": email["source"],
+            "message_id": email["message_id"],
+            "sender_name": email["sender_name"],
+            "subject": email["subject"]
+        }
+
+        try:
+            if not email["email_content"].strip():
+                raise ValueError("Email sem conteúdo de texto")
+
+            email_data = await self._wait_for_executor(lambda: self.pipeline.build_email_data(
+                email["email_content"],
+                email["sender_name"],
+                email["subject"],
+                filename=email["source"]
+            ))
+            result = await self.pipeline.run(email_data, packed=True, slot=slot)
+            record.update(success=True, result=result.model_dump(mode="json"))
+            job.succeeded += 1
+        except Exception as e:
+            logger.warning(f"Erro na mensagem {email['source']} da importação {job.job_id}: {str(e)}")
+            record.update(success=False, error=str(e))
+            job.failed += 1
+        finally:
+            slot.release()
+
+        job.processed += 1
+        results.write(json.dumps(record, ensure_ascii=False) + "\n")
+        results.flush()
+        if job.processed % STATUS_SAVE_INTERVAL == 0:
+            self._save(job)
+
+    @staticmethod
+    async def _wait_for_executor(call: Callable[[], Awaitable[Any]]) -> Any:
+        while True:
+            try:
+                return await call()
+            except ExecutorSaturatedError:
+                # pico momentâneo no pool: a importação espera uma vaga em vez de falhar
+                await asyncio.sleep(SATURATED_RETRY_DELAY)
+
+    @staticmethod
+    def _remove(path: str):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    async def shutdown(self):
+        for task in list(self._tasks):
+            task.cancel()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
@@ -0,0 +1,85 @@
+import re
+from typing import Dict, List, NamedTuple, Tuple, Iterable
+
+class IndicatorMatch(NamedTuple):
+    category: str
+    term: str
+    start: int
+    end: int
+
+class IndicatorMatcher:
+    def __init__(self, patterns: Dict[str, Iterable[str]]):
+        self.categories: Tuple[str, ...] = tuple(patterns)
+        self._term_categories: Dict[str, List[str]] = {}
+
+        for category, terms in patterns.items():
+            for term in terms:
+                normalized = self._normalize(term)
+                if not normalized:
+                    continue
+                term_categories = self._term_categories.setdefault(normalized, [])
+                if category not in term_categories:
+                    term_categories.append(category)
+
+        self._pattern = self._compile(self._term_categories)
+
+    @staticmethod
+    def _normalize(term: str) -> str:
+        return ' '.join(term.lower().split())
+
+    @classmethod
+    def _compile(cls, terms: Iterable[str]):
+        trie: Dict[str, dict] = {}
+        for term in terms:
+            node = trie
+            for char in term:
+                node = node.setdefault(char, {})
+            node[''] = {}
+
+        if not trie:
+            return None
+
+        # uma única expressão em forma de trie: o custo por posição depende
+        # do comprimento dos termos, não da quantidade de termos
+        return re.compile(
+            r'(?<!\w)(?:' + cls._trie_to_regex(trie) + r')(?!\w)',
+            re.IGNORECASE
+        )
+
+    @classmethod
+    def _trie_to_regex(cls, node: Dict[str, dict]) -> str:
+        is_terminal = '' in node
+        branches = []
+
+        for char in sorted(char for char in node if char):
+            escaped = r'\s+' if char == ' ' else re.escape(char)
+            branches.append(escaped + cls._trie_to_regex(node[char]))
+
+        if not branches:
+            return ''
+
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        if is_terminal:
+            return '(?:' + body + ')?'
+        return body
+
+    def scan(self, text: str) -> List[IndicatorMatch]:
+        if not text or self._pattern is None:
+            return []
+
+        matches = []
+        for match in self._pattern.finditer(text):
+            term = self._normalize(match.group(0))
+            for category in self._term_categories.get(term, ()):
+                matches.append(IndicatorMatch(category, term, match.start(), match.end()))
+
+        return matches
+
+    def find(self, text: str) -> Tuple[Dict[str, Tuple[str, ...]], Tuple[IndicatorMatch, ...]]:
+        matches = self.scan(text)
+        found: Dict[str, Dict[str, None]] = {category: {} for category in self.categories}
+
+        for match in matches:
+            found[match.category].setdefault(match.term, None)
+
+        return {category: tuple(terms) for category, terms in found.items()}, tuple(matches)
@@ -0,0 +1,346 @@
+import json
+import time
+import uuid
+import sqlite3
+import asyncio
+import logging
+import threading
+from typing import Any, Dict, List, Optional
+from services.classification_pipeline import ClassificationPipeline
+from services.tracing import Tracer
+
+logger = logging.getLogger(__name__)
+
+FINISHED_STATUSES = {"completed", "failed", "cancelled"}
+
+class JobQueueFullError(Exception):
+    pass
+
+class JobQueue:
+    def __init__(
+        self,
+        pipeline: ClassificationPipeline,
+        sqlite_path: str = "jobs.sqlite3",
+        workers: int = 4,
+        max_queued: int = 10000,
+        result_ttl_seconds: float = 86400,
+        poll_interval: float = 0.5,
+        lease_seconds: float = 60.0,
+        tracer: Optional[Tracer] = None
+    ):
+        self.pipeline = pipeline
+        self.sqlite_path = sqlite_path
+        self.workers = max(1, workers)
+        self.max_queued = max_queued
+        self.result_ttl_seconds = result_ttl_seconds
+        self.poll_interval = poll_interval
+        self.lease_seconds = max(1.0, lease_seconds)
+        self.tracer = tracer or Tracer()
+        self._db: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._finished: Dict[str, asyncio.Event] = {}
+        self._running: Dict[str, asyncio.Task] = {}
+        self._workers: List[asyncio.Task] = []
+        self._heartbeat: Optional[asyncio.Task] = None
+        self._claims_since_prune = 0
+
+    def _connect(self):
+        # com vários workers, a espera pelo lock de escrita de outro processo vira espera, não erro
+        self._db = sqlite3.connect(self.sqlite_path, check_same_thread=False, isolation_level=None, timeout=5.0)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id TEXT PRIMARY KEY, status TEXT NOT NULL, priority INTEGER NOT NULL, "
+            "payload TEXT NOT NULL, result TEXT, error TEXT, "
+            "created_at REAL NOT NULL, started_at REAL, finished_at REAL)"
+        )
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS jobs_queue ON jobs (status, priority DESC, created_at)"
+        )
+        columns = {row["name"] for row in self._db.execute("PRAGMA table_info(jobs)")}
+        if "heartbeat_at" not in columns:
+            self._db.execute("ALTER TABLE jobs ADD COLUMN heartbeat_at REAL")
+        if "cancel_requested" not in columns:
+            self._db.execute("ALTER TABLE jobs ADD COLUMN cancel_requested INTEGER NOT NULL DEFAULT 0")
+
+    async def start(self):
+        # o SQLite roda em threads para que a espera por locks não bloqueie o event loop
+        if self._db is None:
+            await asyncio.to_thread(self._connect)
+        self._wakeup = asyncio.Event()
+
+        await asyncio.to_thread(self._recover_expired)
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self._heartbeat = asyncio.create_task(self._heartbeat_loop())
+
+    async def shutdown(self):
+        interrupted = list(self._running)
+        tasks = self._workers + ([self._heartbeat] if self._heartbeat else [])
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._workers = []
+        self._heartbeat = None
+
+        if self._db is not None:
+            await asyncio.to_thread(self._release_and_close, interrupted)
+            self._db = None
+
+    def _release_and_close(self, interrupted: List[str]):
+        with self._lock:
+            # interrompidos no desligamento voltam para a fila, salvo os que já tinham cancelamento pedido
+            self._db.executemany(
+                "UPDATE jobs SET status = 'cancelled', finished_at = ? "
+                "WHERE id = ? AND status = 'running' AND cancel_requested = 1",
+                [(time.time(), job_id) for job_id in interrupted]
+            )
+            self._db.executemany(
+                "UPDATE jobs SET status = 'queued', started_at = NULL, heartbeat_at = NULL "
+                "WHERE id = ? AND status = 'running'",
+                [(job_id,) for job_id in interrupted]
+            )
+            self._db.close()
+
+    async def submit(self, payload: Dict[str, Any], priority: int = 0) -> Dict[str, Any]:
+        job_id = uuid.uuid4().hex
+        await asyncio.to_thread(self._insert, job_id, payload, priority)
+
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return await self.get(job_id)
+
+    def _insert(self, job_id: str, payload: Dict[str, Any], priority: int):
+        with self._lock:
+            queued = self._db.execute("SELECT COUNT(*) FROM jobs WHERE status = 'queued'").fetchone()[0]
+            if queued >= self.max_queued:
+                raise JobQueueFullError(f"Fila de jobs cheia ({queued} jobs aguardando)")
+
+            self._db.execute(
+                "INSERT INTO jobs (id, status, priority, payload, created_at) VALUES (?, 'queued', ?, ?, ?)",
+                (job_id, priority, json.dumps(payload, ensure_ascii=False), time.time())
+            )
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return await asyncio.to_thread(self._select, job_id)
+
+    def _select(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT id, status, priority, result, error, created_at, started_at, finished_at "
+                "FROM jobs WHERE id = ?",
+                (job_id,)
+            ).fetchone()
+
+        if row is None:
+            return None
+
+        job = dict(row)
+        job["job_id"] = job.pop("id")
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    async def wait(self, job_id: str, timeout: float) -> Optional[Dict[str, Any]]:
+        deadline = time.monotonic() + timeout
+        job = await self.get(job_id)
+
+        while job is not None and job["status"] not in FINISHED_STATUSES:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+
+            # o evento acorda na hora quando o job roda neste processo; a consulta
+            # periódica cobre jobs executados por outro processo
+            event = self._finished.setdefault(job_id, asyncio.Event())
+            try:
+                await asyncio.wait_for(event.wait(), timeout=min(remaining, self.poll_interval))
+            except asyncio.TimeoutError:
+                pass
+            job = await self.get(job_id)
+
+        if job is None or job["status"] in FINISHED_STATUSES:
+            self._finished.pop(job_id, None)
+        return job
+
+    async def cancel(self, job_id: str) -> Optional[Dict[str, Any]]:
+        await asyncio.to_thread(self._request_cancel, job_id)
+
+        task = self._running.get(job_id)
+        if task is not None:
+            task.cancel()
+        return await self.get(job_id)
+
+    def _request_cancel(self, job_id: str):
+        with self._lock:
+            # um job na fila termina aqui; um em execução fica marcado e o processo que o
+            # reivindicou o interrompe na próxima volta do heartbeat
+            self._db.execute(
+                "UPDATE jobs SET cancel_requested = 1, "
+                "status = CASE status WHEN 'queued' THEN 'cancelled' ELSE status END, "
+                "finished_at = CASE status WHEN 'queued' THEN ? ELSE finished_at END "
+                "WHERE id = ? AND status IN ('queued', 'running')",
+                (time.time(), job_id)
+            )
+
+    async def stats(self) -> Dict[str, Any]:
+        rows = await asyncio.to_thread(self._count_by_status)
+        return {
+            "workers": self.workers,
+            "max_queued": self.max_queued,
+            "running_here": len(self._running),
+            **{status: count for status, count in rows}
+        }
+
+    def _count_by_status(self) -> List[sqlite3.Row]:
+        with self._lock:
+            return self._db.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+
+    def _claim(self) -> Optional[sqlite3.Row]:
+        with self._lock:
+            # BEGIN IMMEDIATE impede que outro processo reivindique o mesmo job
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._db.execute(
+                    "SELECT id, payload FROM jobs WHERE status = 'queued' "
+                    "ORDER BY priority DESC, created_at LIMIT 1"
+                ).fetchone()
+                if row is not None:
+                    now = time.time()
+                    self._db.execute(
+                        "UPDATE jobs SET status = 'running', started_at = ?, heartbeat_at = ? WHERE id = ?",
+                        (now, now, row["id"])
+                    )
+                self._db.execute("COMMIT")
+            except sqlite3.Error:
+                self._db.execute("ROLLBACK")
+                raise
+
+            self._claims_since_prune += 1
+            if self._claims_since_prune >= 1000:
+                self._prune()
+            return row
+
+    def _recover_expired(self):
+        # jobs sem sinal de vida pertenciam a um processo que parou; os demais
+        # estão rodando em outro worker e não podem ser devolvidos à fila
+        cutoff = time.time() - self.lease_seconds
+        with self._lock:
+            self._db.execute(
+                "UPDATE jobs SET status = 'cancelled', finished_at = ? "
+                "WHERE status = 'running' AND cancel_requested = 1 AND COALESCE(heartbeat_at, started_at, 0) < ?",
+                (time.time(), cutoff)
+            )
+            recovered = self._db.execute(
+                "UPDATE jobs SET status = 'queued', started_at = NULL, heartbeat_at = NULL "
+                "WHERE status = 'running' AND COALESCE(heartbeat_at, started_at, 0) < ?",
+                (cutoff,)
+            ).rowcount
+        if recovered:
+            logger.info(f"{recovered} jobs interrompidos devolvidos à fila")
+
+    def _renew(self, running: List[str]):
+        if running:
+            now = time.time()
+            with self._lock:
+                self._db.executemany(
+                    "UPDATE jobs SET heartbeat_at = ? WHERE id = ? AND status = 'running'",
+                    [(now, job_id) for job_id in running]
+                )
+        self._recover_expired()
+
+    def _cancel_requested(self, running: List[str]) -> List[str]:
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT id FROM jobs WHERE cancel_requested = 1 AND id IN ({','.join('?' * len(running))})",
+                running
+            ).fetchall()
+        return [row["id"] for row in rows]
+
+    async def _heartbeat_loop(self):
+        # a cada volta procura cancelamentos pedidos por qualquer processo; o lease é renovado
+        # a cada terço do prazo
+        renewed_at = time.monotonic()
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                running = list(self._running)
+                if running:
+                    for job_id in await asyncio.to_thread(self._cancel_requested, running):
+                        task = self._running.get(job_id)
+                        if task is not None:
+                            task.cancel()
+
+                if time.monotonic() - renewed_at >= self.lease_seconds / 3:
+                    renewed_at = time.monotonic()
+                    await asyncio.to_thread(self._renew, list(self._running))
+            except sqlite3.Error as e:
+                logger.error(f"Erro ao renovar os jobs em execução: {e}")
+
+    def _prune(self):
+        self._claims_since_prune = 0
+        self._db.execute(
+            "DELETE FROM jobs WHERE finished_at IS NOT NULL AND finished_at <= ?",
+            (time.time() - self.result_ttl_seconds,)
+        )
+
+    async def _finish(self, job_id: str, status: str, result: Optional[Dict[str, Any]] = None, error: Optional[str] = None):
+        await asyncio.to_thread(self._update_finished, job_id, status, result, error)
+
+        event = self._finished.pop(job_id, None)
+        if event is not None:
+            event.set()
+
+    def _update_finished(self, job_id: str, status: str, result: Optional[Dict[str, Any]], error: Optional[str]):
+        with self._lock:
+            self._db.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ? WHERE id = ?",
+                (status, json.dumps(result, ensure_ascii=False) if result else None, error, time.time(), job_id)
+            )
+
+    async def _worker(self):
+        while True:
+            # limpa antes de consultar para não perder um submit feito durante a consulta
+            self._wakeup.clear()
+            try:
+                row = await asyncio.to_thread(self._claim)
+            except sqlite3.Error as e:
+                logger.error(f"Erro ao ler a fila de jobs: {e}")
+                row = None
+
+            if row is None:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            job_id = row["id"]
+            task = asyncio.create_task(self._execute(job_id, json.loads(row["payload"])))
+            self._running[job_id] = task
+            try:
+                # o shield separa os dois cancelamentos: o do job (cancel) e o do worker (desligamento)
+                result = await asyncio.shield(task)
+                await self._finish(job_id, "completed", result=result)
+            except asyncio.CancelledError:
+                if not task.cancelled():
+                    # o próprio worker foi cancelado (desligamento); o job volta para a fila no shutdown
+                    task.cancel()
+                    raise
+                await self._finish(job_id, "cancelled")
+            except Exception as e:
+                logger.error(f"Erro no job {job_id}: {str(e)}")
+                await self._finish(job_id, "failed", error=str(e))
+            finally:
+                self._running.pop(job_id, None)
+
+    async def _execute(self, job_id: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        with self.tracer.trace("job", job_id=job_id):
+            email_data = await self.pipeline.build_email_data(
+                payload["email_content"],
+                payload.get("sender_name"),
+                payload.get("subject"),
+                filename=payload.get("filename")
+            )
+            result = await self.pipeline.run(email_data, packed=True)
+            return result.model_dump(mode="json")
@@ -0,0 +1,173 @@
+import sys
+import json
+import math
+import zlib
+import random
+import logging
+import argparse
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+CATEGORIES = ("produtivo", "improdutivo")
+
+class LocalClassifier:
+    def __init__(self, n_features: int = 2 ** 18, alpha: float = 1.0):
+        self.n_features = n_features
+        self.alpha = alpha
+        self.class_counts: Dict[str, int] = {category: 0 for category in CATEGORIES}
+        self.feature_counts: Dict[str, Dict[int, float]] = {category: defaultdict(float) for category in CATEGORIES}
+        self.feature_totals: Dict[str, float] = {category: 0.0 for category in CATEGORIES}
+
+    def _features(self, stems: Sequence[str]) -> Dict[int, int]:
+        # hashing estável entre processos (hash() do Python é aleatorizado)
+        features: Dict[int, int] = defaultdict(int)
+        for stem in stems:
+            features[zlib.crc32(stem.encode('utf-8')) % self.n_features] += 1
+        for first, second in zip(stems, stems[1:]):
+            features[zlib.crc32(f"{first} {second}".encode('utf-8')) % self.n_features] += 1
+        return features
+
+    def train(self, samples: Iterable[Tuple[Sequence[str], str]]):
+        for stems, category in samples:
+            if category not in self.class_counts:
+                continue
+            self.class_counts[category] += 1
+            for feature, count in self._features(stems).items():
+                self.feature_counts[category][feature] += count
+                self.feature_totals[category] += count
+
+    @property
+    def is_trained(self) -> bool:
+        return all(self.class_counts[category] > 0 for category in CATEGORIES)
+
+    def predict_proba(self, stems: Sequence[str]) -> Dict[str, float]:
+        features = self._features(stems)
+        total_documents = sum(self.class_counts.values())
+        log_scores = {}
+
+        for category in CATEGORIES:
+            denominator = math.log(self.feature_totals[category] + self.alpha * self.n_features)
+            counts = self.feature_counts[category]
+            score = math.log(self.class_counts[category] / total_documents)
+            for feature, count in features.items():
+                score += count * (math.log(counts.get(feature, 0.0) + self.alpha) - denominator)
+            log_scores[category] = score
+
+        best = max(log_scores.values())
+        exp_scores = {category: math.exp(score - best) for category, score in log_scores.items()}
+        normalizer = sum(exp_scores.values())
+        return {category: value / normalizer for category, value in exp_scores.items()}
+
+    def predict(self, stems: Sequence[str]) -> Tuple[str, float]:
+        probabilities = self.predict_proba(stems)
+        category = max(probabilities, key=probabilities.get)
+        return category, probabilities[category]
+
+    def save(self, path: str):
+        model = {
+            "version": 1,
+            "n_features": self.n_features,
+            "alpha": self.alpha,
+            "class_counts": self.class_counts,
+            "feature_counts": {
+                category: {str(feature): count for feature, count in counts.items()}
+                for category, counts in self.feature_counts.items()
+            }
+        }
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(model, f)
+
+    @classmethod
+    def load(cls, path: str) -> "LocalClassifier":
+        with open(path, 'r', encoding='utf-8') as f:
+            model = json.load(f)
+
+        classifier = cls(n_features=model["n_features"], alpha=model["alpha"])
+        classifier.class_counts.update(model["class_counts"])
+        for category, counts in model["feature_counts"].items():
+            classifier.feature_counts[category] = defaultdict(
+                float, {int(feature): count for feature, count in counts.items()}
+            )
+            classifier.feature_totals[category] = sum(counts.values())
+        return classifier
+
+def load_local_classifier(path: Optional[str]) -> Optional[LocalClassifier]:
+    if not path:
+        return None
+    try:
+        classifier = LocalClassifier.load(path)
+    except (OSError, ValueError, KeyError) as e:
+        logger.warning(f"Modelo local não carregado ({path}): {e}")
+        return None
+
+    if not classifier.is_trained:
+        logger.warning(f"Modelo local em {path} não tem exemplos das duas categorias")
+        return None
+
+    logger.info(f"Modelo local carregado de {path}: {classifier.class_counts}")
+    return classifier
+
+def _read_labeled_emails(path: str, email_processor) -> List[Tuple[List[str], str]]:
+    samples = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                logger.warning(f"Linha {line_number} ignorada: JSON inválido")
+                continue
+
+            text = record.get("email_content") or record.get("content") or record.get("text") or ""
+            category = str(record.get("category") or record.get("categoria") or "").lower()
+            if not text or category not in CATEGORIES:
+                logger.warning(f"Linha {line_number} ignorada: conteúdo ou categoria ausente")
+                continue
+
+            samples.append((email_processor.preprocess_text(text).split(), category))
+    return samples
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Treina o classificador local a partir de um JSONL de emails rotulados")
+    parser.add_argument("dataset", help="Arquivo JSONL com os campos email_content e category")
+    parser.add_argument("output", help="Arquivo JSON onde o modelo será salvo")
+    parser.add_argument("--holdout", type=float, default=0.1, help="Fração dos exemplos usada para avaliação")
+    parser.add_argument("--threshold", type=float, default=0.95, help="Confiança mínima avaliada para pular o LLM")
+    parser.add_argument("--n-features", type=int, default=2 ** 18, help="Tamanho do espaço de hashing")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    from services.email_processor import EmailProcessor
+
+    samples = _read_labeled_emails(args.dataset, EmailProcessor())
+    random.Random(42).shuffle(samples)
+    holdout_size = int(len(samples) * args.holdout)
+    evaluation, training = samples[:holdout_size], samples[holdout_size:]
+
+    classifier = LocalClassifier(n_features=args.n_features)
+    classifier.train(training)
+
+    if evaluation:
+        correct = confident = confident_correct = 0
+        for stems, category in evaluation:
+            predicted, confidence = classifier.predict(stems)
+            correct += predicted == category
+            if confidence >= args.threshold:
+                confident += 1
+                confident_correct += predicted == category
+        print(f"Acurácia: {correct / len(evaluation):.3f} em {len(evaluation)} exemplos")
+        if confident:
+            print(
+                f"Cobertura com confiança >= {args.threshold}: {confident / len(evaluation):.3f} "
+                f"(acurácia {confident_correct / confident:.3f})"
+            )
+
+    classifier.train(evaluation)
+    classifier.save(args.output)
+    print(f"Modelo salvo em {args.output} ({len(samples)} exemplos)")
+
+if __name__ == "__main__":
+    sys.exit(main())
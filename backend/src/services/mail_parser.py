@@ -0,0 +1,121 @@
+import os
+import re
+import html
+import zipfile
+import logging
+from email import policy
+from email.message import EmailMessage
+from email.parser import BytesParser, BytesFeedParser
+from email.utils import parseaddr
+from typing import Any, BinaryIO, Dict, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+MAILBOX_EXTENSIONS = {'.mbox', '.eml', '.zip'}
+
+_HTML_BLOCK_PATTERN = re.compile(r'<(script|style)\b.*?</\1\s*>', re.IGNORECASE | re.DOTALL)
+_HTML_BREAK_PATTERN = re.compile(r'<\s*(br|/p|/div|/li|/tr)\b[^>]*>', re.IGNORECASE)
+_HTML_TAG_PATTERN = re.compile(r'<[^>]+>')
+_BLANK_LINES_PATTERN = re.compile(r'\n\s*\n+')
+
+def is_mailbox_file(filename: Optional[str]) -> bool:
+    if not filename:
+        return False
+    return os.path.splitext(filename)[1].lower() in MAILBOX_EXTENSIONS
+
+def _html_to_text(content: str) -> str:
+    content = _HTML_BLOCK_PATTERN.sub(' ', content)
+    content = _HTML_BREAK_PATTERN.sub('\n', content)
+    content = html.unescape(_HTML_TAG_PATTERN.sub(' ', content))
+    return _BLANK_LINES_PATTERN.sub('\n\n', content)
+
+def _body_text(message: EmailMessage) -> str:
+    part = message.get_body(preferencelist=('plain', 'html'))
+    if part is None:
+        return ""
+
+    try:
+        content = part.get_content()
+    except (LookupError, UnicodeError, AssertionError):
+        # charset desconhecido ou mal declarado
+        payload = part.get_payload(decode=True) or b""
+        content = payload.decode('utf-8', errors='replace')
+
+    if not isinstance(content, str):
+        return ""
+    if part.get_content_subtype() == 'html':
+        content = _html_to_text(content)
+    return content.strip()
+
+def _header(message: EmailMessage, name: str) -> Optional[str]:
+    try:
+        value = message.get(name)
+    except Exception as e:
+        # cabeçalhos malformados não devem derrubar a importação inteira
+        logger.warning(f"Cabeçalho {name} ilegível: {e}")
+        return None
+    return str(value).strip() if value else None
+
+def message_to_email(message: EmailMessage, source: str, max_chars: Optional[int] = None) -> Dict[str, Any]:
+    display_name, address = parseaddr(_header(message, 'From') or '')
+    try:
+        content = _body_text(message)
+    except Exception as e:
+        logger.warning(f"Corpo ilegível na mensagem {source}: {e}")
+        content = ""
+    if max_chars is not None:
+        content = content[:max_chars]
+
+    return {
+        "email_content": content,
+        "sender_name": display_name or address or None,
+        "subject": _header(message, 'Subject'),
+        "message_id": _header(message, 'Message-ID'),
+        "source": source
+    }
+
+def _iter_mbox(stream: BinaryIO) -> Iterator[EmailMessage]:
+    # divide o mbox linha a linha, mantendo apenas uma mensagem em memória por vez
+    parser = None
+    previous_blank = True
+
+    for line in stream:
+        if line.startswith(b'From ') and previous_blank:
+            if parser is not None:
+                yield parser.close()
+            parser = BytesFeedParser(policy=policy.default)
+            previous_blank = False
+            continue
+
+        if parser is not None:
+            if line.startswith(b'>From '):
+                line = line[1:]
+            parser.feed(line)
+        previous_blank = not line.strip()
+
+    if parser is not None:
+        yield parser.close()
+
+def _iter_file(stream: BinaryIO, name: str) -> Iterator[EmailMessage]:
+    extension = os.path.splitext(name)[1].lower()
+    if extension == '.eml':
+        yield BytesParser(policy=policy.default).parse(stream)
+    elif extension == '.mbox':
+        yield from _iter_mbox(stream)
+
+def iter_mailbox(stream: BinaryIO, filename: str, max_chars: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+    extension = os.path.splitext(filename)[1].lower()
+
+    if extension != '.zip':
+        for position, message in enumerate(_iter_file(stream, filename)):
+            yield message_to_email(message, f"{filename}#{position}", max_chars)
+        return
+
+    with zipfile.ZipFile(stream) as archive:
+        for info in archive.infolist():
+            if info.is_dir() or not is_mailbox_file(info.filename) or info.filename.lower().endswith('.zip'):
+                continue
+
+            with archive.open(info) as member:
+                for position, message in enumerate(_iter_file(member, info.filename)):
+                    yield message_to_email(message, f"{info.filename}#{position}", max_chars)
@@ -0,0 +1,243 @@
+import math
+import time
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+LabelValues = Tuple[str, ...]
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, description: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.description = description
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels.get(name, "")) for name in self.label_names)
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        return [
+            f"# HELP {self.name} {self.description}",
+            f"# TYPE {self.name} {self.kind}",
+            *self._samples()
+        ]
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, description: str, labels: Sequence[str] = (),
+                 callback: Optional[Callable[[], Dict[LabelValues, float]]] = None):
+        super().__init__(name, description, labels)
+        # séries sem rótulos aparecem zeradas desde o início
+        self._values: Dict[LabelValues, float] = {} if self.label_names else {(): 0.0}
+        self.callback = callback
+
+    def inc(self, amount: float = 1.0, **labels: str):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def _samples(self) -> List[str]:
+        if self.callback is not None:
+            # valores lidos na hora da coleta, como o tamanho das filas
+            values = self.callback()
+            with self._lock:
+                self._values.update(values)
+        with self._lock:
+            items = sorted(self._values.items())
+        return [
+            f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}"
+            for key, value in items
+        ]
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, **labels: str):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def dec(self, amount: float = 1.0, **labels: str):
+        self.inc(-amount, **labels)
+
+    @contextmanager
+    def track(self, **labels: str) -> Iterator[None]:
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, description: str, labels: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, description, labels)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        self._counts: Dict[LabelValues, List[int]] = {}
+        self._sums: Dict[LabelValues, float] = {}
+
+    def observe(self, value: float, **labels: str):
+        key = self._key(labels)
+        with self._lock:
+            counts = self._counts.setdefault(key, [0] * len(self.buckets))
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[index] += 1
+                    break
+            self._sums[key] = self._sums.get(key, 0.0) + value
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted((key, list(counts), self._sums[key]) for key, counts in self._counts.items())
+
+        lines = []
+        for key, counts, total in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                labels = _format_labels(self.label_names, key, ("le", _format_value(bound)))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.label_names, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def _register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Métrica já registrada: {metric.name}")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, description: str, labels: Sequence[str] = (),
+                callback: Optional[Callable[[], Dict[LabelValues, float]]] = None) -> Counter:
+        return self._register(Counter(name, description, labels, callback))
+
+    def gauge(self, name: str, description: str, labels: Sequence[str] = (),
+              callback: Optional[Callable[[], Dict[LabelValues, float]]] = None) -> Gauge:
+        return self._register(Gauge(name, description, labels, callback))
+
+    def histogram(self, name: str, description: str, labels: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, description, labels, buckets))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+metrics = MetricsRegistry()
+
+STAGE_SECONDS = metrics.histogram(
+    "email_stage_duration_seconds",
+    "Duração de cada etapa do processamento de um email",
+    ["stage"]
+)
+HTTP_REQUEST_SECONDS = metrics.histogram(
+    "http_request_duration_seconds",
+    "Duração das requisições HTTP",
+    ["method", "route", "status_code"]
+)
+HTTP_IN_FLIGHT = metrics.gauge(
+    "http_requests_in_flight",
+    "Requisições HTTP em andamento"
+)
+CLASSIFICATIONS = metrics.counter(
+    "email_classifications_total",
+    "Classificações concluídas por origem e categoria",
+    ["source", "category"]
+)
+FALLBACKS = metrics.counter(
+    "email_fallbacks_total",
+    "Usos das respostas e classificações de contingência",
+    ["kind"]
+)
+CACHE_LOOKUPS = metrics.counter(
+    "cache_lookups_total",
+    "Consultas ao cache de resultados por resultado",
+    ["namespace", "result"]
+)
+UPSTREAM_RESPONSES = metrics.counter(
+    "upstream_responses_total",
+    "Respostas da API por código de status",
+    ["status_code"]
+)
+UPSTREAM_RETRIES = metrics.counter(
+    "upstream_retries_total",
+    "Novas tentativas de chamadas à API"
+)
+UPSTREAM_TOKENS = metrics.counter(
+    "upstream_tokens_total",
+    "Tokens consumidos segundo o campo usage das respostas da API",
+    ["type"]
+)
+PACKED_CLASSIFICATION_ITEMS = metrics.counter(
+    "packed_classification_items_total",
+    "Emails da classificação agrupada por resultado (packed, requeued, too_long)",
+    ["result"]
+)
+PACKED_CLASSIFICATION_SIZE = metrics.histogram(
+    "packed_classification_size",
+    "Número de emails em cada chamada de classificação agrupada",
+    buckets=(1, 2, 5, 10, 20, 50, 100)
+)
+SINGLE_FLIGHT_CALLS = metrics.counter(
+    "single_flight_calls_total",
+    "Chamadas idênticas simultâneas por papel (leader executa, coalesced aguarda o resultado)",
+    ["namespace", "result"]
+)
+CIRCUIT_TRANSITIONS = metrics.counter(
+    "circuit_breaker_transitions_total",
+    "Mudanças de estado do circuit breaker por estado de destino",
+    ["breaker", "state"]
+)
+CIRCUIT_REJECTIONS = metrics.counter(
+    "circuit_breaker_rejections_total",
+    "Chamadas recusadas na hora porque o circuito estava aberto",
+    ["breaker"]
+)
+UPSTREAM_HEDGES = metrics.counter(
+    "upstream_hedged_requests_total",
+    "Requisições duplicadas para outro provedor após o p90 de latência, por vencedor",
+    ["result"]
+)
@@ -0,0 +1,207 @@
+import os
+import time
+import uuid
+import asyncio
+import sqlite3
+import hashlib
+import logging
+import threading
+from collections import Counter, OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+FINGERPRINT_BITS = 64
+
+def _feature_hash(feature: str) -> int:
+    # hashing estável entre processos (hash() do Python é aleatorizado)
+    return int.from_bytes(hashlib.blake2b(feature.encode('utf-8'), digest_size=8).digest(), 'big')
+
+def simhash(stems: Sequence[str]) -> int:
+    features = Counter(stems)
+    features.update(f"{first} {second}" for first, second in zip(stems, stems[1:]))
+
+    weights = [0] * FINGERPRINT_BITS
+    for feature, count in features.items():
+        feature_hash = _feature_hash(feature)
+        for bit in range(FINGERPRINT_BITS):
+            if feature_hash >> bit & 1:
+                weights[bit] += count
+            else:
+                weights[bit] -= count
+
+    fingerprint = 0
+    for bit, weight in enumerate(weights):
+        if weight > 0:
+            fingerprint |= 1 << bit
+    return fingerprint
+
+class SimHashIndex:
+    def __init__(
+        self,
+        threshold: float = 0.9,
+        max_entries: int = 50000,
+        min_tokens: int = 15,
+        sqlite_path: Optional[str] = None
+    ):
+        self.threshold = threshold
+        self.max_distance = int((1.0 - threshold) * FINGERPRINT_BITS)
+        self.max_entries = max(1, max_entries)
+        self.min_tokens = min_tokens
+        self.sqlite_path = sqlite_path
+
+        # com d bits de distância máxima, d + 1 faixas garantem que duas impressões
+        # próximas coincidam em pelo menos uma faixa inteira
+        bands = min(self.max_distance + 1, FINGERPRINT_BITS)
+        widths = [FINGERPRINT_BITS // bands + (1 if index < FINGERPRINT_BITS % bands else 0) for index in range(bands)]
+        self._bands: List[Tuple[int, int]] = []
+        offset = 0
+        for width in widths:
+            self._bands.append((offset, (1 << width) - 1))
+            offset += width
+
+        self._entries: "OrderedDict[str, Tuple[int, str, float]]" = OrderedDict()
+        self._buckets: List[Dict[int, Set[str]]] = [{} for _ in self._bands]
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_pid: Optional[int] = None
+        self._writes_since_prune = 0
+        self.lookups = 0
+        self.matches = 0
+
+        if sqlite_path:
+            self._setup_sqlite(sqlite_path)
+            self._load_from_disk()
+
+    def _setup_sqlite(self, path: str):
+        self._db_pid = os.getpid()
+        try:
+            self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=5.0)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS near_duplicates ("
+                "id TEXT PRIMARY KEY, fingerprint TEXT NOT NULL, category TEXT NOT NULL, "
+                "confidence REAL NOT NULL, created_at REAL NOT NULL)"
+            )
+        except sqlite3.Error as e:
+            logger.warning(f"Índice de quase-duplicatas em disco indisponível ({path}): {e}")
+            self._db = None
+
+    def _connection(self) -> Optional[sqlite3.Connection]:
+        if self.sqlite_path and self._db_pid != os.getpid():
+            # conexões SQLite não podem atravessar um fork; cada worker abre a sua
+            self._setup_sqlite(self.sqlite_path)
+        return self._db
+
+    def _load_from_disk(self):
+        if self._db is None:
+            return
+        try:
+            rows = self._db.execute(
+                "SELECT id, fingerprint, category, confidence FROM near_duplicates "
+                "ORDER BY created_at DESC LIMIT ?",
+                (self.max_entries,)
+            ).fetchall()
+        except sqlite3.Error as e:
+            logger.warning(f"Erro ao carregar o índice de quase-duplicatas: {e}")
+            return
+
+        with self._lock:
+            for entry_id, fingerprint, category, confidence in reversed(rows):
+                self._insert(entry_id, int(fingerprint, 16), category, confidence)
+        if rows:
+            logger.info(f"{len(rows)} emails carregados no índice de quase-duplicatas")
+
+    def _band_keys(self, fingerprint: int) -> List[int]:
+        return [fingerprint >> offset & mask for offset, mask in self._bands]
+
+    def _insert(self, entry_id: str, fingerprint: int, category: str, confidence: float):
+        self._entries[entry_id] = (fingerprint, category, confidence)
+        for buckets, key in zip(self._buckets, self._band_keys(fingerprint)):
+            buckets.setdefault(key, set()).add(entry_id)
+
+        while len(self._entries) > self.max_entries:
+            evicted_id, (evicted_fingerprint, _, _) = self._entries.popitem(last=False)
+            for buckets, key in zip(self._buckets, self._band_keys(evicted_fingerprint)):
+                bucket = buckets.get(key)
+                if bucket is not None:
+                    bucket.discard(evicted_id)
+                    if not bucket:
+                        del buckets[key]
+
+    def fingerprint(self, stems: Sequence[str]) -> Optional[int]:
+        # textos curtos demais geram impressões pouco confiáveis
+        if len(stems) < self.min_tokens:
+            return None
+        return simhash(stems)
+
+    def find(self, fingerprint: int) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            self.lookups += 1
+            candidates: Set[str] = set()
+            for buckets, key in zip(self._buckets, self._band_keys(fingerprint)):
+                candidates.update(buckets.get(key, ()))
+
+            best_id, best_distance = None, FINGERPRINT_BITS + 1
+            for entry_id in candidates:
+                distance = (self._entries[entry_id][0] ^ fingerprint).bit_count()
+                if distance < best_distance:
+                    best_id, best_distance = entry_id, distance
+
+            if best_id is None or best_distance > self.max_distance:
+                return None
+
+            self.matches += 1
+            self._entries.move_to_end(best_id)
+            _, category, confidence = self._entries[best_id]
+            return {
+                "id": best_id,
+                "similarity": round(1.0 - best_distance / FINGERPRINT_BITS, 4),
+                "category": category,
+                "confidence": confidence
+            }
+
+    async def add(self, fingerprint: int, category: str, confidence: float) -> str:
+        entry_id = uuid.uuid4().hex
+        with self._lock:
+            self._insert(entry_id, fingerprint, category, confidence)
+        if self.sqlite_path:
+            # a gravação em disco roda em uma thread para não bloquear o event loop
+            await asyncio.to_thread(self._save_to_disk, entry_id, fingerprint, category, confidence)
+        return entry_id
+
+    def _save_to_disk(self, entry_id: str, fingerprint: int, category: str, confidence: float):
+        with self._db_lock:
+            db = self._connection()
+            if db is None:
+                return
+            try:
+                db.execute(
+                    "INSERT OR REPLACE INTO near_duplicates (id, fingerprint, category, confidence, created_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (entry_id, f"{fingerprint:016x}", category, confidence, time.time())
+                )
+                self._writes_since_prune += 1
+                if self._writes_since_prune >= 1000:
+                    self._writes_since_prune = 0
+                    db.execute(
+                        "DELETE FROM near_duplicates WHERE id IN ("
+                        "SELECT id FROM near_duplicates ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+                        (self.max_entries,)
+                    )
+            except sqlite3.Error as e:
+                logger.warning(f"Erro ao gravar o índice de quase-duplicatas: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "threshold": self.threshold,
+                "max_distance_bits": self.max_distance,
+                "disk_enabled": self._db is not None,
+                "lookups": self.lookups,
+                "matches": self.matches,
+                "match_rate": round(self.matches / self.lookups, 4) if self.lookups else 0.0
+            }
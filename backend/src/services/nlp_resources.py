@@ -0,0 +1,222 @@
+import os
+import re
+import time
+import pickle
+import logging
+import argparse
+import threading
+from dataclasses import dataclass, replace
+from typing import Any, Callable, Dict, FrozenSet, List, Optional, Tuple
+from config.settings import get_settings
+from services.stem_cache import StemCache
+
+logger = logging.getLogger(__name__)
+
+BUNDLE_FORMAT = 1
+
+NLTK_RESOURCES = (
+    ('tokenizers/punkt', 'punkt'),
+    ('corpora/stopwords', 'stopwords'),
+    ('stemmers/rslp', 'rslp'),
+)
+
+CUSTOM_STOP_WORDS = frozenset({
+    'bom', 'dia', 'tarde', 'noite', 'olá', 'oi', 'obrigado', 'obrigada',
+    'att', 'atenciosamente', 'cordialmente', 'abraço', 'abraços',
+    'email', 'mensagem', 'assunto', 'favor', 'gentileza', 'por',
+    'cumprimentos', 'saudações',
+    'sr', 'sra', 'prezado', 'prezada'
+})
+
+SENTENCE_END_PATTERN = re.compile(r'(?<=[.!?])\s+')
+
+@dataclass(frozen=True)
+class NlpResources:
+    stop_words: FrozenSet[str]
+    word_tokenizer: Any
+    stemmer: Any = None
+    sentence_tokenizer: Any = None
+    source: str = "nltk"
+    missing: Tuple[str, ...] = ()
+    stem_cache: Optional[StemCache] = None
+
+    def sent_tokenize(self, text: str) -> List[str]:
+        if self.sentence_tokenizer is None:
+            return [sentence for sentence in SENTENCE_END_PATTERN.split(text) if sentence]
+        return self.sentence_tokenizer.tokenize(text)
+
+    def word_tokenize(self, text: str) -> List[str]:
+        # mesmo resultado do nltk.word_tokenize, sem consultar o nltk.data a cada chamada
+        return [token for sentence in self.sent_tokenize(text) for token in self.word_tokenizer.tokenize(sentence)]
+
+    def stem(self, token: str) -> str:
+        if self.stem_cache is not None:
+            return self.stem_cache.stem(token)
+        if self.stemmer is None:
+            return token
+        return self.stemmer.stem(token)
+
+    def stem_all(self, tokens: List[str]) -> List[str]:
+        if self.stem_cache is not None:
+            return self.stem_cache.stem_all(tokens)
+        return [self.stem(token) for token in tokens]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "source": self.source,
+            "stop_words": len(self.stop_words),
+            "stemmer": self.stemmer is not None,
+            "sentence_tokenizer": self.sentence_tokenizer is not None,
+            "missing": list(self.missing),
+            "stem_cache": self.stem_cache.stats() if self.stem_cache is not None else None
+        }
+
+def _download(resource: str) -> bool:
+    import nltk
+
+    try:
+        if nltk.download(resource, quiet=True):
+            logger.info(f"Downloaded NLTK resource: {resource}")
+            return True
+    except Exception as e:
+        logger.warning(f"Falha ao baixar {resource}: {e}")
+    return False
+
+def _load_resource(resource: str, loader: Callable[[], Any], missing: List[str]) -> Any:
+    try:
+        return loader()
+    except (LookupError, OSError, ValueError) as e:
+        logger.debug(f"Recurso do NLTK {resource} indisponível: {e}")
+        missing.append(resource)
+        return None
+
+def _load_from_nltk_data(allow_download: bool = False) -> NlpResources:
+    import nltk
+    from nltk.corpus import stopwords
+    from nltk.stem import RSLPStemmer
+    from nltk.tokenize.destructive import NLTKWordTokenizer
+
+    if allow_download:
+        for path, resource in NLTK_RESOURCES:
+            try:
+                nltk.data.find(path)
+            except LookupError:
+                _download(resource)
+
+    missing: List[str] = []
+    portuguese_stops = _load_resource('stopwords', lambda: stopwords.words('portuguese'), missing) or []
+    stemmer = _load_resource('rslp', RSLPStemmer, missing)
+    sentence_tokenizer = _load_resource(
+        'punkt', lambda: nltk.data.load('tokenizers/punkt/portuguese.pickle'), missing
+    )
+
+    return NlpResources(
+        stop_words=frozenset(portuguese_stops) | CUSTOM_STOP_WORDS,
+        word_tokenizer=NLTKWordTokenizer(),
+        stemmer=stemmer,
+        sentence_tokenizer=sentence_tokenizer,
+        source="nltk",
+        missing=tuple(missing)
+    )
+
+def _load_bundle(path: str) -> NlpResources:
+    from nltk.tokenize.destructive import NLTKWordTokenizer
+
+    with open(path, 'rb') as f:
+        bundle = pickle.load(f)
+
+    if not isinstance(bundle, dict) or bundle.get("format") != BUNDLE_FORMAT:
+        raise ValueError(f"formato de pacote não suportado: {bundle.get('format') if isinstance(bundle, dict) else None}")
+
+    return NlpResources(
+        stop_words=frozenset(bundle["stop_words"]) | CUSTOM_STOP_WORDS,
+        word_tokenizer=NLTKWordTokenizer(),
+        stemmer=bundle["stemmer"],
+        sentence_tokenizer=bundle["sentence_tokenizer"],
+        source="bundle"
+    )
+
+def load_nlp_resources(bundle_path: Optional[str] = None, allow_download: bool = False) -> NlpResources:
+    if bundle_path:
+        try:
+            return _load_bundle(bundle_path)
+        except (OSError, ValueError, KeyError, AttributeError, ImportError, pickle.UnpicklingError) as e:
+            logger.warning(f"Pacote NLP não carregado ({bundle_path}), usando os dados locais do NLTK: {e}")
+
+    resources = _load_from_nltk_data(allow_download)
+    if resources.missing:
+        logger.warning(
+            f"Recursos do NLTK indisponíveis: {', '.join(resources.missing)}; "
+            "usando stopwords personalizadas, divisão simples de frases e tokens sem radicalização"
+        )
+    return resources
+
+def with_stem_cache(resources: NlpResources, max_entries: int, vocabulary_file: Optional[str] = None) -> NlpResources:
+    if resources.stemmer is None or max_entries <= 0:
+        return resources
+
+    stem_cache = StemCache(resources.stemmer.stem, max_entries)
+    if vocabulary_file:
+        try:
+            loaded = stem_cache.preload_file(vocabulary_file)
+            logger.info(f"{loaded} radicais pré-calculados a partir de {vocabulary_file}")
+        except OSError as e:
+            logger.warning(f"Vocabulário de radicais não carregado ({vocabulary_file}): {e}")
+    return replace(resources, stem_cache=stem_cache)
+
+_resources: Optional[NlpResources] = None
+_lock = threading.Lock()
+
+def get_nlp_resources() -> NlpResources:
+    # carregado uma única vez por processo e compartilhado por todos os EmailProcessor
+    global _resources
+    if _resources is None:
+        with _lock:
+            if _resources is None:
+                settings = get_settings()
+                start_time = time.perf_counter()
+                resources = load_nlp_resources(settings.NLP_BUNDLE_PATH, settings.NLP_ALLOW_DOWNLOAD)
+                resources = with_stem_cache(resources, settings.STEM_CACHE_SIZE, settings.STEM_VOCABULARY_FILE)
+                logger.info(
+                    f"Recursos de NLP carregados ({resources.source}) em "
+                    f"{time.perf_counter() - start_time:.2f}s"
+                )
+                _resources = resources
+    return _resources
+
+def nlp_resources_loaded() -> bool:
+    return _resources is not None
+
+def build_bundle(output: str, allow_download: bool = False) -> NlpResources:
+    import nltk
+
+    resources = _load_from_nltk_data(allow_download)
+    if resources.missing:
+        raise ValueError(f"Recursos do NLTK ausentes: {', '.join(resources.missing)}")
+
+    bundle = {
+        "format": BUNDLE_FORMAT,
+        "nltk_version": nltk.__version__,
+        "stop_words": sorted(resources.stop_words),
+        "stemmer": resources.stemmer,
+        "sentence_tokenizer": resources.sentence_tokenizer
+    }
+
+    temp_path = f"{output}.tmp"
+    with open(temp_path, 'wb') as f:
+        pickle.dump(bundle, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(temp_path, output)
+    return resources
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Gera o pacote local com os recursos de NLP usados pela API")
+    parser.add_argument("output", help="Arquivo onde o pacote será salvo")
+    parser.add_argument("--download", action="store_true", help="Baixa os recursos do NLTK que estiverem ausentes")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    resources = build_bundle(args.output, args.download)
+    print(f"Pacote NLP salvo em {args.output} ({len(resources.stop_words)} stopwords)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+import json
+import time
+import random
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Deque, Dict, List, Optional, Sequence
+from services.circuit_breaker import OPEN, CircuitAttempt, CircuitBreaker
+
+ROUTING_STRATEGIES = ("least_latency", "weighted")
+
+@dataclass
+class ProviderConfig:
+    name: str
+    base_url: str
+    api_key: str = ""
+    model: Optional[str] = None
+    weight: float = 1.0
+    requests_per_minute: int = 0
+    tokens_per_minute: int = 0
+
+def parse_providers(raw: Optional[str]) -> List[ProviderConfig]:
+    if not raw or not raw.strip():
+        return []
+
+    try:
+        entries = json.loads(raw)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"UPSTREAM_PROVIDERS não é um JSON válido: {e}")
+    if not isinstance(entries, list):
+        raise ValueError("UPSTREAM_PROVIDERS deve ser uma lista de provedores")
+
+    providers = []
+    for index, entry in enumerate(entries):
+        if not isinstance(entry, dict) or not entry.get("name") or not entry.get("base_url"):
+            raise ValueError(f"Provedor {index} de UPSTREAM_PROVIDERS precisa de 'name' e 'base_url'")
+        try:
+            providers.append(ProviderConfig(
+                name=str(entry["name"]),
+                base_url=str(entry["base_url"]).rstrip("/"),
+                api_key=str(entry.get("api_key") or ""),
+                model=entry.get("model"),
+                weight=float(entry.get("weight", 1.0)),
+                requests_per_minute=int(entry.get("requests_per_minute", 0)),
+                tokens_per_minute=int(entry.get("tokens_per_minute", 0))
+            ))
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"Provedor {entry['name']} de UPSTREAM_PROVIDERS inválido: {e}")
+    return providers
+
+class Provider:
+    def __init__(
+        self,
+        config: ProviderConfig,
+        circuit_breaker: Optional[CircuitBreaker] = None,
+        request_limiter: Any = None,
+        token_limiter: Any = None,
+        latency_samples: int = 200
+    ):
+        self.config = config
+        self.circuit_breaker = circuit_breaker
+        self.request_limiter = request_limiter
+        self.token_limiter = token_limiter
+        self.latency_ewma: Optional[float] = None
+        self._latencies: Deque[float] = deque(maxlen=latency_samples)
+        self.paused_until = 0.0
+        self.in_flight = 0
+        self.requests = 0
+        self.failures = 0
+
+    @property
+    def name(self) -> str:
+        return self.config.name
+
+    @property
+    def available(self) -> bool:
+        return self.circuit_breaker is None or self.circuit_breaker.state != OPEN
+
+    def start_attempt(self) -> CircuitAttempt:
+        if self.circuit_breaker is None:
+            return CircuitAttempt(None)
+        return self.circuit_breaker.start()
+
+    def prepare_payload(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        if self.config.model:
+            return {**payload, "model": self.config.model}
+        return payload
+
+    def headers(self) -> Dict[str, str]:
+        headers = {"Content-Type": "application/json"}
+        if self.config.api_key:
+            headers["Authorization"] = f"Bearer {self.config.api_key}"
+        return headers
+
+    def record_latency(self, seconds: float):
+        self._latencies.append(seconds)
+        # média móvel exponencial: reage a mudanças sem oscilar a cada requisição
+        self.latency_ewma = seconds if self.latency_ewma is None else 0.8 * self.latency_ewma + 0.2 * seconds
+
+    def latency_quantile(self, quantile: float, min_samples: int = 1) -> Optional[float]:
+        if len(self._latencies) < max(1, min_samples):
+            return None
+        ordered = sorted(self._latencies)
+        return ordered[min(len(ordered) - 1, int(quantile * len(ordered)))]
+
+    def stats(self) -> Dict[str, Any]:
+        p50 = self.latency_quantile(0.5)
+        p90 = self.latency_quantile(0.9)
+        return {
+            "name": self.name,
+            "base_url": self.config.base_url,
+            "model": self.config.model,
+            "weight": self.config.weight,
+            "requests": self.requests,
+            "failures": self.failures,
+            "in_flight": self.in_flight,
+            "latency_ewma": round(self.latency_ewma, 3) if self.latency_ewma is not None else None,
+            "latency_p50": round(p50, 3) if p50 is not None else None,
+            "latency_p90": round(p90, 3) if p90 is not None else None,
+            "paused_for": round(max(0.0, self.paused_until - time.monotonic()), 3),
+            "requests_available": round(self.request_limiter.available, 1) if self.request_limiter else None,
+            "tokens_available": round(self.token_limiter.available, 1) if self.token_limiter else None,
+            "circuit_breaker": self.circuit_breaker.stats() if self.circuit_breaker else {"enabled": False}
+        }
+
+class ProviderPool:
+    def __init__(self, providers: List[Provider], routing: str = "least_latency", explore_rate: float = 0.05):
+        if not providers:
+            raise ValueError("O pool precisa de pelo menos um provedor")
+        if routing not in ROUTING_STRATEGIES:
+            raise ValueError(f"Estratégia de roteamento desconhecida: {routing}")
+        self.providers = providers
+        self.routing = routing
+        self.explore_rate = explore_rate
+        self._rng = random.Random()
+
+    def available(self) -> List[Provider]:
+        return [provider for provider in self.providers if provider.available]
+
+    def models(self, default_model: str) -> List[str]:
+        # provedores sem modelo próprio usam o modelo da requisição
+        return sorted({provider.config.model or default_model for provider in self.providers})
+
+    def select(self, exclude: Sequence[Provider] = ()) -> Optional[Provider]:
+        candidates = [provider for provider in self.available() if provider not in exclude and provider.config.weight > 0]
+        if not candidates:
+            return None
+        if len(candidates) == 1:
+            return candidates[0]
+
+        if self.routing == "weighted":
+            return self._rng.choices(candidates, weights=[provider.config.weight for provider in candidates])[0]
+
+        # provedores ainda sem medição são testados antes de comparar latências
+        unmeasured = [provider for provider in candidates if provider.latency_ewma is None]
+        if unmeasured:
+            return unmeasured[0]
+        # uma pequena fração das chamadas mantém atualizada a latência dos mais lentos
+        if self._rng.random() < self.explore_rate:
+            return self._rng.choice(candidates)
+        return min(candidates, key=lambda provider: provider.latency_ewma / provider.config.weight)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "routing": self.routing,
+            "providers": [provider.stats() for provider in self.providers]
+        }
@@ -0,0 +1,126 @@
+import os
+import time
+import sqlite3
+import asyncio
+import logging
+import threading
+from typing import Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+class TokenBucket:
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity or rate_per_minute
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    async def acquire(self, amount: float = 1.0):
+        amount = min(amount, self.capacity)
+
+        # quem espera segura o lock, garantindo ordem de chegada entre as requisições
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                await asyncio.sleep((amount - self.tokens) / self.rate)
+
+    async def adjust(self, delta: float):
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens - delta)
+
+    @property
+    def available(self) -> float:
+        self._refill()
+        return self.tokens
+
+class SqliteTokenBucket:
+    # mesma interface do TokenBucket, com o saldo guardado em SQLite e dividido entre processos
+    def __init__(self, sqlite_path: str, name: str, rate_per_minute: float, capacity: Optional[float] = None):
+        self.sqlite_path = sqlite_path
+        self.name = name
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity or rate_per_minute
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_pid: Optional[int] = None
+        self._db_lock = threading.Lock()
+        self._lock = asyncio.Lock()
+        self._last_seen: Optional[Tuple[float, float]] = None
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._db is None or self._db_pid != os.getpid():
+            # conexões SQLite não podem atravessar um fork; cada processo abre a sua
+            self._db = sqlite3.connect(self.sqlite_path, check_same_thread=False, isolation_level=None, timeout=5.0)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS rate_limits ("
+                "name TEXT PRIMARY KEY, tokens REAL NOT NULL, updated_at REAL NOT NULL)"
+            )
+            self._db_pid = os.getpid()
+        return self._db
+
+    def _refilled(self, row: Optional[Tuple[float, float]], now: float) -> float:
+        if row is None:
+            return self.capacity
+        return min(self.capacity, row[0] + max(0.0, now - row[1]) * self.rate)
+
+    def _take(self, amount: float, force: bool = False) -> float:
+        # retorna quantos tokens faltaram; com force o saldo pode ficar negativo
+        with self._db_lock:
+            db = self._connection()
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                now = time.time()
+                row = db.execute(
+                    "SELECT tokens, updated_at FROM rate_limits WHERE name = ?", (self.name,)
+                ).fetchone()
+                tokens = self._refilled(row, now)
+                missing = 0.0 if force else max(0.0, amount - tokens)
+                if not missing:
+                    tokens = min(self.capacity, tokens - amount)
+                db.execute(
+                    "INSERT OR REPLACE INTO rate_limits (name, tokens, updated_at) VALUES (?, ?, ?)",
+                    (self.name, tokens, now)
+                )
+                db.execute("COMMIT")
+            except sqlite3.Error:
+                db.execute("ROLLBACK")
+                raise
+            self._last_seen = (tokens, now)
+        return missing
+
+    async def acquire(self, amount: float = 1.0):
+        amount = min(amount, self.capacity)
+
+        # o lock mantém a ordem de chegada dentro do processo; entre processos vale quem chegar primeiro
+        async with self._lock:
+            while True:
+                try:
+                    # BEGIN IMMEDIATE pode esperar até o timeout pelo lock de outro processo
+                    missing = await asyncio.to_thread(self._take, amount)
+                except sqlite3.Error as e:
+                    logger.warning(f"Limite compartilhado {self.name} indisponível, seguindo sem esperar: {e}")
+                    return
+                if not missing:
+                    return
+                await asyncio.sleep(missing / self.rate)
+
+    async def adjust(self, delta: float):
+        try:
+            await asyncio.to_thread(self._take, delta, True)
+        except sqlite3.Error as e:
+            logger.warning(f"Erro ao ajustar o limite compartilhado {self.name}: {e}")
+
+    @property
+    def available(self) -> float:
+        # saldo visto na última operação deste processo, sem ir ao banco; os consumos de
+        # outros processos desde então não aparecem aqui
+        return self._refilled(self._last_seen, time.time())
@@ -1,7 +1,113 @@
+from config.settings import get_settings
 from services.email_processor import EmailProcessor
 from services.ai_classifier import AIClassifier
 from services.file_handler import FileHandler
+from services.work_executor import WorkExecutor
+from services.classification_pipeline import ClassificationPipeline
+from services.import_jobs import ImportJobManager
+from services.job_queue import JobQueue
+from services.metrics import metrics
+from services.tracing import create_tracer
+from services.nlp_resources import get_nlp_resources, nlp_resources_loaded
+from services.circuit_breaker import STATE_VALUES
 
+settings = get_settings()
+
+tracer = create_tracer(
+    settings.TRACING_EXPORTER,
+    settings.TRACING_OTLP_ENDPOINT,
+    settings.TRACING_SERVICE_NAME,
+    settings.DEBUG_TIMINGS
+)
+
+work_executor = WorkExecutor(
+    thread_workers=settings.EXECUTOR_THREAD_WORKERS,
+    process_workers=settings.EXECUTOR_PROCESS_WORKERS,
+    max_queue=settings.EXECUTOR_MAX_QUEUE
+)
 email_processor = EmailProcessor()
-ai_classifier = AIClassifier()
-file_handler = FileHandler()
+ai_classifier = AIClassifier(email_processor)
+file_handler = FileHandler(
+    executor=work_executor,
+    max_file_size_mb=settings.UPLOAD_MAX_FILE_SIZE_MB,
+    chunk_size=settings.UPLOAD_CHUNK_SIZE,
+    max_pages=settings.PDF_MAX_PAGES,
+    max_chars=settings.MAX_EXTRACTED_CHARS,
+    max_tokens=settings.PROMPT_MAX_TOKENS if settings.PDF_STOP_AT_PROMPT_BUDGET else None,
+    parallel_pages=settings.PDF_PARALLEL_PAGES,
+    pages_per_task=settings.PDF_PAGES_PER_TASK
+)
+classification_pipeline = ClassificationPipeline(
+    email_processor,
+    ai_classifier,
+    max_concurrency=settings.BATCH_MAX_CONCURRENCY,
+    executor=work_executor,
+    heavy_text_threshold=settings.NLP_PROCESS_MIN_CHARS,
+    speculative_mode=settings.SPECULATIVE_RESPONSE_MODE
+)
+import_job_manager = ImportJobManager(
+    classification_pipeline,
+    work_executor,
+    jobs_dir=settings.IMPORT_JOBS_DIR,
+    max_concurrency=settings.IMPORT_MAX_CONCURRENCY,
+    max_messages=settings.IMPORT_MAX_MESSAGES,
+    max_file_size_mb=settings.IMPORT_MAX_FILE_SIZE_MB,
+    max_chars=settings.MAX_EXTRACTED_CHARS,
+    chunk_size=settings.UPLOAD_CHUNK_SIZE,
+    result_ttl_seconds=settings.IMPORT_RESULT_TTL_SECONDS
+)
+job_queue = JobQueue(
+    classification_pipeline,
+    sqlite_path=settings.JOBS_SQLITE_PATH,
+    workers=settings.JOBS_WORKERS,
+    max_queued=settings.JOBS_MAX_QUEUED,
+    result_ttl_seconds=settings.JOBS_RESULT_TTL_SECONDS,
+    lease_seconds=settings.JOBS_LEASE_SECONDS,
+    tracer=tracer
+)
+
+metrics.gauge(
+    "executor_pending_tasks",
+    "Tarefas em execução ou aguardando em cada pool do executor",
+    ["pool"],
+    callback=lambda: {
+        ("thread",): work_executor.stats()["thread_pending"],
+        ("process",): work_executor.stats()["process_pending"]
+    }
+)
+
+metrics.gauge(
+    "circuit_breaker_state",
+    "Estado do circuit breaker de cada provedor da API (0 fechado, 1 meio aberto, 2 aberto)",
+    ["breaker"],
+    callback=lambda: {
+        (provider.name,): STATE_VALUES[provider.circuit_breaker.state]
+        for provider in ai_classifier.upstream.pool.providers
+        if provider.circuit_breaker is not None
+    }
+)
+
+metrics.gauge(
+    "upstream_provider_latency_seconds",
+    "Latência média móvel de cada provedor da API",
+    ["provider"],
+    callback=lambda: {
+        (provider.name,): provider.latency_ewma
+        for provider in ai_classifier.upstream.pool.providers
+        if provider.latency_ewma is not None
+    }
+)
+
+def _stem_cache_lookups():
+    stem_cache = get_nlp_resources().stem_cache if nlp_resources_loaded() else None
+    if stem_cache is None:
+        return {}
+    stats = stem_cache.stats()
+    return {("hit",): stats["hits"], ("miss",): stats["misses"]}
+
+metrics.counter(
+    "nlp_stem_cache_lookups_total",
+    "Consultas ao cache de radicais do processo da API por resultado",
+    ["result"],
+    callback=_stem_cache_lookups
+)
@@ -0,0 +1,178 @@
+import os
+import re
+import json
+import time
+import asyncio
+import sqlite3
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+class ResultCache:
+    def __init__(self, max_entries: int = 10000, ttl_seconds: float = 86400,
+                 sqlite_path: Optional[str] = None, disk_max_entries: int = 100000):
+        self.max_entries = max(1, max_entries)
+        self.disk_max_entries = max(1, disk_max_entries)
+        self.ttl_seconds = ttl_seconds
+        self.sqlite_path = sqlite_path
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        # a conexão SQLite tem lock próprio: a leitura em disco não segura o cache em memória
+        self._db_lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_pid: Optional[int] = None
+        self._writes_since_prune = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        if sqlite_path:
+            self._setup_sqlite(sqlite_path)
+
+    def _setup_sqlite(self, path: str):
+        self._db_pid = os.getpid()
+        try:
+            self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=5.0)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS result_cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._prune_disk()
+        except sqlite3.Error as e:
+            logger.warning(f"Cache em disco indisponível ({path}): {e}")
+            self._db = None
+
+    def _connection(self) -> Optional[sqlite3.Connection]:
+        if self.sqlite_path and self._db_pid != os.getpid():
+            # conexões SQLite não podem atravessar um fork; cada worker abre a sua
+            self._setup_sqlite(self.sqlite_path)
+        return self._db
+
+    @staticmethod
+    def normalize_content(content: Optional[str]) -> str:
+        return re.sub(r'\s+', ' ', content or '').strip().lower()
+
+    @classmethod
+    def build_key(cls, namespace: str, content: Optional[str], subject: Optional[str],
+                  sender: Optional[str], model: str, prompt_version: str, *extra: str) -> str:
+        parts = [
+            namespace,
+            cls.normalize_content(content),
+            cls.normalize_content(subject),
+            cls.normalize_content(sender),
+            model,
+            prompt_version,
+            *extra
+        ]
+        return hashlib.sha256('\x1f'.join(parts).encode('utf-8')).hexdigest()
+
+    async def get(self, key: str) -> Optional[Any]:
+        now = time.time()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.memory_hits += 1
+                    return value
+                del self._entries[key]
+
+        # o SQLite roda em uma thread para não bloquear o event loop
+        row = await asyncio.to_thread(self._get_from_disk, key, now) if self.sqlite_path else None
+
+        with self._lock:
+            if row is not None:
+                # a entrada promovida mantém a validade gravada em disco
+                expires_at, value = row
+                self.disk_hits += 1
+                self._store_in_memory(key, value, expires_at)
+                return value
+
+            self.misses += 1
+            return None
+
+    async def set(self, key: str, value: Any):
+        expires_at = time.time() + self.ttl_seconds
+
+        with self._lock:
+            self._store_in_memory(key, value, expires_at)
+        if self.sqlite_path:
+            await asyncio.to_thread(self._set_on_disk, key, value, expires_at)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+        with self._db_lock:
+            db = self._connection()
+            if db is not None:
+                db.execute("DELETE FROM result_cache")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            hits = self.memory_hits + self.disk_hits
+            lookups = hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "disk_enabled": self._db is not None,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(hits / lookups, 4) if lookups else 0.0
+            }
+
+    def _store_in_memory(self, key: str, value: Any, expires_at: float):
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def _get_from_disk(self, key: str, now: float) -> Optional[Tuple[float, Any]]:
+        with self._db_lock:
+            db = self._connection()
+            if db is None:
+                return None
+            try:
+                row = db.execute(
+                    "SELECT expires_at, value FROM result_cache WHERE key = ? AND expires_at > ?", (key, now)
+                ).fetchone()
+                return (row[0], json.loads(row[1])) if row else None
+            except (sqlite3.Error, ValueError) as e:
+                logger.warning(f"Erro ao ler cache em disco: {e}")
+                return None
+
+    def _set_on_disk(self, key: str, value: Any, expires_at: float):
+        with self._db_lock:
+            db = self._connection()
+            if db is None:
+                return
+            try:
+                db.execute(
+                    "INSERT OR REPLACE INTO result_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                    (key, json.dumps(value, ensure_ascii=False), expires_at)
+                )
+                self._writes_since_prune += 1
+                if self._writes_since_prune >= 1000:
+                    self._prune_disk()
+            except (sqlite3.Error, TypeError, ValueError) as e:
+                logger.warning(f"Erro ao gravar cache em disco: {e}")
+
+    def _prune_disk(self):
+        self._writes_since_prune = 0
+        self._db.execute("DELETE FROM result_cache WHERE expires_at <= ?", (time.time(),))
+        self._db.execute(
+            "DELETE FROM result_cache WHERE key IN ("
+            "SELECT key FROM result_cache ORDER BY expires_at DESC LIMIT -1 OFFSET ?)",
+            (self.disk_max_entries,)
+        )
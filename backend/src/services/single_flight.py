@@ -0,0 +1,42 @@
+import asyncio
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Tuple
+from services.metrics import SINGLE_FLIGHT_CALLS
+
+@dataclass
+class _Call:
+    task: asyncio.Task
+    waiters: int = 0
+
+class SingleFlight:
+    def __init__(self, namespace: str):
+        self.namespace = namespace
+        self._calls: Dict[str, _Call] = {}
+
+    async def do(self, key: str, func: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        # retorna o resultado e se ele foi compartilhado com uma chamada já em andamento
+        call = self._calls.get(key)
+        shared = call is not None
+        if call is None:
+            # a chamada roda em uma tarefa própria para não depender de quem a iniciou
+            call = _Call(asyncio.create_task(func()))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda _: self._forget(key, call))
+        SINGLE_FLIGHT_CALLS.inc(namespace=self.namespace, result="coalesced" if shared else "leader")
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task), shared
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                # todos desistiram; novas chamadas iguais começam do zero
+                self._forget(key, call)
+                call.task.cancel()
+
+    def _forget(self, key: str, call: _Call):
+        if self._calls.get(key) is call:
+            del self._calls[key]
+
+    def in_flight(self) -> int:
+        return len(self._calls)
@@ -0,0 +1,60 @@
+import logging
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, List
+
+logger = logging.getLogger(__name__)
+
+def _safe(stem: Callable[[str], str]) -> Callable[[str], str]:
+    def safe_stem(token: str) -> str:
+        try:
+            return stem(token)
+        except Exception:
+            return token
+    return safe_stem
+
+class StemCache:
+    def __init__(self, stem: Callable[[str], str], max_entries: int = 50000):
+        self.max_entries = max_entries
+        # lru_cache é implementado em C e seguro entre threads; um acerto custa
+        # praticamente uma consulta a dicionário
+        self.stem = lru_cache(maxsize=max_entries)(_safe(stem))
+        self.preloaded = 0
+        self._baseline = (0, 0)
+
+    def stem_all(self, tokens: Iterable[str]) -> List[str]:
+        stem = self.stem
+        return [stem(token) for token in tokens]
+
+    def preload(self, words: Iterable[str]) -> int:
+        loaded = 0
+        for word in words:
+            if loaded >= self.max_entries:
+                break
+            self.stem(word)
+            loaded += 1
+
+        # a carga inicial não entra na taxa de acertos
+        info = self.stem.cache_info()
+        self._baseline = (info.hits, info.misses)
+        self.preloaded += loaded
+        return loaded
+
+    def preload_file(self, path: str) -> int:
+        # um termo por linha; linhas vazias e iniciadas por # são ignoradas
+        with open(path, 'r', encoding='utf-8') as f:
+            words = (line.strip().lower() for line in f)
+            return self.preload(word for word in words if word and not word.startswith('#'))
+
+    def stats(self) -> Dict[str, Any]:
+        info = self.stem.cache_info()
+        hits = info.hits - self._baseline[0]
+        misses = info.misses - self._baseline[1]
+        lookups = hits + misses
+        return {
+            "entries": info.currsize,
+            "max_entries": self.max_entries,
+            "preloaded": self.preloaded,
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0
+        }
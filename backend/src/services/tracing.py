@@ -0,0 +1,240 @@
+import os
+import json
+import time
+import asyncio
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional, Set
+import httpx
+from services.metrics import STAGE_SECONDS
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class Span:
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str]
+    start_time_ns: int
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    duration: Optional[float] = None
+
+    @property
+    def end_time_ns(self) -> int:
+        return self.start_time_ns + int((self.duration or 0.0) * 1e9)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start_time_ns": self.start_time_ns,
+            "duration_ms": round((self.duration or 0.0) * 1000, 3),
+            "attributes": self.attributes
+        }
+
+@dataclass
+class Trace:
+    trace_id: str
+    root: Span
+    include_timings: bool = False
+    spans: List[Span] = field(default_factory=list)
+    started_at: float = field(default_factory=time.perf_counter)
+
+    def timings(self) -> Dict[str, float]:
+        # soma por etapa; o que sobra do total é fila, event loop e serialização
+        breakdown: Dict[str, float] = {}
+        for span in self.spans:
+            if span.duration is not None and span.parent_id == self.root.span_id:
+                breakdown[span.name] = breakdown.get(span.name, 0.0) + span.duration
+
+        total = time.perf_counter() - self.started_at
+        timings = {f"{name}_ms": round(duration * 1000, 3) for name, duration in breakdown.items()}
+        timings["other_ms"] = round(max(0.0, total - sum(breakdown.values())) * 1000, 3)
+        timings["total_ms"] = round(total * 1000, 3)
+        return timings
+
+_current_trace: ContextVar[Optional[Trace]] = ContextVar("current_trace", default=None)
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+def _new_id(size: int) -> str:
+    return os.urandom(size).hex()
+
+@contextmanager
+def trace_stage(name: str, **attributes: Any) -> Iterator[Optional[Span]]:
+    trace = _current_trace.get()
+    start = time.perf_counter()
+
+    if trace is None:
+        try:
+            yield None
+        finally:
+            STAGE_SECONDS.observe(time.perf_counter() - start, stage=name)
+        return
+
+    parent = _current_span.get() or trace.root
+    span = Span(name, trace.trace_id, _new_id(8), parent.span_id, time.time_ns(), attributes)
+    trace.spans.append(span)
+    token = _current_span.set(span)
+    try:
+        yield span
+    except Exception as e:
+        span.attributes["error"] = type(e).__name__
+        raise
+    finally:
+        span.duration = time.perf_counter() - start
+        try:
+            _current_span.reset(token)
+        except ValueError:
+            # geradores assíncronos podem ser finalizados em outro contexto
+            pass
+        STAGE_SECONDS.observe(span.duration, stage=name)
+
+def current_timings() -> Optional[Dict[str, float]]:
+    trace = _current_trace.get()
+    if trace is None or not trace.include_timings:
+        return None
+    return trace.timings()
+
+class LogSpanExporter:
+    def __init__(self):
+        self.logger = logging.getLogger("tracing")
+
+    def export(self, trace: Trace):
+        self.logger.info(json.dumps({
+            "trace_id": trace.trace_id,
+            "name": trace.root.name,
+            "duration_ms": round((trace.root.duration or 0.0) * 1000, 3),
+            "attributes": trace.root.attributes,
+            "spans": [span.to_dict() for span in trace.spans]
+        }, ensure_ascii=False, default=str))
+
+    async def close(self):
+        pass
+
+class OtlpSpanExporter:
+    def __init__(self, endpoint: str, service_name: str, timeout: float = 2.0):
+        self.url = endpoint.rstrip("/") + "/v1/traces"
+        self.service_name = service_name
+        self.timeout = timeout
+        self.client: Optional[httpx.AsyncClient] = None
+        self.failures = 0
+        self._tasks: Set[asyncio.Task] = set()
+
+    @staticmethod
+    def _attributes(attributes: Dict[str, Any]) -> List[Dict[str, Any]]:
+        converted = []
+        for key, value in attributes.items():
+            if isinstance(value, bool):
+                converted.append({"key": key, "value": {"boolValue": value}})
+            elif isinstance(value, int):
+                converted.append({"key": key, "value": {"intValue": str(value)}})
+            elif isinstance(value, float):
+                converted.append({"key": key, "value": {"doubleValue": value}})
+            else:
+                converted.append({"key": key, "value": {"stringValue": str(value)}})
+        return converted
+
+    def _span_payload(self, span: Span) -> Dict[str, Any]:
+        payload = {
+            "traceId": span.trace_id,
+            "spanId": span.span_id,
+            "name": span.name,
+            "kind": 1,
+            "startTimeUnixNano": str(span.start_time_ns),
+            "endTimeUnixNano": str(span.end_time_ns),
+            "attributes": self._attributes(span.attributes)
+        }
+        if span.parent_id:
+            payload["parentSpanId"] = span.parent_id
+        if "error" in span.attributes:
+            payload["status"] = {"code": 2}
+        return payload
+
+    def build_payload(self, trace: Trace) -> Dict[str, Any]:
+        return {
+            "resourceSpans": [{
+                "resource": {"attributes": self._attributes({"service.name": self.service_name})},
+                "scopeSpans": [{
+                    "scope": {"name": self.service_name},
+                    "spans": [self._span_payload(span) for span in [trace.root, *trace.spans]]
+                }]
+            }]
+        }
+
+    def export(self, trace: Trace):
+        # o envio não pode atrasar a resposta; roda em segundo plano
+        task = asyncio.get_running_loop().create_task(self._send(self.build_payload(trace)))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _send(self, payload: Dict[str, Any]):
+        if self.client is None:
+            self.client = httpx.AsyncClient(timeout=self.timeout)
+        try:
+            response = await self.client.post(self.url, json=payload)
+            response.raise_for_status()
+        except httpx.HTTPError as e:
+            self.failures += 1
+            if self.failures == 1 or self.failures % 100 == 0:
+                logger.warning(f"Falha ao exportar traces para {self.url} ({self.failures} falhas): {e}")
+
+    async def close(self):
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
+
+class Tracer:
+    def __init__(self, exporter=None, include_timings: bool = False):
+        self.exporter = exporter
+        self.include_timings = include_timings
+
+    @property
+    def enabled(self) -> bool:
+        return self.exporter is not None or self.include_timings
+
+    @contextmanager
+    def trace(self, name: str, **attributes: Any) -> Iterator[Optional[Span]]:
+        if not self.enabled:
+            yield None
+            return
+
+        trace_id = _new_id(16)
+        root = Span(name, trace_id, _new_id(8), None, time.time_ns(), attributes)
+        trace = Trace(trace_id, root, include_timings=self.include_timings)
+        trace_token = _current_trace.set(trace)
+        span_token = _current_span.set(root)
+        try:
+            yield root
+        except Exception as e:
+            root.attributes["error"] = type(e).__name__
+            raise
+        finally:
+            root.duration = time.perf_counter() - trace.started_at
+            _current_span.reset(span_token)
+            _current_trace.reset(trace_token)
+            self._export(trace)
+
+    def _export(self, trace: Trace):
+        if self.exporter is None:
+            return
+        try:
+            self.exporter.export(trace)
+        except Exception as e:
+            logger.warning(f"Erro ao exportar trace {trace.trace_id}: {e}")
+
+    async def close(self):
+        if self.exporter is not None:
+            await self.exporter.close()
+
+def create_tracer(exporter: str, otlp_endpoint: str, service_name: str, include_timings: bool) -> Tracer:
+    if exporter == "log":
+        return Tracer(LogSpanExporter(), include_timings)
+    if exporter == "otlp":
+        return Tracer(OtlpSpanExporter(otlp_endpoint, service_name), include_timings)
+    return Tracer(None, include_timings)
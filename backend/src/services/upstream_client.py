@@ -0,0 +1,399 @@
+import time
+import random
+import asyncio
+import logging
+import importlib.util
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from typing import Any, AsyncIterator, Dict, List, Optional
+import httpx
+from config.settings import Settings
+from services.rate_limiter import TokenBucket, SqliteTokenBucket
+from services.circuit_breaker import OPEN, CircuitBreaker, CircuitOpenError
+from services.provider_pool import Provider, ProviderConfig, ProviderPool, parse_providers
+from services.metrics import UPSTREAM_RESPONSES, UPSTREAM_RETRIES, UPSTREAM_TOKENS, UPSTREAM_HEDGES
+from utils.token_utils import count_tokens
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+# só falhas antes do envio são repetidas; um ReadTimeout já gastou o tempo limite inteiro
+RETRYABLE_TRANSPORT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout)
+
+class UpstreamError(Exception):
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+@dataclass
+class _Outcome:
+    provider: Provider
+    response: Optional[httpx.Response] = None
+    error: Optional[httpx.TransportError] = None
+
+    @property
+    def succeeded(self) -> bool:
+        return self.response is not None and self.response.status_code == 200
+
+class UpstreamClient:
+    def __init__(self, settings: Settings):
+        self.settings = settings
+        self.client: Optional[httpx.AsyncClient] = None
+        self.max_retries = max(0, settings.UPSTREAM_MAX_RETRIES)
+        self.total_timeout = settings.UPSTREAM_TOTAL_TIMEOUT
+        self.retry_base_delay = settings.UPSTREAM_RETRY_BASE_DELAY
+        self.retry_max_delay = settings.UPSTREAM_RETRY_MAX_DELAY
+        self.hedge_enabled = settings.UPSTREAM_HEDGE_ENABLED
+        self.hedge_quantile = settings.UPSTREAM_HEDGE_QUANTILE
+        self.hedge_min_delay = settings.UPSTREAM_HEDGE_MIN_DELAY
+        self.hedge_min_samples = settings.UPSTREAM_HEDGE_MIN_SAMPLES
+        self.pool = ProviderPool(self._create_providers(), routing=settings.UPSTREAM_ROUTING)
+        self.retries = 0
+        self.hedges = 0
+        self.status_counts: Dict[int, int] = {}
+
+    def _create_providers(self) -> List[Provider]:
+        # o provedor configurado em OPENAI_* é sempre o primeiro e mantém os nomes das cotas
+        default = ProviderConfig(
+            name="openai",
+            base_url=self.settings.OPENAI_BASE_URL,
+            api_key=self.settings.OPENAI_API_KEY,
+            requests_per_minute=self.settings.UPSTREAM_REQUESTS_PER_MINUTE,
+            tokens_per_minute=self.settings.UPSTREAM_TOKENS_PER_MINUTE
+        )
+        providers = [self._create_provider(default, "upstream_requests", "upstream_tokens")]
+
+        for config in parse_providers(self.settings.UPSTREAM_PROVIDERS):
+            if any(provider.name == config.name for provider in providers):
+                raise ValueError(f"Nome de provedor repetido em UPSTREAM_PROVIDERS: {config.name}")
+            providers.append(self._create_provider(
+                config, f"upstream_requests:{config.name}", f"upstream_tokens:{config.name}"
+            ))
+        return providers
+
+    def _create_provider(self, config: ProviderConfig, requests_name: str, tokens_name: str) -> Provider:
+        circuit_breaker = None
+        if self.settings.CIRCUIT_BREAKER_ENABLED:
+            circuit_breaker = CircuitBreaker(
+                name=config.name,
+                window_seconds=self.settings.CIRCUIT_BREAKER_WINDOW_SECONDS,
+                min_calls=self.settings.CIRCUIT_BREAKER_MIN_CALLS,
+                failure_rate=self.settings.CIRCUIT_BREAKER_FAILURE_RATE,
+                slow_call_seconds=self.settings.CIRCUIT_BREAKER_SLOW_CALL_SECONDS,
+                slow_call_rate=self.settings.CIRCUIT_BREAKER_SLOW_CALL_RATE,
+                open_seconds=self.settings.CIRCUIT_BREAKER_OPEN_SECONDS,
+                half_open_calls=self.settings.CIRCUIT_BREAKER_HALF_OPEN_CALLS
+            )
+        return Provider(
+            config,
+            circuit_breaker=circuit_breaker,
+            request_limiter=self._create_limiter(requests_name, config.requests_per_minute),
+            token_limiter=self._create_limiter(tokens_name, config.tokens_per_minute)
+        )
+
+    def _create_limiter(self, name: str, rate_per_minute: int):
+        if rate_per_minute <= 0:
+            return None
+        if self.settings.RATE_LIMIT_SQLITE_PATH:
+            # a cota da API vale para todos os processos que usam o mesmo arquivo
+            return SqliteTokenBucket(self.settings.RATE_LIMIT_SQLITE_PATH, name, rate_per_minute)
+        return TokenBucket(rate_per_minute)
+
+    async def start(self):
+        http2 = self.settings.UPSTREAM_HTTP2
+        if http2 and importlib.util.find_spec("h2") is None:
+            logger.warning("HTTP/2 solicitado, mas o pacote 'h2' não está instalado; usando HTTP/1.1")
+            http2 = False
+
+        self.client = httpx.AsyncClient(
+            timeout=httpx.Timeout(
+                self.settings.UPSTREAM_TIMEOUT,
+                connect=self.settings.UPSTREAM_CONNECT_TIMEOUT
+            ),
+            limits=httpx.Limits(
+                max_connections=self.settings.UPSTREAM_MAX_CONNECTIONS,
+                max_keepalive_connections=self.settings.UPSTREAM_MAX_KEEPALIVE,
+                keepalive_expiry=self.settings.UPSTREAM_KEEPALIVE_EXPIRY
+            ),
+            http2=http2
+        )
+
+    async def close(self):
+        if self.client:
+            await self.client.aclose()
+            self.client = None
+
+    @staticmethod
+    def estimate_tokens(payload: Dict[str, Any]) -> int:
+        prompt_tokens = sum(count_tokens(message.get("content", "")) for message in payload.get("messages", []))
+        return prompt_tokens + payload.get("max_tokens", 0)
+
+    async def _wait_for_capacity(self, provider: Provider, estimated_tokens: int):
+        pause = provider.paused_until - time.monotonic()
+        if pause > 0:
+            await asyncio.sleep(pause)
+        if provider.request_limiter:
+            await provider.request_limiter.acquire(1)
+        if provider.token_limiter:
+            await provider.token_limiter.acquire(estimated_tokens)
+
+    def _retry_delay(self, attempt: int, response: Optional[httpx.Response] = None) -> float:
+        retry_after = self._parse_retry_after(response) if response is not None else None
+        if retry_after is not None:
+            return min(retry_after, self.retry_max_delay)
+
+        # backoff exponencial com jitter completo
+        return random.uniform(0, min(self.retry_max_delay, self.retry_base_delay * (2 ** attempt)))
+
+    @staticmethod
+    def _parse_retry_after(response: httpx.Response) -> Optional[float]:
+        retry_after_ms = response.headers.get("retry-after-ms")
+        if retry_after_ms:
+            try:
+                return max(0.0, float(retry_after_ms) / 1000)
+            except ValueError:
+                pass
+
+        retry_after = response.headers.get("retry-after")
+        if not retry_after:
+            return None
+        try:
+            return max(0.0, float(retry_after))
+        except ValueError:
+            pass
+        try:
+            return max(0.0, parsedate_to_datetime(retry_after).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+    def short_circuit(self) -> bool:
+        # só desvia para a contingência quando nenhum provedor pode ser usado
+        breakers = [provider.circuit_breaker for provider in self.pool.providers]
+        if any(breaker is None or breaker.state != OPEN for breaker in breakers):
+            return False
+        return all([breaker.short_circuit() for breaker in breakers])
+
+    def _select_provider(self, avoid: Optional[Provider] = None) -> Provider:
+        # em uma nova tentativa, prefere um provedor diferente do que acabou de falhar
+        provider = (self.pool.select(exclude=[avoid]) if avoid else None) or self.pool.select()
+        if provider is None:
+            raise CircuitOpenError("Nenhum provedor da API disponível; todos os circuitos estão abertos")
+        return provider
+
+    def _record_status(self, status_code: int):
+        self.status_counts[status_code] = self.status_counts.get(status_code, 0) + 1
+        UPSTREAM_RESPONSES.inc(status_code=str(status_code))
+
+    async def _backoff(self, attempt: int, provider: Provider, response: Optional[httpx.Response], reason: str):
+        if not self.pool.available():
+            # a falha abriu os circuitos; esperar para tentar de novo só atrasaria a contingência
+            raise CircuitOpenError(f"Circuito aberto após falha na API ({reason})")
+
+        delay = self._retry_delay(attempt, response)
+        if response is not None and response.status_code == 429:
+            # pausa as requisições ao provedor para não provocar uma avalanche de 429
+            provider.paused_until = max(provider.paused_until, time.monotonic() + delay)
+        self.retries += 1
+        UPSTREAM_RETRIES.inc()
+        logger.warning(
+            f"Falha na API {provider.name} ({reason}), nova tentativa {attempt + 1}/{self.max_retries} em {delay:.2f}s"
+        )
+        await asyncio.sleep(delay)
+
+    async def _reconcile_tokens(self, provider: Provider, estimated_tokens: int, data: Dict[str, Any]):
+        usage = data.get("usage") if isinstance(data, dict) else None
+        if usage:
+            UPSTREAM_TOKENS.inc(usage.get("prompt_tokens", 0), type="prompt")
+            UPSTREAM_TOKENS.inc(usage.get("completion_tokens", 0), type="completion")
+        if provider.token_limiter and usage and usage.get("total_tokens"):
+            await provider.token_limiter.adjust(usage["total_tokens"] - estimated_tokens)
+
+    async def _send(self, provider: Provider, payload: Dict[str, Any], estimated_tokens: int) -> _Outcome:
+        circuit = provider.start_attempt()
+        provider.in_flight += 1
+        try:
+            await self._wait_for_capacity(provider, estimated_tokens)
+            circuit.begin()
+            started_at = time.monotonic()
+            provider.requests += 1
+            response = await self.client.post(
+                f"{provider.config.base_url}/chat/completions",
+                headers=provider.headers(),
+                json=provider.prepare_payload(payload)
+            )
+            circuit.finish(response.status_code < 500)
+        except httpx.TransportError as e:
+            circuit.finish(False)
+            provider.failures += 1
+            return _Outcome(provider, error=e)
+        finally:
+            circuit.finish(None)
+            provider.in_flight -= 1
+
+        self._record_status(response.status_code)
+        if response.status_code == 200:
+            provider.record_latency(time.monotonic() - started_at)
+        elif response.status_code >= 500:
+            provider.failures += 1
+        return _Outcome(provider, response=response)
+
+    def _hedge_delay(self, provider: Provider) -> Optional[float]:
+        if not self.hedge_enabled or len(self.pool.providers) < 2:
+            return None
+        # sem histórico suficiente não há como estimar a cauda do provedor
+        quantile = provider.latency_quantile(self.hedge_quantile, self.hedge_min_samples)
+        if quantile is None:
+            return None
+        return max(self.hedge_min_delay, quantile)
+
+    async def _send_routed(self, payload: Dict[str, Any], estimated_tokens: int, avoid: Optional[Provider] = None) -> _Outcome:
+        primary = self._select_provider(avoid)
+        hedge_delay = self._hedge_delay(primary)
+        if hedge_delay is None:
+            return await self._send(primary, payload, estimated_tokens)
+
+        tasks = {asyncio.create_task(self._send(primary, payload, estimated_tokens)): primary}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=hedge_delay)
+            if done:
+                return done.pop().result()
+
+            secondary = self.pool.select(exclude=[primary])
+            if secondary is None:
+                return await next(iter(tasks))
+
+            # o primeiro passou do p90: uma segunda requisição vai para outro provedor
+            self.hedges += 1
+            tasks[asyncio.create_task(self._send(secondary, payload, estimated_tokens))] = secondary
+            pending = set(tasks)
+            outcomes: Dict[Provider, _Outcome] = {}
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    try:
+                        outcome = task.result()
+                    except CircuitOpenError:
+                        continue
+                    if outcome.succeeded:
+                        UPSTREAM_HEDGES.inc(result="hedge_won" if outcome.provider is secondary else "primary_won")
+                        return outcome
+                    outcomes[tasks[task]] = outcome
+
+            UPSTREAM_HEDGES.inc(result="both_failed")
+            if primary in outcomes:
+                return outcomes[primary]
+            if secondary in outcomes:
+                return outcomes[secondary]
+            raise CircuitOpenError("Nenhum provedor da API disponível; todos os circuitos estão abertos")
+        finally:
+            # a requisição perdedora é cancelada e não consome mais tempo nem conexão
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    async def chat_completion(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        try:
+            # todas as tentativas e esperas dividem um único prazo
+            async with asyncio.timeout(self.total_timeout):
+                return await self._chat_completion(payload)
+        except TimeoutError:
+            raise UpstreamError(f"OpenAI API sem resposta em {self.total_timeout:g}s")
+
+    async def _chat_completion(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        estimated_tokens = self.estimate_tokens(payload)
+        previous: Optional[Provider] = None
+
+        for attempt in range(self.max_retries + 1):
+            can_retry = attempt < self.max_retries
+            outcome = await self._send_routed(payload, estimated_tokens, avoid=previous)
+            previous = outcome.provider
+
+            if outcome.error is not None:
+                if not (can_retry and isinstance(outcome.error, RETRYABLE_TRANSPORT_ERRORS)):
+                    raise UpstreamError(f"OpenAI API indisponível: {str(outcome.error)}")
+                await self._backoff(attempt, outcome.provider, None, type(outcome.error).__name__)
+                continue
+
+            response = outcome.response
+            if response.status_code == 200:
+                data = response.json()
+                await self._reconcile_tokens(outcome.provider, estimated_tokens, data)
+                return data
+
+            if response.status_code in RETRYABLE_STATUS_CODES and can_retry:
+                await self._backoff(attempt, outcome.provider, response, str(response.status_code))
+                continue
+
+            raise UpstreamError(
+                f"OpenAI API error: {response.status_code} - {response.text}",
+                status_code=response.status_code
+            )
+
+        raise UpstreamError("OpenAI API indisponível após novas tentativas")
+
+    async def stream_chat_completion(self, payload: Dict[str, Any]) -> AsyncIterator[str]:
+        payload = {**payload, "stream": True}
+        estimated_tokens = self.estimate_tokens(payload)
+
+        streaming = False
+        provider: Optional[Provider] = None
+        # o prazo total vale até o início do streaming; depois dele não há nova tentativa
+        deadline = time.monotonic() + self.total_timeout
+
+        for attempt in range(self.max_retries + 1):
+            # streaming não usa hedge: o primeiro byte já compromete a resposta
+            provider = self._select_provider(avoid=provider)
+            circuit = provider.start_attempt()
+            can_retry = attempt < self.max_retries and time.monotonic() < deadline
+
+            provider.in_flight += 1
+            try:
+                await self._wait_for_capacity(provider, estimated_tokens)
+                circuit.begin()
+                provider.requests += 1
+                async with self.client.stream(
+                    "POST",
+                    f"{provider.config.base_url}/chat/completions",
+                    headers=provider.headers(),
+                    json=provider.prepare_payload(payload)
+                ) as response:
+                    # latência medida até os cabeçalhos; o tempo do streaming não conta
+                    circuit.finish(response.status_code < 500)
+                    self._record_status(response.status_code)
+
+                    if response.status_code == 200:
+                        provider.record_latency(time.monotonic() - circuit.started_at)
+                        # após o primeiro byte não há nova tentativa
+                        streaming = True
+                        async for line in response.aiter_lines():
+                            yield line
+                        return
+
+                    if not (response.status_code in RETRYABLE_STATUS_CODES and can_retry):
+                        raise UpstreamError(
+                            f"OpenAI API error: {response.status_code}",
+                            status_code=response.status_code
+                        )
+
+                await self._backoff(attempt, provider, response, str(response.status_code))
+
+            except httpx.TransportError as e:
+                circuit.finish(False)
+                provider.failures += 1
+                if streaming or not (can_retry and isinstance(e, RETRYABLE_TRANSPORT_ERRORS)):
+                    raise UpstreamError(f"OpenAI API indisponível: {str(e)}")
+                await self._backoff(attempt, provider, None, type(e).__name__)
+            finally:
+                circuit.finish(None)
+                provider.in_flight -= 1
+
+        raise UpstreamError("OpenAI API indisponível após novas tentativas")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "retries": self.retries,
+            "hedges": self.hedges,
+            "hedge_enabled": self.hedge_enabled,
+            "status_codes": dict(self.status_counts),
+            **self.pool.stats()
+        }
@@ -0,0 +1,101 @@
+import asyncio
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, Executor
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+class ExecutorSaturatedError(Exception):
+    pass
+
+class WorkExecutor:
+    def __init__(self, thread_workers: int = 4, process_workers: int = 0, max_queue: int = 64):
+        self.thread_workers = max(1, thread_workers)
+        self.process_workers = max(0, process_workers)
+        self.max_queue = max(0, max_queue)
+        self._thread_pool: Optional[ThreadPoolExecutor] = None
+        self._process_pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._pending = {"thread": 0, "process": 0}
+        self.rejected = 0
+
+    @property
+    def process_pool_enabled(self) -> bool:
+        return self.process_workers > 0
+
+    def _get_pool(self, kind: str) -> Executor:
+        with self._lock:
+            if kind == "process":
+                if self._process_pool is None:
+                    # spawn evita herdar threads e o event loop do processo principal
+                    self._process_pool = ProcessPoolExecutor(
+                        max_workers=self.process_workers,
+                        mp_context=multiprocessing.get_context("spawn")
+                    )
+                return self._process_pool
+
+            if self._thread_pool is None:
+                self._thread_pool = ThreadPoolExecutor(
+                    max_workers=self.thread_workers, thread_name_prefix="work-executor"
+                )
+            return self._thread_pool
+
+    def _capacity(self, kind: str) -> int:
+        workers = self.process_workers if kind == "process" else self.thread_workers
+        return workers + self.max_queue
+
+    def _acquire(self, kind: str):
+        with self._lock:
+            if self._pending[kind] >= self._capacity(kind):
+                self.rejected += 1
+                raise ExecutorSaturatedError(
+                    f"Fila de processamento cheia ({self._pending[kind]} tarefas pendentes)"
+                )
+            self._pending[kind] += 1
+
+    def _release(self, kind: str):
+        with self._lock:
+            self._pending[kind] -= 1
+
+    async def _run(self, kind: str, fn: Callable[..., Any], *args: Any) -> Any:
+        self._acquire(kind)
+        try:
+            future = self._get_pool(kind).submit(fn, *args)
+        except BaseException:
+            self._release(kind)
+            raise
+
+        # a vaga só volta quando o trabalho termina no pool; se quem esperava for
+        # cancelado, a tarefa continua ocupando o worker e segue contando no limite
+        future.add_done_callback(lambda _: self._release(kind))
+        return await asyncio.wrap_future(future)
+
+    async def run_light(self, fn: Callable[..., Any], *args: Any) -> Any:
+        return await self._run("thread", fn, *args)
+
+    async def run_heavy(self, fn: Callable[..., Any], *args: Any) -> Any:
+        if not self.process_pool_enabled:
+            return await self._run("thread", fn, *args)
+        return await self._run("process", fn, *args)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "thread_workers": self.thread_workers,
+                "process_workers": self.process_workers,
+                "max_queue": self.max_queue,
+                "thread_pending": self._pending["thread"],
+                "process_pending": self._pending["process"],
+                "rejected": self.rejected
+            }
+
+    def shutdown(self):
+        with self._lock:
+            if self._thread_pool is not None:
+                self._thread_pool.shutdown(wait=False, cancel_futures=True)
+                self._thread_pool = None
+            if self._process_pool is not None:
+                self._process_pool.shutdown(wait=False, cancel_futures=True)
+                self._process_pool = None
@@ -1,11 +1,14 @@
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional
+from utils.token_utils import count_tokens, fit_to_budget
 
-def build_classification_prompt(email_data: Dict[str, Any], analysis: Dict[str, Any]) -> str:
-    content = email_data.get('original_content', '')
-    sender = email_data.get('sender_name', 'Desconhecido')
-    subject = email_data.get('subject', 'Sem assunto')
+# incrementar sempre que os prompts mudarem, para invalidar o cache de resultados
+PROMPT_VERSION = "3"
+
+MIN_CONTENT_TOKENS = 200
+MAX_HEADER_TOKENS = 64
+TIGHT_FIELD_TOKENS = 16
 
-    prompt = f"""
+CLASSIFICATION_PROMPT_TEMPLATE = """
 Você é um assistente especializado em classificar emails corporativos do setor financeiro.
 
 CONTEXTO:
@@ -14,11 +17,11 @@ CONTEXTO:
 - Conteúdo do email: "{content}"
 
 ANÁLISE TÉCNICA:
-- Palavras-chave: {', '.join(analysis.get('keywords', []))}
-- Indicadores de urgência: {', '.join(analysis.get('urgency_indicators', []))}
-- Indicadores de saudação: {', '.join(analysis.get('greeting_indicators', []))}
-- Indicadores de solicitação: {', '.join(analysis.get('request_indicators', []))}
-- Contém perguntas: {"Sim" if analysis.get('has_question_marks') else "Não"}
+- Palavras-chave: {keywords}
+- Indicadores de urgência: {urgency_indicators}
+- Indicadores de saudação: {greeting_indicators}
+- Indicadores de solicitação: {request_indicators}
+- Contém perguntas: {has_question_marks}
 
 CATEGORIAS:
 1. PRODUTIVO: Emails que requerem ação específica, resposta ou acompanhamento
@@ -30,12 +33,31 @@ Responda APENAS com um JSON no formato:
 
 Sua resposta:
 """
-    return prompt
 
+PACKED_CLASSIFICATION_PROMPT_TEMPLATE = """
+Você é um assistente especializado em classificar emails corporativos do setor financeiro.
+Classifique CADA um dos {count} emails abaixo. Cada email começa na linha [[EMAIL <id>]].
+
+CATEGORIAS:
+1. PRODUTIVO: Emails que requerem ação específica, resposta ou acompanhamento
+2. IMPRODUTIVO: Emails que não necessitam ação imediata
+
+{emails}
+INSTRUÇÕES:
+Responda APENAS com um array JSON com um objeto por email, no formato:
+[{{"id": 1, "categoria": "produtivo|improdutivo", "confianca": 0.0-1.0}}]
+
+Sua resposta:
+"""
+
+PACKED_EMAIL_TEMPLATE = """- Remetente: {sender}
+- Assunto: {subject}
+- Conteúdo: "{content}"
+- Palavras-chave: {keywords}
+- Indicadores: urgência [{urgency_indicators}], solicitação [{request_indicators}], saudação [{greeting_indicators}], contém perguntas: {has_question_marks}
+"""
 
-def build_response_prompt(content: str, sender: str, subject: str, category: str) -> str:
-    if category == 'produtivo':
-        return f"""
+PRODUCTIVE_RESPONSE_TEMPLATE = """
 Você é um assistente de atendimento de uma empresa do setor financeiro.
 Gere uma resposta profissional e personalizada para este email PRODUTIVO.
 
@@ -52,8 +74,8 @@ DIRETRIZES:
 
 Resposta:
 """
-    else:
-        return f"""
+
+UNPRODUCTIVE_RESPONSE_TEMPLATE = """
 Você é um assistente de atendimento de uma empresa do setor financeiro.
 Gere uma resposta educada e cordial para este email IMPRODUTIVO.
 
@@ -70,9 +92,67 @@ DIRETRIZES:
 Resposta:
 """
 
-def truncate_prompt(prompt: str, max_tokens: int = 10000) -> str:
-    # aqui eu poderia usar o tiktoken para calcular o número de tokens
-    max_chars = max_tokens * 4
-    if len(prompt) > max_chars:
-        return prompt[:max_chars] + "\n\n...[truncated]"
-    return prompt
+def _render_with_budget(template: str, content: str, max_tokens: Optional[int], **fields: Any) -> str:
+    if not max_tokens:
+        return template.format(content=content, **fields)
+
+    # o corpo do email é cortado primeiro; remetente, assunto e análise só encolhem
+    # quando nem o mínimo do corpo cabe no orçamento. As instruções ficam sempre inteiras
+    fixed_tokens = count_tokens(template.format(content="", **fields))
+    if max_tokens - fixed_tokens < MIN_CONTENT_TOKENS:
+        fields = {name: fit_to_budget(str(value), TIGHT_FIELD_TOKENS) for name, value in fields.items()}
+        fixed_tokens = count_tokens(template.format(content="", **fields))
+
+    content_budget = max(max_tokens - fixed_tokens, 0)
+    return template.format(content=fit_to_budget(content, content_budget), **fields)
+
+def build_classification_prompt(email_data: Dict[str, Any], analysis: Dict[str, Any], max_tokens: Optional[int] = None) -> str:
+    content = email_data.get('original_content', '')
+    sender = email_data.get('sender_name', 'Desconhecido')
+    subject = email_data.get('subject', 'Sem assunto')
+
+    return _render_with_budget(
+        CLASSIFICATION_PROMPT_TEMPLATE,
+        content,
+        max_tokens,
+        sender=fit_to_budget(str(sender), MAX_HEADER_TOKENS),
+        subject=fit_to_budget(str(subject), MAX_HEADER_TOKENS),
+        keywords=', '.join(analysis.get('keywords', [])),
+        urgency_indicators=', '.join(analysis.get('urgency_indicators', [])),
+        greeting_indicators=', '.join(analysis.get('greeting_indicators', [])),
+        request_indicators=', '.join(analysis.get('request_indicators', [])),
+        has_question_marks="Sim" if analysis.get('has_question_marks') else "Não"
+    )
+
+def _neutralize_delimiters(text: str) -> str:
+    # um email não pode conter o delimitador e deslocar os ids dos outros emails do grupo
+    return text.replace('[[', '[ [').replace(']]', '] ]')
+
+def build_packed_email_block(email_data: Dict[str, Any], analysis: Dict[str, Any]) -> str:
+    # sem corte do conteúdo: emails que não cabem no limite por item são classificados sozinhos
+    return PACKED_EMAIL_TEMPLATE.format(
+        sender=_neutralize_delimiters(fit_to_budget(str(email_data.get('sender_name', 'Desconhecido')), MAX_HEADER_TOKENS)),
+        subject=_neutralize_delimiters(fit_to_budget(str(email_data.get('subject', 'Sem assunto')), MAX_HEADER_TOKENS)),
+        content=_neutralize_delimiters(email_data.get('original_content', '')),
+        keywords=', '.join(analysis.get('keywords', [])),
+        urgency_indicators=', '.join(analysis.get('urgency_indicators', [])),
+        greeting_indicators=', '.join(analysis.get('greeting_indicators', [])),
+        request_indicators=', '.join(analysis.get('request_indicators', [])),
+        has_question_marks="Sim" if analysis.get('has_question_marks') else "Não"
+    )
+
+def build_packed_classification_prompt(email_blocks: List[str]) -> str:
+    emails = ''.join(f"[[EMAIL {index}]]\n{block}\n" for index, block in enumerate(email_blocks, start=1))
+    return PACKED_CLASSIFICATION_PROMPT_TEMPLATE.format(count=len(email_blocks), emails=emails)
+
+
+def build_response_prompt(content: str, sender: str, subject: str, category: str, max_tokens: Optional[int] = None) -> str:
+    template = PRODUCTIVE_RESPONSE_TEMPLATE if category == 'produtivo' else UNPRODUCTIVE_RESPONSE_TEMPLATE
+
+    return _render_with_budget(
+        template,
+        content,
+        max_tokens,
+        sender=fit_to_budget(str(sender), MAX_HEADER_TOKENS),
+        subject=fit_to_budget(str(subject), MAX_HEADER_TOKENS)
+    )
@@ -0,0 +1,137 @@
+import re
+import logging
+from typing import Optional, Callable, List
+
+logger = logging.getLogger(__name__)
+
+_WORD_PIECE_PATTERN = re.compile(r'\w+|[^\w\s]')
+
+_QUOTE_SEPARATOR = re.compile(
+    r'^-{2,}\s*(original message|mensagem original|mensagem encaminhada|forwarded message)\s*-{2,}',
+    re.IGNORECASE
+)
+_QUOTE_ATTRIBUTION = re.compile(r'^(em|on)\s.+(escreveu|wrote)\s*:\s*$', re.IGNORECASE)
+_SENDER_HEADER = re.compile(r'^(de|from)\s*:.+$', re.IGNORECASE)
+_SENDER_HEADER_FOLLOWUP = re.compile(r'^(enviad[oa]|sent|data|date|para|to)\s*:', re.IGNORECASE)
+_SIGNATURE_DELIMITER = re.compile(r'^--\s*$')
+_SIGN_OFF_PATTERN = re.compile(
+    r'^(atenciosamente|att\.?|abraços?|cordialmente|grato|grata|obrigad[oa]|saudações|best regards|regards)[,.!]?\s*$',
+    re.IGNORECASE
+)
+_SIGNATURE_WINDOW = 12
+_OMISSION_MARKER = "\n[...]\n"
+
+_encoder: Optional[Callable[[str], List[int]]] = None
+_decoder: Optional[Callable[[List[int]], str]] = None
+_encoder_loaded = False
+
+def _load_encoder():
+    global _encoder, _decoder, _encoder_loaded
+    if _encoder_loaded:
+        return
+    _encoder_loaded = True
+
+    try:
+        import tiktoken
+        from config.settings import get_settings
+
+        # os arquivos de vocabulário são lidos de TIKTOKEN_CACHE_DIR quando disponíveis
+        encoding = tiktoken.get_encoding(get_settings().TOKENIZER_ENCODING)
+        _encoder = lambda text: encoding.encode(text, disallowed_special=())
+        _decoder = encoding.decode
+    except Exception as e:
+        logger.warning(f"Tokenizador tiktoken indisponível, usando estimativa: {e}")
+
+def count_tokens(text: str) -> int:
+    if not text:
+        return 0
+
+    _load_encoder()
+    if _encoder is not None:
+        return len(_encoder(text))
+
+    # estimativa conservadora: palavras longas viram mais de um token
+    return sum(1 + len(piece) // 5 for piece in _WORD_PIECE_PATTERN.findall(text))
+
+def _take_tokens(text: str, max_tokens: int, from_end: bool = False) -> str:
+    if max_tokens <= 0:
+        return ""
+
+    _load_encoder()
+    if _encoder is not None:
+        tokens = _encoder(text)
+        tokens = tokens[-max_tokens:] if from_end else tokens[:max_tokens]
+        return _decoder(tokens)
+
+    pieces = list(_WORD_PIECE_PATTERN.finditer(text))
+    if from_end:
+        pieces.reverse()
+
+    used = 0
+    boundary = None
+    for piece in pieces:
+        used += 1 + len(piece.group(0)) // 5
+        if used > max_tokens:
+            break
+        boundary = piece
+
+    if boundary is None:
+        return ""
+    return text[boundary.start():] if from_end else text[:boundary.end()]
+
+def strip_quoted_history(text: str) -> str:
+    lines = text.splitlines()
+    kept = []
+
+    for index, line in enumerate(lines):
+        stripped = line.strip()
+        if stripped.startswith('>'):
+            continue
+
+        if _QUOTE_SEPARATOR.match(stripped) or _QUOTE_ATTRIBUTION.match(stripped):
+            break
+
+        # cabeçalho "De: ... / Enviado: ..." de clientes como o Outlook
+        if _SENDER_HEADER.match(stripped):
+            following = [next_line.strip() for next_line in lines[index + 1:index + 4]]
+            if any(_SENDER_HEADER_FOLLOWUP.match(next_line) for next_line in following):
+                break
+
+        kept.append(line)
+
+    # um email que é só histórico citado continua sendo melhor que nada
+    return '\n'.join(kept).strip() or text.strip()
+
+def strip_signature(text: str) -> str:
+    lines = text.splitlines()
+    window_start = max(0, len(lines) - _SIGNATURE_WINDOW)
+
+    for index in range(window_start, len(lines)):
+        stripped = lines[index].strip()
+        if _SIGNATURE_DELIMITER.match(stripped):
+            return '\n'.join(lines[:index]).strip()
+        if _SIGN_OFF_PATTERN.match(stripped) and index > 0:
+            return '\n'.join(lines[:index + 1]).strip()
+
+    return text.strip()
+
+def fit_to_budget(text: str, max_tokens: int, head_ratio: float = 0.7) -> str:
+    if max_tokens <= 0:
+        return ""
+    if not text or count_tokens(text) <= max_tokens:
+        return text or ""
+
+    trimmed = strip_signature(strip_quoted_history(text))
+    if count_tokens(trimmed) <= max_tokens:
+        return trimmed
+
+    # mantém início e fim do email, onde costumam estar o pedido e o fechamento
+    available = max_tokens - count_tokens(_OMISSION_MARKER)
+    if available <= 0:
+        # orçamento menor que o marcador de omissão: fica só o início
+        return _take_tokens(trimmed, max_tokens)
+    head_tokens = int(available * head_ratio)
+    tail_tokens = available - head_tokens
+    head = _take_tokens(trimmed, head_tokens)
+    tail = _take_tokens(trimmed, tail_tokens, from_end=True)
+    return head.rstrip() + _OMISSION_MARKER + tail.lstrip()
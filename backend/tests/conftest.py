@@ -0,0 +1,7 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+# o corpus sintético dos benchmarks também gera os PDFs dos testes
+sys.path.insert(1, os.path.join(os.path.dirname(__file__), "..", "benchmarks"))
+os.environ.setdefault("OPENAI_API_KEY", "test")
@@ -0,0 +1,95 @@
+import json
+import asyncio
+import pytest
+from services.ai_classifier import AIClassifier
+from services.email_processor import TextAnalysis
+from services.near_duplicate_index import SimHashIndex
+
+EMAIL = {"original_content": "Preciso da segunda via do boleto", "sender_name": "Maria", "subject": "Boleto"}
+REPLY = '"Olá Maria, segue a segunda via do boleto."'
+
+def _classifier() -> AIClassifier:
+    classifier = AIClassifier()
+
+    async def call_openai_response(prompt):
+        return {"choices": [{"message": {"content": REPLY}}]}
+
+    async def stream_openai_response(prompt):
+        for chunk in ('"Olá Maria, ', 'segue a segunda via ', 'do boleto."'):
+            yield chunk
+
+    classifier._call_openai_response = call_openai_response
+    classifier._stream_openai_response = stream_openai_response
+    return classifier
+
+def test_streamed_reply_is_cached_like_the_full_reply():
+    async def main():
+        full = _classifier()
+        generated = await full.generate_response(EMAIL, "produtivo")
+
+        streamed = _classifier()
+        chunks = [chunk async for chunk in streamed.stream_response(EMAIL, "produtivo")]
+        key = streamed._cache_key("response", EMAIL, "produtivo")
+        return generated, "".join(chunks), await streamed.cache.get(key)
+
+    generated, sent, cached = asyncio.run(main())
+    assert sent == REPLY
+    assert generated == cached == "Olá Maria, segue a segunda via do boleto."
+
+class FixedModel:
+    def __init__(self, category: str, confidence: float):
+        self.prediction = (category, confidence)
+
+    def predict(self, stems):
+        return self.prediction
+
+def _llm_classifier(category: str = "produtivo"):
+    classifier = AIClassifier()
+    calls = []
+
+    async def call_openai_classification(prompt):
+        calls.append(prompt)
+        content = json.dumps({"categoria": category, "confianca": 0.8, "justificativa": "teste"})
+        return {"choices": [{"message": {"content": content}}]}
+
+    classifier._call_openai_classification = call_openai_classification
+    return classifier, calls
+
+def _email(content: str) -> dict:
+    stems = tuple(content.lower().split())
+    return {"original_content": content, "content": " ".join(stems), "analysis": TextAnalysis(
+        original_length=len(content), word_count=len(stems), tokens=stems, stems=stems, keywords=stems[:10]
+    )}
+
+@pytest.mark.parametrize("confidence, source, llm_calls", [(0.99, "local_model", 0), (0.6, "llm", 1)])
+def test_confident_local_model_skips_the_llm(confidence, source, llm_calls):
+    classifier, calls = _llm_classifier()
+    classifier.local_classifier = FixedModel("improdutivo", confidence)
+
+    result = asyncio.run(classifier.classify_email(_email("Feliz natal para toda a equipe")))
+
+    assert result["source"] == source
+    assert len(calls) == llm_calls
+    if source == "local_model":
+        assert (result["category"], result["confidence"]) == ("improdutivo", 0.99)
+
+NEAR_DUPLICATE = (
+    "Bom dia, o boleto da fatura 1234 do contrato de manutenção venceu ontem e o sistema de pagamentos "
+    "não aceita a segunda via. Podem enviar um novo boleto com a data atualizada para o setor financeiro "
+    "ainda hoje? Obrigado, equipe de contas a pagar"
+)
+
+@pytest.mark.parametrize("category, second_source, llm_calls", [("produtivo", "near_duplicate", 1), ("spam", "llm", 2)])
+def test_near_duplicates_reuse_only_llm_labels(category, second_source, llm_calls):
+    classifier, calls = _llm_classifier(category)
+    classifier.local_classifier = None
+    classifier.near_duplicates = SimHashIndex(min_tokens=10)
+
+    async def main():
+        await classifier.classify_email(_email(NEAR_DUPLICATE))
+        return await classifier.classify_email(_email(NEAR_DUPLICATE.replace("hoje", "amanhã")))
+
+    result = asyncio.run(main())
+    # uma categoria inválida vira regra de contingência e não pode ser reaproveitada
+    assert result["source"] == second_source
+    assert len(calls) == llm_calls
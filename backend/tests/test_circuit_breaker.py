@@ -0,0 +1,80 @@
+import pytest
+from services import circuit_breaker as circuit_breaker_module
+from services.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(circuit_breaker_module.time, "monotonic", fake)
+    return fake
+
+def _record(breaker: CircuitBreaker, ok: bool, clock: FakeClock, latency: float = 0.1):
+    attempt = breaker.start()
+    clock.now += latency
+    attempt.finish(ok)
+
+def test_opens_after_failure_rate(clock):
+    breaker = CircuitBreaker(name="teste", min_calls=4, failure_rate=0.5)
+    for ok in (True, True, False):
+        _record(breaker, ok, clock)
+    assert breaker.state == CLOSED
+
+    _record(breaker, False, clock)
+    assert breaker.state == OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.start()
+    assert breaker.short_circuit()
+    assert breaker.stats()["rejected"] == 2
+
+def test_opens_when_calls_are_slow(clock):
+    breaker = CircuitBreaker(name="teste", min_calls=3, slow_call_seconds=1.0, slow_call_rate=0.6)
+    for _ in range(3):
+        _record(breaker, True, clock, latency=2.0)
+    assert breaker.state == OPEN
+
+def test_half_open_probes_close_the_circuit(clock):
+    breaker = CircuitBreaker(name="teste", min_calls=1, open_seconds=30, half_open_calls=2)
+    _record(breaker, False, clock)
+    assert breaker.state == OPEN
+
+    clock.now += 31
+    assert breaker.state == HALF_OPEN
+    probes = [breaker.start(), breaker.start()]
+    # só half_open_calls requisições de teste passam ao mesmo tempo
+    with pytest.raises(CircuitOpenError):
+        breaker.start()
+    assert not breaker.short_circuit()
+
+    for probe in probes:
+        probe.finish(True)
+    assert breaker.state == CLOSED
+
+def test_failed_probe_reopens_the_circuit(clock):
+    breaker = CircuitBreaker(name="teste", min_calls=1, open_seconds=30)
+    _record(breaker, False, clock)
+    clock.now += 31
+    _record(breaker, False, clock)
+    assert breaker.state == OPEN
+    assert breaker.stats()["last_opened_reason"] == "falha na requisição de teste"
+
+def test_attempt_without_verdict_is_not_counted(clock):
+    breaker = CircuitBreaker(name="teste", min_calls=1)
+    breaker.start().finish(None)
+    assert breaker.state == CLOSED
+    assert breaker.stats()["window_calls"] == 0
+
+def test_old_calls_leave_the_window(clock):
+    breaker = CircuitBreaker(name="teste", window_seconds=60, min_calls=3, failure_rate=0.5)
+    _record(breaker, False, clock)
+    _record(breaker, False, clock)
+    clock.now += 61
+    _record(breaker, True, clock)
+    assert breaker.state == CLOSED
+    assert breaker.stats()["window_calls"] == 1
@@ -0,0 +1,42 @@
+import asyncio
+from services.classification_pipeline import ClassificationPipeline
+
+def _pipeline(max_concurrency: int) -> ClassificationPipeline:
+    pipeline = ClassificationPipeline(email_processor=None, ai_classifier=None, max_concurrency=max_concurrency)
+
+    async def build_email_data(email_content, sender_name=None, subject=None, filename=None):
+        return {"original_content": email_content}
+
+    async def run(email_data, packed=False, slot=None):
+        return email_data["original_content"]
+
+    pipeline.build_email_data = build_email_data
+    pipeline.run = run
+    return pipeline
+
+def test_content_is_loaded_concurrently_within_the_limit():
+    active = []
+    peak = []
+
+    async def load_content(index: int) -> str:
+        active.append(index)
+        peak.append(len(active))
+        await asyncio.sleep(0.02)
+        active.remove(index)
+        return f"email {index}"
+
+    results = asyncio.run(_pipeline(3).run_many([{} for _ in range(8)], load_content=load_content))
+
+    assert max(peak) == 3
+    assert [item["result"] for item in results] == [f"email {index}" for index in range(8)]
+
+def test_load_error_fails_only_its_item():
+    async def load_content(index: int) -> str:
+        if index == 1:
+            raise ValueError("Tipo de arquivo não suportado")
+        return "conteúdo"
+
+    results = asyncio.run(_pipeline(2).run_many([{} for _ in range(3)], load_content=load_content))
+
+    assert [item["success"] for item in results] == [True, False, True]
+    assert results[1]["error"] == "Tipo de arquivo não suportado"
@@ -0,0 +1,53 @@
+import pickle
+import pytest
+from services.email_processor import EmailProcessor, TextAnalysis
+from services.nlp_resources import CUSTOM_STOP_WORDS, NlpResources
+
+EMAIL = (
+    "Bom dia, preciso de suporte urgente no sistema de pagamentos. "
+    "O relatório de pagamentos não abre desde ontem! Podem verificar? "
+    "Contato: joao@empresa.com, (11) 98765-4321."
+)
+
+class SuffixStemmer:
+    def stem(self, token: str) -> str:
+        return token[:5]
+
+@pytest.fixture
+def processor():
+    resources = NlpResources(
+        stop_words=CUSTOM_STOP_WORDS | {"não", "desde", "podem", "sistema"},
+        word_tokenizer=None,
+        stemmer=SuffixStemmer(),
+        source="teste"
+    )
+    return EmailProcessor(resources=resources, fast_tokenizer=True)
+
+def test_analysis_matches_the_individual_steps(processor):
+    analysis = processor.analyze(EMAIL)
+
+    assert analysis.processed_text == processor.preprocess_text(EMAIL)
+    assert list(analysis.keywords) == processor.extract_keywords(EMAIL)
+    assert list(analysis.sentences) == processor.extract_sentences(EMAIL)
+    assert analysis.keywords[0] == "pagamentos"
+    assert "joao" not in analysis.cleaned_text
+
+def test_structure_reports_indicators_and_marks(processor):
+    structure = processor.analyze(EMAIL).to_dict()
+
+    assert structure["has_question_marks"] and structure["has_exclamation_marks"]
+    assert structure["original_length"] == len(EMAIL)
+    assert "urgente" in structure["urgency_indicators"]
+    assert structure == processor.analyze_email_structure(EMAIL)
+
+def test_empty_text_has_empty_analysis(processor):
+    assert processor.analyze("  \n ") == TextAnalysis()
+    assert processor.analyze_email_structure("") == {}
+
+def test_analysis_is_immutable_and_picklable(processor):
+    analysis = processor.analyze(EMAIL)
+
+    with pytest.raises(TypeError):
+        analysis.indicators["urgency"] = ()
+    # o resultado atravessa o pool de processos por pickle
+    assert pickle.loads(pickle.dumps(analysis)) == analysis
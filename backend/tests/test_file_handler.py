@@ -0,0 +1,84 @@
+import io
+import os
+import asyncio
+import pytest
+from fastapi import HTTPException, UploadFile
+from corpus import synthetic_pdf
+from services.file_handler import FileHandler, PageTextCollector, extract_pdf_text, iter_pdf_pages
+from services.work_executor import WorkExecutor
+
+class RecordingExecutor(WorkExecutor):
+    # roda as tarefas "pesadas" na thread, registrando o que seria enviado ao processo
+    def __init__(self):
+        super().__init__(thread_workers=2, process_workers=2)
+        self.heavy_args = []
+
+    async def run_heavy(self, func, *args):
+        self.heavy_args.append(args)
+        assert os.path.exists(args[0])
+        return await self.run_light(func, *args)
+
+def _upload(content: bytes, filename: str = "email.pdf") -> UploadFile:
+    return UploadFile(io.BytesIO(content), filename=filename)
+
+@pytest.mark.parametrize("parallel_pages", [False, True])
+def test_process_pool_receives_a_path_not_the_pdf(parallel_pages):
+    pdf = synthetic_pdf(6)
+    executor = RecordingExecutor()
+    handler = FileHandler(executor=executor, parallel_pages=parallel_pages, pages_per_task=2)
+    try:
+        text = asyncio.run(handler.extract_content(_upload(pdf)))
+    finally:
+        executor.shutdown()
+
+    assert text == extract_pdf_text(io.BytesIO(pdf), max_pages=200, max_chars=200000)
+    assert executor.heavy_args
+    assert all(isinstance(args[0], str) for args in executor.heavy_args)
+    # a cópia em disco é removida ao fim da extração
+    assert not any(os.path.exists(args[0]) for args in executor.heavy_args)
+
+def test_text_upload_is_decoded_in_chunks():
+    content = "Olá, preciso da segunda via do boleto. ".encode("latin-1") * 100
+    handler = FileHandler(chunk_size=64, max_chars=500)
+
+    text = asyncio.run(handler.extract_content(_upload(content, "email.txt")))
+    assert len(text) == 500
+    assert text.startswith("Olá, preciso")
+
+def test_oversized_upload_is_rejected():
+    handler = FileHandler(max_file_size_mb=1, chunk_size=1024)
+
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(handler.extract_content(_upload(b"x" * (2 * 1024 * 1024), "email.txt")))
+    assert error.value.status_code == 400
+
+def test_extraction_stops_once_the_budget_is_reached(monkeypatch):
+    from PyPDF2 import PageObject
+    decoded = []
+    extract_text = PageObject.extract_text
+    monkeypatch.setattr(PageObject, "extract_text", lambda page, *args, **kwargs: decoded.append(1) or extract_text(page))
+
+    pdf = synthetic_pdf(20)
+    text = extract_pdf_text(io.BytesIO(pdf), max_tokens=300)
+
+    # cada página sintética tem mais de 300 tokens: só a primeira é decodificada
+    assert len(decoded) == 1
+    assert text == extract_pdf_text(io.BytesIO(pdf), max_pages=1)
+
+def test_page_and_char_limits():
+    pdf = synthetic_pdf(5)
+    assert len(list(iter_pdf_pages(io.BytesIO(pdf)))) == 5
+    assert len(list(iter_pdf_pages(io.BytesIO(pdf), start=1, stop=3))) == 2
+    assert extract_pdf_text(io.BytesIO(pdf), max_pages=2) == "\n".join(list(iter_pdf_pages(io.BytesIO(pdf), stop=2)))
+    assert len(extract_pdf_text(io.BytesIO(pdf), max_chars=100)) == 100
+
+def test_collector_reports_when_it_is_full():
+    collector = PageTextCollector(max_chars=30)
+
+    assert not collector.add("Primeira página do email.")
+    assert collector.add("Segunda página.")
+    assert collector.add("Terceira página ignorada.")
+    assert collector.result() == "Primeira página do email.\nSegu"
+
+    with pytest.raises(ValueError):
+        PageTextCollector().result()
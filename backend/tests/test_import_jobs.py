@@ -0,0 +1,134 @@
+import io
+import os
+import json
+import time
+import asyncio
+import zipfile
+from services.import_jobs import ImportJobManager
+from services.work_executor import WorkExecutor
+
+class FakeResult:
+    def __init__(self, content: str):
+        self.content = content
+
+    def model_dump(self, mode: str = "python"):
+        return {"category": "produtivo", "content": self.content}
+
+class FakePipeline:
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+
+    async def build_email_data(self, email_content, sender_name=None, subject=None, filename=None):
+        return {"original_content": email_content}
+
+    async def run(self, email_data, packed=False, slot=None):
+        await asyncio.sleep(self.delay)
+        return FakeResult(email_data["original_content"])
+
+def _mbox(count: int, start: int = 0) -> bytes:
+    return b"".join(
+        f"From ana@empresa.com Mon Jan  1 00:00:00 2024\n"
+        f"From: Ana <ana@empresa.com>\nSubject: Pedido {number}\n\n"
+        f"Preciso da segunda via do boleto {number}.\n\n".encode()
+        for number in range(start, start + count)
+    )
+
+def _zip(members) -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_STORED) as archive:
+        for name, content in members:
+            archive.writestr(name, content)
+    return buffer.getvalue()
+
+def _manager(tmp_path, pipeline, **kwargs):
+    executor = WorkExecutor(thread_workers=2)
+    return ImportJobManager(pipeline, executor, jobs_dir=str(tmp_path), **kwargs), executor
+
+async def _finish(manager: ImportJobManager):
+    await asyncio.gather(*manager._tasks, return_exceptions=True)
+
+def _records(job):
+    with open(job.results_path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+def _saved_status(tmp_path, job_id: str) -> str:
+    with open(os.path.join(tmp_path, f"{job_id}.json"), encoding="utf-8") as f:
+        return json.load(f)["status"]
+
+def test_mailbox_import_writes_one_record_per_message(tmp_path):
+    async def main():
+        manager, executor = _manager(tmp_path, FakePipeline(), max_concurrency=2)
+        try:
+            job = await manager.submit(io.BytesIO(_mbox(5)), "caixa.mbox")
+            await _finish(manager)
+            return job, manager.get(job.job_id)
+        finally:
+            executor.shutdown()
+
+    job, loaded = asyncio.run(main())
+    assert (job.status, job.processed, job.succeeded) == ("completed", 5, 5)
+    assert sorted(record["index"] for record in _records(job)) == list(range(5))
+    assert loaded.to_dict() == job.to_dict()
+    assert not os.path.exists(job.upload_path)
+
+def test_bad_zip_member_waits_for_messages_already_read(tmp_path):
+    archive = bytearray(_zip([("boa.mbox", _mbox(3)), ("ruim.mbox", _mbox(1, start=9))]))
+    # corrompe o conteúdo do segundo membro: a leitura termina com erro de CRC
+    position = archive.index(b"boleto 9")
+    archive[position:position + 8] = b"BOLETO 9"
+
+    async def main():
+        manager, executor = _manager(tmp_path, FakePipeline(delay=0.1), max_concurrency=4)
+        try:
+            job = await manager.submit(io.BytesIO(bytes(archive)), "caixa.zip")
+            await _finish(manager)
+            saved = (job.processed, job.succeeded)
+            await asyncio.sleep(0.15)
+            return job, saved
+        finally:
+            executor.shutdown()
+
+    job, saved = asyncio.run(main())
+    assert job.status == "failed"
+    assert "CRC" in job.error
+    # as mensagens em andamento terminam antes do estado final ser salvo
+    assert saved == (job.processed, job.succeeded) == (3, 3)
+    assert len(_records(job)) == 3
+
+def test_shutdown_cancels_the_running_import(tmp_path):
+    async def main():
+        manager, executor = _manager(tmp_path, FakePipeline(delay=10), max_concurrency=2)
+        try:
+            job = await manager.submit(io.BytesIO(_mbox(4)), "caixa.mbox")
+            await asyncio.sleep(0.1)
+            await manager.shutdown()
+            return job
+        finally:
+            executor.shutdown()
+
+    job = asyncio.run(main())
+    assert job.status == "cancelled"
+    assert job.processed == 0
+    assert _saved_status(tmp_path, job.job_id) == "cancelled"
+
+def test_expired_imports_are_removed(tmp_path):
+    async def main():
+        manager, executor = _manager(tmp_path, FakePipeline(), result_ttl_seconds=60)
+        try:
+            old = await manager.submit(io.BytesIO(_mbox(1)), "antiga.mbox")
+            await _finish(manager)
+            expired_at = time.time() - 120
+            for path in manager._job_paths(old.job_id):
+                if os.path.exists(path):
+                    os.utime(path, (expired_at, expired_at))
+
+            recent = await manager.submit(io.BytesIO(_mbox(1)), "recente.mbox")
+            await _finish(manager)
+            return manager, old, recent
+        finally:
+            executor.shutdown()
+
+    manager, old, recent = asyncio.run(main())
+    assert manager.get(old.job_id) is None
+    assert not os.path.exists(old.results_path)
+    assert manager.get(recent.job_id).status == "completed"
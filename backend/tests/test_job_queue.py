@@ -0,0 +1,134 @@
+import time
+import asyncio
+from services.job_queue import JobQueue
+
+class FakeResult:
+    def __init__(self, content: str):
+        self.content = content
+
+    def model_dump(self, mode: str = "python"):
+        return {"category": "produtivo", "content": self.content}
+
+class FakePipeline:
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.runs = 0
+
+    async def build_email_data(self, email_content, sender_name=None, subject=None, filename=None):
+        return {"original_content": email_content}
+
+    async def run(self, email_data, packed=False, slot=None):
+        self.runs += 1
+        await asyncio.sleep(self.delay)
+        return FakeResult(email_data["original_content"])
+
+def _create_queue(tmp_path, pipeline, **kwargs) -> JobQueue:
+    queue = JobQueue(pipeline, sqlite_path=str(tmp_path / "jobs.sqlite3"), poll_interval=0.01, **kwargs)
+    queue._connect()
+    return queue
+
+def _mark_running(queue: JobQueue, job_id: str, heartbeat_at: float):
+    queue._db.execute(
+        "UPDATE jobs SET status = 'running', started_at = ?, heartbeat_at = ? WHERE id = ?",
+        (heartbeat_at, heartbeat_at, job_id)
+    )
+
+def test_submitted_job_completes(tmp_path):
+    async def main():
+        queue = _create_queue(tmp_path, FakePipeline())
+        job = await queue.submit({"email_content": "preciso de ajuda"})
+        await queue.start()
+        try:
+            return await queue.wait(job["job_id"], timeout=2)
+        finally:
+            await queue.shutdown()
+
+    job = asyncio.run(main())
+    assert job["status"] == "completed"
+    assert job["result"]["content"] == "preciso de ajuda"
+
+def test_expired_lease_returns_job_to_queue(tmp_path):
+    async def main():
+        pipeline = FakePipeline()
+        queue = _create_queue(tmp_path, pipeline, lease_seconds=5)
+        job = await queue.submit({"email_content": "abandonado"})
+        # o processo que reivindicou o job parou de renovar o lease
+        _mark_running(queue, job["job_id"], time.time() - 60)
+        await queue.start()
+        try:
+            return await queue.wait(job["job_id"], timeout=2), pipeline.runs
+        finally:
+            await queue.shutdown()
+
+    job, runs = asyncio.run(main())
+    assert job["status"] == "completed"
+    assert runs == 1
+
+def test_live_lease_is_not_taken_over(tmp_path):
+    async def main():
+        pipeline = FakePipeline()
+        queue = _create_queue(tmp_path, pipeline, lease_seconds=60)
+        job = await queue.submit({"email_content": "em outro worker"})
+        _mark_running(queue, job["job_id"], time.time())
+        await queue.start()
+        try:
+            return await queue.wait(job["job_id"], timeout=0.1), pipeline.runs
+        finally:
+            await queue.shutdown()
+
+    job, runs = asyncio.run(main())
+    assert job["status"] == "running"
+    assert runs == 0
+
+def test_shutdown_requeues_interrupted_jobs(tmp_path):
+    async def main():
+        queue = _create_queue(tmp_path, FakePipeline(delay=10))
+        job = await queue.submit({"email_content": "longo"})
+        await queue.start()
+        await asyncio.sleep(0.1)
+        assert (await queue.get(job["job_id"]))["status"] == "running"
+        await queue.shutdown()
+
+        reopened = _create_queue(tmp_path, FakePipeline())
+        return await reopened.get(job["job_id"])
+
+    job = asyncio.run(main())
+    assert job["status"] == "queued"
+    assert job["started_at"] is None
+
+def test_cancel_stops_running_job(tmp_path):
+    async def main():
+        queue = _create_queue(tmp_path, FakePipeline(delay=10))
+        job = await queue.submit({"email_content": "longo"})
+        await queue.start()
+        try:
+            await asyncio.sleep(0.1)
+            await queue.cancel(job["job_id"])
+            job = await queue.wait(job["job_id"], timeout=2)
+            # o worker continua atendendo a fila depois do cancelamento
+            queue.pipeline.delay = 0
+            next_job = await queue.submit({"email_content": "seguinte"})
+            return job, await queue.wait(next_job["job_id"], timeout=2)
+        finally:
+            await queue.shutdown()
+
+    job, next_job = asyncio.run(main())
+    assert job["status"] == "cancelled"
+    assert next_job["status"] == "completed"
+
+def test_cancel_reaches_job_running_in_another_process(tmp_path):
+    async def main():
+        owner = _create_queue(tmp_path, FakePipeline(delay=10))
+        other = _create_queue(tmp_path, FakePipeline())
+        job = await owner.submit({"email_content": "longo"})
+        await owner.start()
+        try:
+            await asyncio.sleep(0.1)
+            # a API que recebeu o cancelamento não tem a task do job; só a marca no banco chega ao dono
+            await other.cancel(job["job_id"])
+            return await other.wait(job["job_id"], timeout=2)
+        finally:
+            await owner.shutdown()
+
+    job = asyncio.run(main())
+    assert job["status"] == "cancelled"
@@ -0,0 +1,55 @@
+import json
+import pytest
+from services.local_classifier import LocalClassifier, load_local_classifier
+
+SAMPLES = [
+    ("preciso suport sistem erro pagament".split(), "produtivo"),
+    ("solicit status chamad abert".split(), "produtivo"),
+    ("problem acess relatori urgent".split(), "produtivo"),
+    ("feliz natal equip tod".split(), "improdutivo"),
+    ("parabén aniversári abraç".split(), "improdutivo"),
+    ("obrig apoi ano ótim".split(), "improdutivo"),
+]
+
+@pytest.fixture
+def classifier():
+    model = LocalClassifier(n_features=2 ** 12)
+    model.train(SAMPLES)
+    return model
+
+def test_predicts_the_category_of_similar_emails(classifier):
+    category, confidence = classifier.predict("erro sistem pagament".split())
+    assert category == "produtivo"
+    assert 0.5 < confidence <= 1.0
+
+    category, _ = classifier.predict("feliz aniversári equip".split())
+    assert category == "improdutivo"
+
+def test_probabilities_sum_to_one(classifier):
+    probabilities = classifier.predict_proba("palavr desconhec".split())
+    assert set(probabilities) == {"produtivo", "improdutivo"}
+    assert sum(probabilities.values()) == pytest.approx(1.0)
+
+def test_unknown_category_is_ignored():
+    model = LocalClassifier()
+    model.train([(["spam"], "spam"), (["suport"], "produtivo")])
+    assert model.class_counts == {"produtivo": 1, "improdutivo": 0}
+    assert not model.is_trained
+
+def test_saved_model_predicts_the_same(classifier, tmp_path):
+    path = str(tmp_path / "local_model.json")
+    classifier.save(path)
+    loaded = load_local_classifier(path)
+
+    stems = "solicit acess sistem".split()
+    assert loaded.predict(stems) == pytest.approx(classifier.predict(stems))
+
+def test_untrained_or_missing_model_is_not_loaded(tmp_path):
+    path = tmp_path / "local_model.json"
+    LocalClassifier().save(str(path))
+
+    assert load_local_classifier(str(path)) is None
+    assert load_local_classifier(str(tmp_path / "ausente.json")) is None
+    path.write_text(json.dumps({"version": 1}))
+    assert load_local_classifier(str(path)) is None
+    assert load_local_classifier(None) is None
@@ -0,0 +1,44 @@
+import io
+import zipfile
+from services.mail_parser import iter_mailbox, is_mailbox_file
+
+HTML_EMAIL = (
+    b"From: =?utf-8?q?Jo=C3=A3o?= <joao@empresa.com>\n"
+    b"Subject: Boleto\nMessage-ID: <1@empresa.com>\n"
+    b"Content-Type: text/html; charset=utf-8\n\n"
+    b"<html><style>p {color: red}</style><p>Preciso do boleto</p><br>Obrigado</html>\n"
+)
+
+MBOX = (
+    b"From ana@empresa.com Mon Jan  1 00:00:00 2024\nFrom: ana@empresa.com\nSubject: Um\n\n"
+    b"Primeira mensagem\n>From aqui escapado\n\n"
+    b"From bia@empresa.com Mon Jan  1 00:00:00 2024\nFrom: Bia <bia@empresa.com>\nSubject: Dois\n\n"
+    b"Segunda mensagem\n"
+)
+
+def test_eml_html_body_becomes_text():
+    [email] = list(iter_mailbox(io.BytesIO(HTML_EMAIL), "email.eml"))
+
+    assert email["email_content"] == "Preciso do boleto\n\nObrigado"
+    assert (email["sender_name"], email["subject"], email["message_id"]) == ("João", "Boleto", "<1@empresa.com>")
+    assert email["source"] == "email.eml#0"
+
+def test_mbox_is_split_into_messages():
+    emails = list(iter_mailbox(io.BytesIO(MBOX), "caixa.mbox", max_chars=100))
+
+    assert [email["subject"] for email in emails] == ["Um", "Dois"]
+    assert emails[0]["email_content"] == "Primeira mensagem\nFrom aqui escapado"
+    assert [email["sender_name"] for email in emails] == ["ana@empresa.com", "Bia"]
+
+def test_zip_reads_only_mailbox_members():
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        archive.writestr("pasta/email.eml", HTML_EMAIL)
+        archive.writestr("caixa.mbox", MBOX)
+        archive.writestr("leia-me.txt", b"ignorado")
+        archive.writestr("interno.zip", b"ignorado")
+
+    sources = [email["source"] for email in iter_mailbox(buffer, "emails.zip")]
+
+    assert sources == ["pasta/email.eml#0", "caixa.mbox#0", "caixa.mbox#1"]
+    assert is_mailbox_file("caixa.MBOX") and not is_mailbox_file("leia-me.txt")
@@ -0,0 +1,80 @@
+import pytest
+from services.metrics import MetricsRegistry, STAGE_SECONDS
+from services.tracing import Tracer, current_timings, trace_stage
+
+def test_counter_renders_each_label_set():
+    registry = MetricsRegistry()
+    counter = registry.counter("emails_total", "Emails por categoria", ["category"])
+    counter.inc(category="produtivo")
+    counter.inc(2, category="improdutivo")
+    counter.inc(category="produtivo")
+
+    assert registry.render().splitlines() == [
+        "# HELP emails_total Emails por categoria",
+        "# TYPE emails_total counter",
+        'emails_total{category="improdutivo"} 2.0',
+        'emails_total{category="produtivo"} 2.0',
+    ]
+
+def test_unlabelled_counter_starts_at_zero_and_label_values_are_escaped():
+    registry = MetricsRegistry()
+    registry.counter("retries_total", "Novas tentativas")
+    gauge = registry.gauge("queue_size", "Tamanho da fila", ["queue"])
+    gauge.set(3, queue='fila "a"\nb')
+
+    lines = registry.render().splitlines()
+    assert "retries_total 0.0" in lines
+    assert 'queue_size{queue="fila \\"a\\"\\nb"} 3.0' in lines
+
+def test_gauge_track_and_callback():
+    registry = MetricsRegistry()
+    in_flight = registry.gauge("in_flight", "Em andamento")
+    registry.gauge("queued", "Na fila", ["queue"], callback=lambda: {("jobs",): 7})
+
+    with in_flight.track():
+        assert in_flight.value() == 1
+    assert in_flight.value() == 0
+    # o callback é lido na hora da coleta
+    assert 'queued{queue="jobs"} 7.0' in registry.render().splitlines()
+
+def test_histogram_buckets_are_cumulative():
+    registry = MetricsRegistry()
+    histogram = registry.histogram("duration_seconds", "Duração", ["stage"], buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.7, 3.0):
+        histogram.observe(value, stage="nlp")
+
+    assert registry.render().splitlines()[2:] == [
+        'duration_seconds_bucket{stage="nlp",le="0.1"} 1',
+        'duration_seconds_bucket{stage="nlp",le="1.0"} 3',
+        'duration_seconds_bucket{stage="nlp",le="+Inf"} 4',
+        'duration_seconds_sum{stage="nlp"} 4.25',
+        'duration_seconds_count{stage="nlp"} 4',
+    ]
+
+def test_duplicate_metric_names_are_rejected():
+    registry = MetricsRegistry()
+    registry.counter("emails_total", "Emails")
+    with pytest.raises(ValueError):
+        registry.gauge("emails_total", "Emails")
+
+def _stage_count(stage: str) -> int:
+    with STAGE_SECONDS._lock:
+        return sum(STAGE_SECONDS._counts.get((stage,), []))
+
+def test_stage_duration_is_recorded_with_and_without_a_trace():
+    before = _stage_count("teste_etapa")
+    with trace_stage("teste_etapa"):
+        pass
+
+    tracer = Tracer(include_timings=True)
+    with tracer.trace("request"):
+        with pytest.raises(RuntimeError):
+            with trace_stage("teste_etapa") as span:
+                raise RuntimeError("falhou")
+        timings = current_timings()
+
+    # o histograma por etapa não depende do tracing estar ligado
+    assert _stage_count("teste_etapa") == before + 2
+    assert span.attributes["error"] == "RuntimeError"
+    assert set(timings) == {"teste_etapa_ms", "other_ms", "total_ms"}
+    assert current_timings() is None
@@ -0,0 +1,54 @@
+import asyncio
+from services.near_duplicate_index import SimHashIndex, simhash
+
+EMAIL = (
+    "preciso suport urgent sistem pagament relatori nao abre desde ontem "
+    "equip financeir aguard retorn sobre fatur vencid client cobranç boleto "
+    "segund via nota fiscal contrat renov pedid numer cadastr fornecedor atualiz dad banc "
+    "agênc cont corrent praz pagament dia util confirm receb document anex planilh valor total "
+    "desc juro mult atras encaminh setor respons"
+).split()
+
+def _variant(stems, position: int, replacement: str):
+    return stems[:position] + [replacement] + stems[position + 1:]
+
+def test_small_edits_match_and_other_texts_do_not():
+    index = SimHashIndex(threshold=0.9, min_tokens=10)
+    entry_id = asyncio.run(index.add(index.fingerprint(EMAIL), "produtivo", 0.92))
+
+    match = index.find(index.fingerprint(_variant(EMAIL, 5, "hoje")))
+    assert match["id"] == entry_id
+    assert (match["category"], match["confidence"]) == ("produtivo", 0.92)
+    assert match["similarity"] >= 0.9
+
+    other = "feliz natal equip tod boas fest prosper ano nov abraç famil sucess saud paz".split()
+    assert index.find(index.fingerprint(other)) is None
+    assert index.stats()["match_rate"] == 0.5
+
+def test_fingerprint_is_stable_and_skips_short_texts():
+    index = SimHashIndex(min_tokens=10)
+    assert index.fingerprint(EMAIL) == simhash(EMAIL) == simhash(list(EMAIL))
+    assert index.fingerprint(EMAIL[:9]) is None
+
+def test_oldest_entries_are_evicted():
+    index = SimHashIndex(max_entries=2, min_tokens=1)
+    texts = [EMAIL, [f"{stem}x" for stem in EMAIL], [f"{stem}y" for stem in EMAIL]]
+
+    async def main():
+        for text in texts:
+            await index.add(index.fingerprint(text), "produtivo", 0.9)
+
+    asyncio.run(main())
+    assert index.find(index.fingerprint(texts[0])) is None
+    assert index.find(index.fingerprint(texts[2])) is not None
+    assert index.stats()["entries"] == 2
+
+def test_entries_are_reloaded_from_disk(tmp_path):
+    path = str(tmp_path / "near_duplicates.sqlite3")
+    index = SimHashIndex(min_tokens=10, sqlite_path=path)
+    entry_id = asyncio.run(index.add(index.fingerprint(EMAIL), "improdutivo", 0.8))
+
+    reopened = SimHashIndex(min_tokens=10, sqlite_path=path)
+    match = reopened.find(reopened.fingerprint(_variant(EMAIL, 3, "amanh")))
+    assert match["id"] == entry_id
+    assert match["category"] == "improdutivo"
@@ -0,0 +1,70 @@
+import pickle
+import pytest
+import nltk
+from nltk.stem import PorterStemmer
+from services import nlp_resources
+from services.email_processor import EmailProcessor
+from services.nlp_resources import (
+    BUNDLE_FORMAT, CUSTOM_STOP_WORDS, NlpResources, build_bundle, get_nlp_resources,
+    load_nlp_resources, nlp_resources_loaded
+)
+
+def _complete_nltk_data(allow_download: bool = False) -> NlpResources:
+    return NlpResources(stop_words=frozenset({"de", "para"}), word_tokenizer=None, stemmer=PorterStemmer())
+
+def test_missing_nltk_data_falls_back_without_downloading(monkeypatch):
+    monkeypatch.setattr(nltk, "download", lambda *args, **kwargs: pytest.fail("download em tempo de execução"))
+    monkeypatch.setattr(nltk.data, "path", [])
+
+    resources = load_nlp_resources()
+
+    assert set(resources.missing) == {"stopwords", "rslp", "punkt"}
+    assert resources.stop_words == CUSTOM_STOP_WORDS
+    assert resources.stem("pagamentos") == "pagamentos"
+    assert resources.word_tokenize("Bom dia. Tudo certo?") == ["Bom", "dia", ".", "Tudo", "certo", "?"]
+
+def test_built_bundle_is_loaded_instead_of_nltk_data(monkeypatch, tmp_path):
+    path = str(tmp_path / "nlp.pickle")
+    monkeypatch.setattr(nlp_resources, "_load_from_nltk_data", _complete_nltk_data)
+    build_bundle(path)
+    monkeypatch.setattr(nlp_resources, "_load_from_nltk_data", lambda allow_download=False: pytest.fail("NLTK consultado"))
+
+    resources = load_nlp_resources(path)
+
+    assert resources.source == "bundle"
+    assert {"de", "para"} | CUSTOM_STOP_WORDS == resources.stop_words
+    assert resources.stem("running") == "run"
+
+def test_unsupported_bundle_falls_back_to_nltk_data(monkeypatch, tmp_path):
+    path = tmp_path / "nlp.pickle"
+    path.write_bytes(pickle.dumps({"format": BUNDLE_FORMAT + 1}))
+    monkeypatch.setattr(nlp_resources, "_load_from_nltk_data", _complete_nltk_data)
+
+    assert load_nlp_resources(str(path)).source == "nltk"
+    assert load_nlp_resources(str(tmp_path / "ausente.pickle")).source == "nltk"
+
+def test_bundle_requires_every_resource(monkeypatch, tmp_path):
+    monkeypatch.setattr(nltk.data, "path", [])
+    with pytest.raises(ValueError, match="ausentes"):
+        build_bundle(str(tmp_path / "nlp.pickle"))
+    assert not (tmp_path / "nlp.pickle").exists()
+
+def test_resources_are_loaded_once_on_first_use(monkeypatch):
+    calls = []
+
+    def load(bundle_path=None, allow_download=False):
+        calls.append(bundle_path)
+        return NlpResources(stop_words=CUSTOM_STOP_WORDS, word_tokenizer=None)
+
+    monkeypatch.setattr(nlp_resources, "_resources", None)
+    monkeypatch.setattr(nlp_resources, "load_nlp_resources", load)
+
+    processor = EmailProcessor(fast_tokenizer=True)
+    # criar o processador não carrega nada; o primeiro uso carrega e os seguintes reaproveitam
+    assert not nlp_resources_loaded()
+    processor.extract_keywords("Preciso do boleto")
+    processor.extract_keywords("Preciso da nota fiscal")
+
+    assert len(calls) == 1
+    assert nlp_resources_loaded()
+    assert get_nlp_resources() is processor.resources
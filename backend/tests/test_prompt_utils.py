@@ -0,0 +1,26 @@
+import pytest
+from utils.prompt_utils import build_classification_prompt, build_response_prompt
+from utils.token_utils import count_tokens
+
+ANALYSIS = {
+    "keywords": [f"palavra{index}" for index in range(60)],
+    "urgency_indicators": ["urgente"] * 30
+}
+EMAIL = {
+    "original_content": "texto longo do email " * 500,
+    "sender_name": "Fulano " * 50,
+    "subject": "assunto " * 50
+}
+
+@pytest.mark.parametrize("max_tokens", [3000, 600, 300])
+def test_prompts_never_exceed_the_budget(max_tokens):
+    classification_prompt = build_classification_prompt(EMAIL, ANALYSIS, max_tokens=max_tokens)
+    response_prompt = build_response_prompt(
+        EMAIL["original_content"], EMAIL["sender_name"], EMAIL["subject"], "produtivo", max_tokens=max_tokens
+    )
+    assert count_tokens(classification_prompt) <= max_tokens
+    assert count_tokens(response_prompt) <= max_tokens
+
+def test_short_email_is_sent_whole():
+    email = {"original_content": "Preciso da segunda via do boleto.", "sender_name": "Ana", "subject": "Boleto"}
+    assert "Preciso da segunda via do boleto." in build_classification_prompt(email, {}, max_tokens=3000)
@@ -0,0 +1,75 @@
+import pytest
+from services.circuit_breaker import OPEN
+from services.provider_pool import Provider, ProviderConfig, ProviderPool, parse_providers
+
+class OpenBreaker:
+    state = OPEN
+
+def _provider(name: str, latency=None, weight: float = 1.0, model=None, **kwargs) -> Provider:
+    provider = Provider(ProviderConfig(name, f"http://{name}/v1", weight=weight, model=model), **kwargs)
+    if latency is not None:
+        provider.record_latency(latency)
+    return provider
+
+def test_providers_are_parsed_from_json():
+    raw = '[{"name": "local", "base_url": "http://localhost:9100/v1/", "model": "llama3", "weight": 2}]'
+    [provider] = parse_providers(raw)
+
+    assert provider == ProviderConfig("local", "http://localhost:9100/v1", model="llama3", weight=2.0)
+    assert parse_providers(None) == parse_providers("  ") == []
+
+@pytest.mark.parametrize("raw", [
+    "não é json",
+    '{"name": "local"}',
+    '[{"name": "local"}]',
+    '[{"name": "local", "base_url": "http://local", "weight": "alto"}]',
+])
+def test_invalid_providers_are_rejected(raw):
+    with pytest.raises(ValueError):
+        parse_providers(raw)
+
+def test_unmeasured_providers_are_tried_first():
+    measured, new = _provider("medido", latency=0.1), _provider("novo")
+    pool = ProviderPool([measured, new], explore_rate=0)
+    assert pool.select() is new
+
+def test_lowest_latency_per_weight_is_selected():
+    slow, fast, heavy = _provider("lento", 0.5), _provider("rapido", 0.2), _provider("pesado", 0.3, weight=2)
+    pool = ProviderPool([slow, fast, heavy], explore_rate=0)
+
+    assert pool.select() is heavy
+    assert pool.select(exclude=[heavy]) is fast
+
+def test_open_circuits_and_zero_weights_are_skipped():
+    broken = _provider("quebrado", 0.01, circuit_breaker=OpenBreaker())
+    disabled = _provider("desligado", 0.01, weight=0)
+    fallback = _provider("reserva", 1.0)
+    pool = ProviderPool([broken, disabled, fallback], explore_rate=0)
+
+    assert pool.select() is fallback
+    assert pool.select(exclude=[fallback]) is None
+
+def test_weighted_routing_follows_the_weights():
+    main, backup = _provider("principal", weight=3), _provider("reserva", weight=1)
+    pool = ProviderPool([main, backup], routing="weighted")
+    pool._rng.seed(7)
+
+    picks = [pool.select() for _ in range(2000)]
+    assert 0.7 < picks.count(main) / len(picks) < 0.8
+
+def test_models_cover_every_provider():
+    pool = ProviderPool([_provider("openai"), _provider("local", model="llama3")])
+    assert pool.models("gpt-4o-mini") == ["gpt-4o-mini", "llama3"]
+
+def test_latency_quantile_needs_enough_samples():
+    provider = _provider("openai")
+    for seconds in (0.1, 0.2, 0.3, 0.4, 1.0):
+        provider.record_latency(seconds)
+
+    assert provider.latency_quantile(0.9, min_samples=10) is None
+    assert provider.latency_quantile(0.9, min_samples=5) == 1.0
+    assert provider.latency_quantile(0.5) == 0.3
+
+def test_unknown_routing_is_rejected():
+    with pytest.raises(ValueError):
+        ProviderPool([_provider("openai")], routing="aleatorio")
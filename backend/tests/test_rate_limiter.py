@@ -0,0 +1,80 @@
+import asyncio
+import threading
+from services import rate_limiter as rate_limiter_module
+from services.rate_limiter import SqliteTokenBucket, TokenBucket
+
+def test_acquire_within_capacity_does_not_wait():
+    async def main():
+        bucket = TokenBucket(rate_per_minute=600)
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        for _ in range(10):
+            await bucket.acquire()
+        return loop.time() - started
+
+    assert asyncio.run(main()) < 0.05
+
+def test_acquire_waits_for_refill():
+    async def main():
+        # 6000 por minuto = 100 por segundo; sem saldo, 10 tokens levam ~0,1s
+        bucket = TokenBucket(rate_per_minute=6000, capacity=10)
+        await bucket.acquire(10)
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        await bucket.acquire(10)
+        return loop.time() - started
+
+    assert 0.08 <= asyncio.run(main()) < 0.5
+
+def test_refill_is_capped_at_capacity(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(rate_limiter_module.time, "monotonic", lambda: now[0])
+    bucket = TokenBucket(rate_per_minute=60, capacity=5)
+    asyncio.run(bucket.adjust(5))
+    assert bucket.available == 0
+    now[0] += 2
+    assert bucket.available == 2
+    now[0] += 60
+    assert bucket.available == 5
+
+def test_adjust_returns_unused_estimate():
+    bucket = TokenBucket(rate_per_minute=60, capacity=100)
+    asyncio.run(bucket.adjust(30))
+    assert 69 < bucket.available <= 71
+    # o uso real foi menor que o estimado: a diferença volta ao saldo
+    asyncio.run(bucket.adjust(-20))
+    assert 89 < bucket.available <= 91
+
+def test_sqlite_bucket_is_shared_between_instances(tmp_path):
+    path = str(tmp_path / "limits.sqlite3")
+    first = SqliteTokenBucket(path, "api", rate_per_minute=60, capacity=10)
+    second = SqliteTokenBucket(path, "api", rate_per_minute=60, capacity=10)
+
+    async def main():
+        await first.acquire(8)
+        # o saldo consumido pelo primeiro vale para o segundo: só sobram ~2 tokens
+        await second.acquire(2)
+
+    asyncio.run(main())
+    assert second.available < 1
+    assert first.available > 1
+
+def test_sqlite_bucket_runs_off_the_event_loop(tmp_path):
+    bucket = SqliteTokenBucket(str(tmp_path / "limits.sqlite3"), "api", rate_per_minute=60, capacity=10)
+    take = bucket._take
+    threads = []
+
+    def recording_take(*args):
+        threads.append(threading.get_ident())
+        return take(*args)
+
+    bucket._take = recording_take
+
+    async def main():
+        await bucket.acquire(1)
+        await bucket.adjust(3)
+
+    asyncio.run(main())
+    assert len(threads) == 2
+    assert threading.get_ident() not in threads
+    assert 5 < bucket.available <= 6.1
@@ -0,0 +1,74 @@
+import asyncio
+import pytest
+from services import result_cache
+from services.result_cache import ResultCache
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self) -> float:
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(result_cache.time, "time", fake.time)
+    return fake
+
+def test_key_ignores_case_and_whitespace():
+    first = ResultCache.build_key("classification", "Olá,\n  preciso de ajuda", "Suporte", None, "gpt", "1")
+    second = ResultCache.build_key("classification", "olá, preciso de ajuda ", "suporte", "", "gpt", "1")
+    other_model = ResultCache.build_key("classification", "olá, preciso de ajuda", "suporte", "", "llama3", "1")
+
+    assert first == second
+    assert first != other_model
+
+def test_entry_expires_after_ttl(clock):
+    async def main():
+        cache = ResultCache(ttl_seconds=60)
+        await cache.set("chave", {"category": "produtivo"})
+        clock.now += 59
+        hit = await cache.get("chave")
+        clock.now += 2
+        return hit, await cache.get("chave"), cache.stats()
+
+    hit, expired, stats = asyncio.run(main())
+    assert hit == {"category": "produtivo"}
+    assert expired is None
+    assert (stats["memory_hits"], stats["misses"], stats["entries"]) == (1, 1, 0)
+
+def test_least_recently_used_entry_is_evicted():
+    async def main():
+        cache = ResultCache(max_entries=2)
+        await cache.set("a", 1)
+        await cache.set("b", 2)
+        await cache.get("a")
+        await cache.set("c", 3)
+        return [await cache.get(key) for key in ("a", "b", "c")], cache.stats()["evictions"]
+
+    assert asyncio.run(main()) == ([1, None, 3], 1)
+
+def test_disk_entry_is_shared_between_instances(tmp_path, clock):
+    path = str(tmp_path / "cache.sqlite3")
+
+    async def main():
+        await ResultCache(sqlite_path=path).set("chave", {"reply": "Olá"})
+        reader = ResultCache(sqlite_path=path)
+        return await reader.get("chave"), reader.stats()["disk_hits"]
+
+    assert asyncio.run(main()) == ({"reply": "Olá"}, 1)
+
+def test_promoted_disk_entry_keeps_its_expiry(tmp_path, clock):
+    path = str(tmp_path / "cache.sqlite3")
+
+    async def main():
+        await ResultCache(ttl_seconds=60, sqlite_path=path).set("chave", "valor")
+        reader = ResultCache(ttl_seconds=60, sqlite_path=path)
+        clock.now += 50
+        promoted = await reader.get("chave")
+        # a promoção para a memória não renova o TTL gravado em disco
+        clock.now += 20
+        return promoted, await reader.get("chave")
+
+    assert asyncio.run(main()) == ("valor", None)
@@ -0,0 +1,83 @@
+import asyncio
+import pytest
+from services.single_flight import SingleFlight
+
+def test_concurrent_calls_share_one_execution():
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.02)
+        return {"category": "produtivo"}
+
+    async def main():
+        flight = SingleFlight("teste")
+        return await asyncio.gather(*(flight.do("chave", work) for _ in range(5)))
+
+    results = asyncio.run(main())
+    assert len(calls) == 1
+    assert [shared for _, shared in results].count(False) == 1
+    assert all(result == {"category": "produtivo"} for result, _ in results)
+
+def test_different_keys_run_separately():
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+
+    async def main():
+        flight = SingleFlight("teste")
+        await asyncio.gather(flight.do("a", work), flight.do("b", work))
+        return flight.in_flight()
+
+    assert asyncio.run(main()) == 0
+    assert len(calls) == 2
+
+def test_error_reaches_every_waiter():
+    async def work():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("falhou")
+
+    async def main():
+        flight = SingleFlight("teste")
+        return await asyncio.gather(*(flight.do("chave", work) for _ in range(3)), return_exceptions=True)
+
+    assert all(isinstance(result, RuntimeError) for result in asyncio.run(main()))
+
+def test_cancelling_one_waiter_keeps_the_call_for_the_others():
+    async def work():
+        await asyncio.sleep(0.05)
+        return "ok"
+
+    async def main():
+        flight = SingleFlight("teste")
+        first = asyncio.create_task(flight.do("chave", work))
+        second = asyncio.create_task(flight.do("chave", work))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(main()) == ("ok", True)
+
+def test_call_is_cancelled_when_every_waiter_gives_up():
+    finished = []
+
+    async def work():
+        await asyncio.sleep(0.05)
+        finished.append(1)
+
+    async def main():
+        flight = SingleFlight("teste")
+        tasks = [asyncio.create_task(flight.do("chave", work)) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await asyncio.sleep(0.08)
+        return flight.in_flight()
+
+    assert asyncio.run(main()) == 0
+    assert finished == []
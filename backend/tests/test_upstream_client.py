@@ -0,0 +1,164 @@
+import time
+import asyncio
+from email.utils import format_datetime
+from datetime import datetime, timedelta, timezone
+import httpx
+import pytest
+from config.settings import Settings
+from services.upstream_client import UpstreamClient, UpstreamError
+
+PAYLOAD = {"model": "gpt", "messages": [{"role": "user", "content": "Olá"}], "max_tokens": 10}
+COMPLETION = {"choices": [{"message": {"content": "ok"}}]}
+
+def _client(handler, **overrides) -> UpstreamClient:
+    settings = Settings(**{
+        "OPENAI_API_KEY": "test",
+        "OPENAI_BASE_URL": "http://upstream/v1",
+        "UPSTREAM_RETRY_BASE_DELAY": 0.001,
+        "UPSTREAM_RETRY_MAX_DELAY": 0.01,
+        **overrides
+    })
+    client = UpstreamClient(settings)
+    client.client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return client
+
+def _responses(*items):
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        item = items[min(len(calls), len(items) - 1)]
+        calls.append(request)
+        if isinstance(item, Exception):
+            raise item
+        return item
+
+    return handler, calls
+
+def test_server_errors_are_retried():
+    handler, calls = _responses(httpx.Response(503), httpx.Response(502), httpx.Response(200, json=COMPLETION))
+    client = _client(handler, UPSTREAM_MAX_RETRIES=3)
+
+    assert asyncio.run(client.chat_completion(PAYLOAD)) == COMPLETION
+    assert len(calls) == 3
+    assert client.stats()["retries"] == 2
+    assert client.stats()["status_codes"] == {503: 1, 502: 1, 200: 1}
+
+def test_connect_errors_are_retried():
+    handler, calls = _responses(httpx.ConnectError("recusada"), httpx.Response(200, json=COMPLETION))
+
+    assert asyncio.run(_client(handler).chat_completion(PAYLOAD)) == COMPLETION
+    assert len(calls) == 2
+
+def test_read_timeout_is_not_retried():
+    handler, calls = _responses(httpx.ReadTimeout("sem resposta"), httpx.Response(200, json=COMPLETION))
+
+    with pytest.raises(UpstreamError):
+        asyncio.run(_client(handler).chat_completion(PAYLOAD))
+    assert len(calls) == 1
+
+def test_client_error_is_not_retried():
+    handler, calls = _responses(httpx.Response(400, text="payload inválido"))
+
+    with pytest.raises(UpstreamError) as error:
+        asyncio.run(_client(handler).chat_completion(PAYLOAD))
+    assert error.value.status_code == 400
+    assert len(calls) == 1
+
+def test_retries_stop_after_the_limit():
+    handler, calls = _responses(httpx.Response(503))
+
+    with pytest.raises(UpstreamError) as error:
+        asyncio.run(_client(handler, UPSTREAM_MAX_RETRIES=2).chat_completion(PAYLOAD))
+    assert error.value.status_code == 503
+    assert len(calls) == 3
+
+def test_total_deadline_covers_every_attempt():
+    async def handler(request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(0.05)
+        return httpx.Response(503)
+
+    client = _client(handler, UPSTREAM_MAX_RETRIES=10, UPSTREAM_TOTAL_TIMEOUT=0.12)
+    start = time.monotonic()
+    with pytest.raises(UpstreamError, match="sem resposta"):
+        asyncio.run(client.chat_completion(PAYLOAD))
+    assert time.monotonic() - start < 0.5
+
+def test_rate_limit_pauses_the_provider_for_retry_after():
+    handler, _ = _responses(httpx.Response(429, headers={"Retry-After": "0.01"}), httpx.Response(200, json=COMPLETION))
+    client = _client(handler)
+    provider = client.pool.providers[0]
+    before = time.monotonic()
+
+    asyncio.run(client.chat_completion(PAYLOAD))
+    assert provider.paused_until >= before + 0.01
+
+@pytest.mark.parametrize("headers, expected", [
+    ({"retry-after-ms": "1500"}, 1.5),
+    ({"retry-after": "3"}, 3.0),
+    ({"retry-after": "-2"}, 0.0),
+    ({"retry-after": "depois"}, None),
+    ({}, None),
+])
+def test_retry_after_header_is_parsed(headers, expected):
+    assert UpstreamClient._parse_retry_after(httpx.Response(429, headers=headers)) == expected
+
+def test_retry_after_date_and_cap():
+    date = format_datetime(datetime.now(timezone.utc) + timedelta(seconds=30), usegmt=True)
+    response = httpx.Response(429, headers={"retry-after": date})
+    client = _client(lambda request: httpx.Response(200))
+
+    assert 25 < UpstreamClient._parse_retry_after(response) <= 30
+    # a espera sugerida pelo servidor não passa do atraso máximo configurado
+    assert client._retry_delay(0, response) == client.retry_max_delay
+
+def test_backoff_grows_with_the_attempt():
+    client = _client(lambda request: httpx.Response(200), UPSTREAM_RETRY_BASE_DELAY=1.0, UPSTREAM_RETRY_MAX_DELAY=8.0)
+
+    assert all(0 <= client._retry_delay(0) <= 1.0 for _ in range(50))
+    assert all(0 <= client._retry_delay(5) <= 8.0 for _ in range(50))
+
+BACKUP = '[{"name": "reserva", "base_url": "http://backup/v1"}]'
+
+def _pool_client(handler, **overrides) -> UpstreamClient:
+    client = _client(handler, UPSTREAM_PROVIDERS=BACKUP, **overrides)
+    client.pool.explore_rate = 0
+    primary, backup = client.pool.providers
+    # o principal é o mais rápido medido até aqui, com p90 de 10ms
+    primary.record_latency(0.01)
+    backup.record_latency(0.05)
+    return client
+
+def test_slow_primary_is_hedged_to_another_provider():
+    async def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.host == "upstream":
+            await asyncio.sleep(5)
+        return httpx.Response(200, json={"provider": request.url.host})
+
+    client = _pool_client(handler, UPSTREAM_HEDGE_ENABLED=True, UPSTREAM_HEDGE_MIN_DELAY=0.02, UPSTREAM_HEDGE_MIN_SAMPLES=1)
+    start = time.monotonic()
+
+    assert asyncio.run(client.chat_completion(PAYLOAD)) == {"provider": "backup"}
+    assert time.monotonic() - start < 1
+    assert client.hedges == 1
+    # a requisição perdedora foi cancelada
+    assert [provider.in_flight for provider in client.pool.providers] == [0, 0]
+
+def test_fast_primary_is_not_hedged():
+    handler, calls = _responses(httpx.Response(200, json=COMPLETION))
+    client = _pool_client(handler, UPSTREAM_HEDGE_ENABLED=True, UPSTREAM_HEDGE_MIN_DELAY=0.5, UPSTREAM_HEDGE_MIN_SAMPLES=1)
+
+    asyncio.run(client.chat_completion(PAYLOAD))
+    assert [request.url.host for request in calls] == ["upstream"]
+    assert client.hedges == 0
+
+def test_retry_goes_to_a_different_provider():
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request.url.host)
+        return httpx.Response(503 if request.url.host == "upstream" else 200, json=COMPLETION)
+
+    client = _pool_client(handler)
+
+    assert asyncio.run(client.chat_completion(PAYLOAD)) == COMPLETION
+    assert calls == ["upstream", "backup"]
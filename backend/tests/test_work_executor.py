@@ -0,0 +1,24 @@
+import time
+import asyncio
+import pytest
+from services.work_executor import WorkExecutor, ExecutorSaturatedError
+
+def test_cancelled_caller_keeps_slot_until_work_finishes():
+    async def main():
+        executor = WorkExecutor(thread_workers=1, max_queue=0)
+        try:
+            task = asyncio.create_task(executor.run_light(time.sleep, 0.2))
+            await asyncio.sleep(0.05)
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+            # o trabalho cancelado ainda ocupa o único worker
+            with pytest.raises(ExecutorSaturatedError):
+                await executor.run_light(time.sleep, 0)
+
+            await asyncio.sleep(0.25)
+            return await executor.run_light(sum, [1, 2]), executor.stats()["thread_pending"]
+        finally:
+            executor.shutdown()
+
+    assert asyncio.run(main()) == (3, 0)